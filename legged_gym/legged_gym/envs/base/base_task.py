@@ -6,10 +6,14 @@ import numpy as np
 import torch
 import time
 
+from legged_gym.utils.startup import StartupTimer
+
 # Base class for RL tasks
 class BaseTask():
 
     def __init__(self, cfg, sim_params, physics_engine, sim_device, headless):
+        if not hasattr(self, 'startup_timer'):
+            self.startup_timer = StartupTimer()
         self.gym = gymapi.acquire_gym()
 
         self.sim_params = sim_params
@@ -57,8 +61,10 @@ class BaseTask():
         self.extras = {}
 
         # create envs, sim and viewer
-        self.create_sim()
-        self.gym.prepare_sim(self.sim)
+        with self.startup_timer.phase('create_sim'):
+            self.create_sim()
+        with self.startup_timer.phase('prepare_sim'):
+            self.gym.prepare_sim(self.sim)
 
         # todo: read from config
         self.enable_viewer_sync = True
@@ -99,6 +105,28 @@ class BaseTask():
     def step(self, actions):
         raise NotImplementedError
 
+    # curriculum and randomization state saved with the training state and restored on resume, missing attributes are skipped
+    training_state_attributes = ['force', 'action_rescale', 'Kp_factors', 'Kd_factors', 'actuation_offset', 'motor_strength',
+                                 'delay_idx', 'dr_episode_idx', 'command_ranges', 'common_step_counter']
+
+    def get_training_state(self):
+        """ Curriculum and per env randomization state, see training_state_attributes
+        """
+        return {name: getattr(self, name) for name in self.training_state_attributes if hasattr(self, name)}
+
+    def set_training_state(self, state):
+        """ Restores the state returned by get_training_state, tensors are copied in place
+        """
+        for name, value in state.items():
+            current = getattr(self, name, None)
+            if isinstance(current, torch.Tensor):
+                if current.shape != value.shape:
+                    print("Training state {} of shape {} does not match the env ({}), it is not restored.".format(name, tuple(value.shape), tuple(current.shape)))
+                    continue
+                current.copy_(value)
+            elif current is not None:
+                setattr(self, name, value)
+
     def render(self, sync_frame_time=True):
         if self.viewer:
             # check for window closed
@@ -16,6 +16,13 @@ from legged_gym import LEGGED_GYM_ROOT_DIR
 from legged_gym.envs.base.base_task import BaseTask
 from legged_gym.utils.math import wrap_to_pi
 from legged_gym.utils.terrain_single import Terrain
+from legged_gym.utils.observation import ObsTerm, ObservationAssembler
+from legged_gym.utils.pd_controller import DelayLine, PDController
+from legged_gym.utils.reward_engine import RewardEngine
+from legged_gym.utils.posture_bank import load_or_build_posture_bank, settled_episode_length
+from legged_gym.utils.domain_rand import DRParam, DomainRandSampler, domain_rand_seed
+from legged_gym.utils.startup import AssetIndex
+from rsl_rl.utils import profiler, profiled
 from legged_gym.utils.isaacgym_utils import get_euler_xyz as get_euler_xyz_in_tensor
 from legged_gym.utils.helpers import class_to_dict
 from .legged_robot_config import LeggedRobotCfg
@@ -73,13 +80,21 @@ class LeggedRobot(BaseTask):
 
         if not self.headless:
             self.set_camera(self.cfg.viewer.pos, self.cfg.viewer.lookat)
-        self._init_buffers()
-        self._prepare_reward_function()
+        with self.startup_timer.phase('init_buffers'):
+            self._init_buffers()
+        with self.startup_timer.phase('prepare_reward_function'):
+            self._prepare_reward_function()
         self.init_done = True
         self.unactuated_time = self.cfg.env.unactuated_timesteps
         self.unactuated_time *= 0.02 / self.dt
         self.is_gaussian = cfg.rewards.is_gaussian
+        self.posture_bank = None
+        if self.cfg.env.posture_bank:
+            with self.startup_timer.phase('posture_bank'):
+                self.posture_bank = load_or_build_posture_bank(self)
+        self.startup_timer.report()
 
+    @profiled('env/step')
     def step(self, actions):
         """ Apply actions, simulate, call self.post_physics_step()
 
@@ -91,12 +106,18 @@ class LeggedRobot(BaseTask):
         # step physics and render each frame
         self.render()
 
+        # the actuation mask and the pulling force only change in post_physics_step
+        torch.gt(self.real_episode_length_buf.unsqueeze(1), self.unactuated_time, out=self.actuated_mask)
+        self.actions *= self.actuated_mask
+        if self.cfg.curriculum.pull_force:
+            self._compute_pull_force()
+
         for _ in range(self.cfg.control.decimation):
-            self.actions *= self.real_episode_length_buf.unsqueeze(1) > self.unactuated_time 
             self.torques = self._compute_torques(self.actions).view(self.torques.shape)
 
             self.gym.set_dof_actuation_force_tensor(self.sim, gymtorch.unwrap_tensor(self.torques))
-            self.gym.simulate(self.sim)
+            with profiler.scope('env/simulate'):
+                self.gym.simulate(self.sim)
             if self.cfg.env.test:
                 elapsed_time = self.gym.get_elapsed_time(self.sim)
                 sim_time = self.gym.get_sim_time(self.sim)
@@ -105,14 +126,7 @@ class LeggedRobot(BaseTask):
             
             # vertical pulling force
             if self.cfg.curriculum.pull_force:
-                force_tensor = torch.zeros([self.num_envs, self.num_bodies, 3], device=self.device)
-                force_tensor[:, self.base_indices, 2] = self.force 
-
-                force_tensor *= (self.real_episode_length_buf.unsqueeze(1) > self.unactuated_time).unsqueeze(1)
-                if not self.cfg.curriculum.no_orientation:
-                    force_tensor *= (self.projected_gravity[:, 2] < -0.8).unsqueeze(1).unsqueeze(1)
-                force_tensor = gymtorch.unwrap_tensor(force_tensor)
-                self.gym.apply_rigid_body_force_tensors(self.sim, force_tensor)
+                self.gym.apply_rigid_body_force_tensors(self.sim, gymtorch.unwrap_tensor(self.pull_force_tensor))
 
             if self.device == 'cpu':
                 self.gym.fetch_results(self.sim, True)
@@ -121,12 +135,13 @@ class LeggedRobot(BaseTask):
 
         # return clipped obs, clipped states (None), rewards, dones and infos
         clip_obs = self.cfg.normalization.clip_observations
-        self.obs_buf = torch.clip(self.obs_buf, -clip_obs, clip_obs)
+        # obs_buf is clipped in place by the observation assembler
         if self.privileged_obs_buf is not None:
             self.privileged_obs_buf = torch.clip(self.privileged_obs_buf, -clip_obs, clip_obs)
         
         return self.obs_buf, self.privileged_obs_buf, self.rew_buf, self.reset_buf, self.extras
     
+    @profiled('env/post_physics_step')
     def post_physics_step(self):
         """ check terminations, compute observations and rewards
             calls self._post_physics_step_callback() for common computations 
@@ -184,6 +199,7 @@ class LeggedRobot(BaseTask):
         self.high_foot_height = (self.rigid_body_states[:, self.feet_indices, 2].clone().mean(-1) > 0.35) & (self.real_episode_length_buf > self.unactuated_time)
         self.reset_buf |= self.high_foot_height
 
+    @profiled('env/reset_idx')
     def reset_idx(self, env_ids):
         """ Reset some environments.
             Calls self._reset_dofs(env_ids), self._reset_root_states(env_ids), and self._resample_commands(env_ids)
@@ -195,14 +211,15 @@ class LeggedRobot(BaseTask):
             env_ids (list[int]): List of environment ids which must be reset
         """
         if len(env_ids) == 0:
+            self.episode_info.fill_(float('nan'))
             return
             
-        self.extras["episode"] = {}
-        self.extras['episode']['base_height'] = self.old_headheight[env_ids].mean()
+        self.episode_info[self.episode_info_index['base_height']] = self.old_headheight[env_ids].mean()
 
         # reset robot states
-        self._reset_dofs(env_ids)
-        self._reset_root_states(env_ids)
+        if self.posture_bank is None:
+            self._reset_dofs(env_ids)
+            self._reset_root_states(env_ids)
 
         self.update_force_curriculum(env_ids)
 
@@ -220,97 +237,55 @@ class LeggedRobot(BaseTask):
         self.max_headheight[env_ids] = 0
         self.feet_ori[env_ids] = 0
         # fill extras
-        self.delay_buffer[:, env_ids, :] = 0.
+        self.delay_line.reset(env_ids)
+        if self.posture_bank is not None:
+            self._reset_to_postures(env_ids)
         
-        for key in self.episode_sums.keys():
-            self.extras["episode"]['rew_' + key] = torch.mean(self.episode_sums[key][env_ids]) / self.max_episode_length_s
-            self.episode_sums[key][env_ids] = 0.
+        episode_sums = self.reward_engine.episode_sums
+        self.episode_info[self.episode_info_terms] = episode_sums[env_ids].mean(dim=0) / self.max_episode_length_s
+        episode_sums[env_ids] = 0.
+        # the group rewards are logged per reset env and cleared, as when the group episode sums aliased rew_buf
+        self.episode_info[self.episode_info_groups] = self.rew_buf[env_ids].mean(dim=0) / self.max_episode_length_s
+        self.rew_buf[env_ids] = 0.
         # send timeout info to the algorithm
         if self.cfg.env.send_timeouts:
             self.extras["time_outs"] = self.time_out_buf
     
         # self._reset_motions(env_ids)
-        self.extras['episode']["force"] = self.force.mean()
-        self.extras['episode']['action_scale'] = self.action_rescale
+        self.episode_info[self.episode_info_index['force']] = self.force.mean()
+        self.episode_info[self.episode_info_index['action_scale']] = self.action_rescale.mean()
 
         # reset randomized prop
-        if self.cfg.domain_rand.randomize_kp:
-            self.Kp_factors[env_ids] = torch_rand_float(self.cfg.domain_rand.kp_range[0], self.cfg.domain_rand.kp_range[1], (len(env_ids), self.num_dofs), device=self.device)
-        if self.cfg.domain_rand.randomize_kd:
-            self.Kd_factors[env_ids] = torch_rand_float(self.cfg.domain_rand.kd_range[0], self.cfg.domain_rand.kd_range[1], (len(env_ids), self.num_dofs), device=self.device)
-        if self.cfg.domain_rand.randomize_actuation_offset:
-            self.actuation_offset[env_ids] = torch_rand_float(self.cfg.domain_rand.actuation_offset_range[0], self.cfg.domain_rand.actuation_offset_range[1], (len(env_ids), self.num_dof), device=self.device) * self.torque_limits.unsqueeze(0)
-        if self.cfg.domain_rand.randomize_motor_strength:
-            self.motor_strength[env_ids] = torch_rand_float(self.cfg.domain_rand.motor_strength_range[0], self.cfg.domain_rand.motor_strength_range[1], (len(env_ids), self.num_dof), device=self.device)
-        if self.cfg.domain_rand.delay:
-            self.delay_idx[env_ids] = torch.randint(low=0, high=self.cfg.domain_rand.max_delay_timesteps, size=(len(env_ids), ), device=self.device)
+        self._randomize_episode(env_ids)
 
+    @profiled('env/compute_reward')
     def compute_reward(self):
         """ Compute rewards
-            Calls each reward function which had a non-zero scale (processed in self._prepare_reward_function())
-            adds each terms to the episode sums and to the total reward
+            Evaluates each reward function which had a non-zero scale (processed in self._prepare_reward_function())
+            into the term matrix of the reward engine, which reduces it into the reward groups and adds it to the episode sums
         """
         if not self.is_gaussian:
             raise NotImplementedError
-        else:
-            self.rew_buf[:, :] = 0
-            task_group_index = self.reward_groups.index('task')
-            self.rew_buf[:, task_group_index] = 1
-            for i in range(len(self.reward_functions)):
-                name = self.reward_names[i]
-                rew = self.reward_functions[i]() * self.reward_scales[name]
-                if len(rew.shape) == 2 and rew.shape[1] == 1:
-                    rew = rew.squeeze(1)
-                self.rew_buf[:, task_group_index] *= rew
-                self.episode_sums[name] += rew
-
-        # print(len(self.constraints))
-        for i in range(len(self.constraints)):
-            name = self.constraint_names[i]
-            reward_group_name = name.split('_')[0]
-            rew = self.constraints[i]() * self.constraints_scales[name]
-            task_group_index = self.reward_groups.index(reward_group_name)
-
-            # print(name, self.constraints[i]().floatmean())
-            self.rew_buf[:, task_group_index] += rew
-            self.episode_sums[name] += rew
-            if self.cfg.constraints.only_positive_rewards:
-                self.rew_buf[:, task_group_index] = torch.clip(self.rew_buf[:, task_group_index], min=0.)
-
-        # self.episode_sums[name] += self.rew_buf
-        if "termination" in self.constraints_scales:
-            rew = self._reward_termination() * self.constraints_scales["termination"]
-            self.rew_buf += rew
-            self.episode_sums["termination"] += rew
-
-        for rg in self.reward_groups:
-            idx = self.reward_groups.index(rg)
-            self.episode_sums[rg] = self.rew_buf[:, idx]
+        self.reward_engine.compute(self.rew_buf)
 
+    @profiled('env/compute_observations')
     def compute_observations(self):
-        """ Computes observations
+        """ Computes observations, the newest frame is written in place into the observation history
         """
-        head_height = self.rigid_body_states[:, self.head_indices, 2].clone()
-        feet_height = self.rigid_body_states[:, self.feet_indices, 2].clone().mean(-1).unsqueeze(-1)
-        head_height -= feet_height
-        current_obs = torch.cat(( 
-                                    self.base_ang_vel  * self.obs_scales.ang_vel,
-                                    self.projected_gravity,
-                                    # self.target_dof_pos * self.obs_scales.dof_pos,
-                                    # self.commands[:, :3] * self.commands_scale,
-                                    self.dof_pos * self.obs_scales.dof_pos,
-                                    self.dof_vel * self.obs_scales.dof_vel,
-                                    self.actions,
-                                    self.action_rescale + (torch.rand_like(self.action_rescale) - 1) * 0.05,
-                                    ),dim=-1)
-            
-        # add noise if needed
-        if self.add_noise:
-            current_obs += (2 * torch.rand_like(current_obs) - 1) * self.noise_scale_vec
-
-        current_obs *= self.real_episode_length_buf.unsqueeze(1) > self.unactuated_time
+        self.obs_buf = self.obs_assembler.step(self.noise_scale_vec if self.add_noise else None,
+                                               self.real_episode_length_buf > self.unactuated_time)
 
-        self.obs_buf = torch.cat((self.obs_buf[:, self.num_one_step_obs:self.actor_proprioceptive_obs_length], current_obs), dim=-1)
+    def _get_obs_terms(self):
+        """ Layout of the single step observation (name, size, source, scale, noise scale name)
+        """
+        return [
+            ObsTerm('ang_vel', 3, lambda: self.base_ang_vel, self.obs_scales.ang_vel, noise='ang_vel'),
+            ObsTerm('gravity', 3, lambda: self.projected_gravity, noise='gravity'),
+            ObsTerm('dof_pos', self.num_actions, lambda: self.dof_pos, self.obs_scales.dof_pos, noise='dof_pos'),
+            ObsTerm('dof_vel', self.num_actions, lambda: self.dof_vel, self.obs_scales.dof_vel, noise='dof_vel'),
+            ObsTerm('actions', self.num_actions, lambda: self.actions),
+            ObsTerm('action_rescale', 1, lambda: self.action_rescale + (torch.rand_like(self.action_rescale) - 1) * 0.05),
+        ]
 
     def create_sim(self):
         """ Creates simulation, terrain and evironments
@@ -319,7 +294,8 @@ class LeggedRobot(BaseTask):
         self.sim = self.gym.create_sim(self.sim_device_id, self.graphics_device_id, self.physics_engine, self.sim_params)
         mesh_type = self.cfg.terrain.mesh_type
         if mesh_type in ['heightfield', 'trimesh']:
-            self.terrain = Terrain(self.cfg.terrain, self.num_envs)
+            with self.startup_timer.phase('terrain'):
+                self.terrain = Terrain(self.cfg.terrain, self.num_envs, seed=getattr(self.cfg, 'seed', -1))
         if mesh_type=='plane':
             self._create_ground_plane()
         elif mesh_type=='heightfield':
@@ -328,7 +304,8 @@ class LeggedRobot(BaseTask):
             self._create_trimesh()
         elif mesh_type is not None:
             raise ValueError("Terrain mesh type not recognised. Allowed types are [None, plane, heightfield, trimesh]")
-        self._create_envs()
+        with self.startup_timer.phase('create_envs'):
+            self._create_envs()
 
     def _create_trimesh(self):
         """ Adds a triangle mesh terrain to the simulation, sets parameters based on the cfg.
@@ -371,18 +348,21 @@ class LeggedRobot(BaseTask):
                 # prepare friction randomization
                 friction_range = self.cfg.domain_rand.friction_range
                 self.friction_coeffs = torch_rand_float(friction_range[0], friction_range[1], (self.num_envs,1), device=self.device)
+                # host copy, indexing the device tensor for every shape synchronizes
+                self.friction_coeffs_list = self.friction_coeffs.squeeze(1).tolist()
 
             for s in range(len(props)):
-                props[s].friction = self.friction_coeffs[env_id]
+                props[s].friction = self.friction_coeffs_list[env_id]
     
         if self.cfg.domain_rand.randomize_restitution:
             if env_id==0:
                 # prepare restitution randomization
                 restitution_range = self.cfg.domain_rand.restitution_range
                 self.restitution_coeffs = torch_rand_float(restitution_range[0], restitution_range[1], (self.num_envs,1), device=self.device)
+                self.restitution_coeffs_list = self.restitution_coeffs.squeeze(1).tolist()
 
             for s in range(len(props)):
-                props[s].restitution = self.restitution_coeffs[env_id]
+                props[s].restitution = self.restitution_coeffs_list[env_id]
 
         return props
 
@@ -402,33 +382,37 @@ class LeggedRobot(BaseTask):
             self.dof_pos_limits = torch.zeros(self.num_dof, 2, dtype=torch.float, device=self.device, requires_grad=False)
             self.dof_vel_limits = torch.zeros(self.num_dof, dtype=torch.float, device=self.device, requires_grad=False)
             self.torque_limits = torch.zeros(self.num_dof, dtype=torch.float, device=self.device, requires_grad=False)
-            for i in range(len(props)):
-                self.dof_pos_limits[i, 0] = props["lower"][i].item()
-                self.dof_pos_limits[i, 1] = props["upper"][i].item()
-                self.dof_vel_limits[i] = props["velocity"][i].item()
-                self.torque_limits[i] = props["effort"][i].item()
-                # hard limits
-                self.dof_pos_limits[i, 0] = self.dof_pos_limits[i, 0] * self.cfg.rewards.soft_dof_pos_limit
-                self.dof_pos_limits[i, 1] = self.dof_pos_limits[i, 1] * self.cfg.rewards.soft_dof_pos_limit
+            # hard limits
+            self.dof_pos_limits[:, 0] = to_torch(props["lower"], device=self.device) * self.cfg.rewards.soft_dof_pos_limit
+            self.dof_pos_limits[:, 1] = to_torch(props["upper"], device=self.device) * self.cfg.rewards.soft_dof_pos_limit
+            self.dof_vel_limits[:] = to_torch(props["velocity"], device=self.device)
+            self.torque_limits[:] = to_torch(props["effort"], device=self.device)
         return props
 
     def _process_rigid_body_props(self, props, env_id):
+        if env_id == 0:
+            # host copies of the per env randomization, indexing device tensors at every env synchronizes
+            self.default_rigid_body_mass_list = self.default_rigid_body_mass.tolist()
+            if self.cfg.domain_rand.randomize_payload_mass:
+                self.payload_list = self.payload[:, 0].tolist()
+            if self.cfg.domain_rand.randomize_com_displacement:
+                self.com_displacement_list = self.com_displacement.tolist()
+            if self.cfg.domain_rand.randomize_link_mass:
+                rng = self.cfg.domain_rand.link_mass_range
+                self.link_mass_scales = np.random.uniform(rng[0], rng[1], (self.num_envs, len(props))).tolist()
         # randomize base mass
         if self.cfg.domain_rand.randomize_payload_mass:
-            props[self.torso_link_index].mass = self.default_rigid_body_mass[self.torso_link_index] + self.payload[env_id, 0]
+            props[self.torso_link_index].mass = self.default_rigid_body_mass_list[self.torso_link_index] + self.payload_list[env_id]
             # props[0].mass = self.default_rigid_body_mass[0] + self.payload[env_id, 0]
 
         if self.cfg.domain_rand.randomize_com_displacement:
             # props[0].com = self.default_com + gymapi.Vec3(self.com_displacement[env_id, 0], self.com_displacement[env_id, 1], self.com_displacement[env_id, 2])
-            props[self.torso_link_index].com = self.default_com_torso + gymapi.Vec3(self.com_displacement[env_id, 0], self.com_displacement[env_id, 1], self.com_displacement[env_id, 2])
+            props[self.torso_link_index].com = self.default_com_torso + gymapi.Vec3(*self.com_displacement_list[env_id])
         
         if self.cfg.domain_rand.randomize_link_mass:
-            rng = self.cfg.domain_rand.link_mass_range
+            scales = self.link_mass_scales[env_id]
             for i in range(0, len(props)):
-                if i == self.torso_link_index:
-                    pass
-                scale = np.random.uniform(rng[0], rng[1])
-                props[i].mass = scale * self.default_rigid_body_mass[i]
+                props[i].mass = scales[i] * self.default_rigid_body_mass_list[i]
 
         return props
     
@@ -450,28 +434,37 @@ class LeggedRobot(BaseTask):
         Returns:
             [torch.Tensor]: Torques sent to the simulation
         """
-        #pd controller
-        actions_scaled = actions * self.action_rescale
-    
-        self.joint_pos_target = self.dof_pos + actions_scaled
+        #pd controller, writes into persistent buffers
+        if self.cfg.domain_rand.delay:
+            actions_scaled = self.delay_line.next_slot()
+        else:
+            actions_scaled = self.actions_scaled
+        torch.mul(actions, self.action_rescale, out=actions_scaled)
+
         if self.cfg.domain_rand.delay:
-            self.delay_buffer = torch.concat((self.delay_buffer[1:], actions_scaled.unsqueeze(0)), dim=0)
-            self.joint_pos_target = self.dof_pos + self.delay_buffer[self.delay_idx, torch.arange(len(self.delay_idx)), :]
+            torch.add(self.dof_pos, self.delay_line.read(self.delay_idx), out=self.joint_pos_target)
         else:
-            self.joint_pos_target = self.dof_pos + actions_scaled
+            torch.add(self.dof_pos, actions_scaled, out=self.joint_pos_target)
 
         control_type = self.cfg.control.control_type
         if control_type=="P":
-            torques = self.p_gains * self.Kp_factors * (self.joint_pos_target - self.dof_pos) - self.d_gains *  self.Kd_factors * self.dof_vel
+            self.pd_controller.position(self.joint_pos_target, self.dof_pos, self.dof_vel, self.p_gains, self.d_gains, self.Kp_factors, self.Kd_factors)
         elif control_type=="V":
-            torques = self.p_gains*(actions_scaled - self.dof_vel) - self.d_gains*(self.dof_vel - self.last_dof_vel)/self.sim_params.dt
+            self.pd_controller.velocity(actions_scaled, self.dof_vel, self.last_dof_vel, self.p_gains, self.d_gains, self.sim_params.dt)
         elif control_type=="T":
-            torques = actions_scaled
+            self.pd_controller.torque(actions_scaled)
         else:
             raise NameError(f"Unknown controller type: {control_type}")
-        torques = self.motor_strength *  torques + self.actuation_offset
-        
-        return torch.clip(torques, -self.torque_limits, self.torque_limits)
+        return self.pd_controller.actuate(self.motor_strength, self.actuation_offset)
+
+    def _compute_pull_force(self):
+        """ Writes the vertical pulling force on the base bodies into the persistent force tensor
+        """
+        torch.mul(self.force, self.actuated_mask, out=self.pull_force_gate)
+        if not self.cfg.curriculum.no_orientation:
+            torch.lt(self.projected_gravity[:, 2:3], -0.8, out=self.upright_mask)
+            self.pull_force_gate *= self.upright_mask
+        torch.mul(self.pull_force_gate, self.base_body_mask, out=self.pull_force_tensor[:, :, 2])
 
     def _reset_dofs(self, env_ids):
         """ Resets DOF position and velocities of selected environmments
@@ -499,6 +492,48 @@ class LeggedRobot(BaseTask):
                                               gymtorch.unwrap_tensor(self.dof_state),
                                               gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
 
+    def _reset_to_postures(self, env_ids):
+        """ Resets selected environments into settled postures of the posture bank, as at the end of the unactuated phase.
+            The episode continues from there, with the previous dof states and the observation history of the fall.
+
+        Args:
+            env_ids (List[int]): Environemnt ids
+        """
+        root_states, dof_pos, dof_vel = self.posture_bank.sample(env_ids)
+        self.root_states[env_ids] = root_states
+        self.root_states[env_ids, :3] += self.env_origins[env_ids]
+        self.dof_pos[env_ids] = dof_pos
+        self.dof_vel[env_ids] = dof_vel
+
+        settled_length = settled_episode_length(self)
+        self.episode_length_buf[env_ids] = settled_length
+        self.real_episode_length_buf[env_ids] = settled_length
+        self.last_last_dof_pos[env_ids] = dof_pos
+        self.last_dof_pos[env_ids] = dof_pos
+        self.last_dof_vel[env_ids] = dof_vel
+        # the base quantities of this step were computed before the reset, they are recomputed from the posture
+        # (base_pos and base_quat are views of root_states)
+        base_quat = self.root_states[env_ids, 3:7]
+        self.rpy[env_ids] = get_euler_xyz_in_tensor(base_quat)
+        self.base_lin_vel[env_ids] = quat_rotate_inverse(base_quat, self.root_states[env_ids, 7:10])
+        self.base_ang_vel[env_ids] = quat_rotate_inverse(base_quat, self.root_states[env_ids, 10:13])
+        self.projected_gravity[env_ids] = quat_rotate_inverse(base_quat, self.gravity_vec[env_ids])
+        self.last_root_vel[env_ids] = self.root_states[env_ids, 7:13]
+        # the episode starts actuated, without the actions of the previous episode
+        self.actions[env_ids] = 0.
+        self.last_actions[env_ids] = 0.
+        self.last_last_actions[env_ids] = 0.
+        # the observations of the fall are zeroed
+        self.obs_assembler.reset_idx(env_ids)
+
+        env_ids_int32 = env_ids.to(dtype=torch.int32)
+        self.gym.set_dof_state_tensor_indexed(self.sim,
+                                              gymtorch.unwrap_tensor(self.dof_state),
+                                              gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
+        self.gym.set_actor_root_state_tensor_indexed(self.sim,
+                                                     gymtorch.unwrap_tensor(self.root_states),
+                                                     gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
+
     def _reset_root_states(self, env_ids):
         """ Resets ROOT states position and velocities of selected environmments
             Sets base position based on the curriculum
@@ -542,7 +577,7 @@ class LeggedRobot(BaseTask):
 
     def _get_noise_scale_vec(self, cfg):
         """ Sets a vector used to scale the noise added to the observations.
-            [NOTE]: Must be adapted when changing the observations structure
+            The vector is generated from the observation layout of _get_obs_terms
 
         Args:
             cfg (Dict): Environment config file
@@ -550,19 +585,35 @@ class LeggedRobot(BaseTask):
         Returns:
             [torch.Tensor]: Vector of scales used to multiply a uniform distribution in [-1, 1]
         """
-        start_index = 6
-        noise_vec = torch.zeros(self.num_one_step_obs, device=self.device)# if not self.cfg.env.add_force else torch.zeros(start_index + 3 * self.num_actions + 1, device=self.device)
         self.add_noise = self.cfg.noise.add_noise
-        noise_scales = self.cfg.noise.noise_scales
-        noise_level = self.cfg.noise.noise_level
-        noise_vec[0:3] = noise_scales.ang_vel * noise_level * self.obs_scales.ang_vel
-        noise_vec[3:6] = noise_scales.gravity * noise_level
-
-        noise_vec[start_index:start_index+self.num_actions] = noise_scales.dof_pos * noise_level * self.obs_scales.dof_pos
-        noise_vec[start_index+self.num_actions:start_index+2*self.num_actions] = noise_scales.dof_vel * noise_level * self.obs_scales.dof_vel
-        noise_vec[start_index+2*self.num_actions:start_index+3*self.num_actions] = 0. # previous actions
+        return self.obs_assembler.noise_scale_vec(cfg.noise)
 
-        return noise_vec
+    def _get_dr_params(self):
+        """ Declarative table of the actuator randomization redrawn at every episode, see DomainRandSampler.
+            Each parameter is assigned to the env attribute of the same name.
+        """
+        dr = self.cfg.domain_rand
+        params = []
+        if dr.randomize_kp:
+            params.append(DRParam('Kp_factors', *dr.kp_range, size=self.num_dofs))
+        if dr.randomize_kd:
+            params.append(DRParam('Kd_factors', *dr.kd_range, size=self.num_dofs))
+        if dr.randomize_actuation_offset:
+            params.append(DRParam('actuation_offset', *dr.actuation_offset_range, size=self.num_dofs, scale=self.torque_limits))
+        if dr.randomize_motor_strength:
+            params.append(DRParam('motor_strength', *dr.motor_strength_range, size=self.num_dofs))
+        if dr.delay:
+            params.append(DRParam('delay_idx', 0, dr.max_delay_timesteps, integer=True))
+        return params
+
+    def _randomize_episode(self, env_ids):
+        """ Starts the next episode of the envs env_ids and draws its actuator randomization in one call.
+            The values only depend on the seed, the env id and dr_episode_idx, dr_sampler.sample(env_id, episode_idx)
+            regenerates the randomization of any past episode.
+        """
+        self.dr_episode_idx[env_ids] += 1
+        for name, value in self.dr_sampler.sample(env_ids, self.dr_episode_idx[env_ids]).items():
+            getattr(self, name)[env_ids] = value
 
     #----------------------------------------
     def _init_buffers(self):
@@ -596,10 +647,15 @@ class LeggedRobot(BaseTask):
         # initialize some data used later on
         self.common_step_counter = 0
         self.extras = {}
+        self.obs_assembler = ObservationAssembler(self._get_obs_terms(), self.num_envs, self.actor_history_length, self.device,
+                                                  clip=self.cfg.normalization.clip_observations)
+        assert self.obs_assembler.num_one_step_obs == self.num_one_step_obs, "Observation layout does not match num_one_step_observations"
+        self.obs_buf = self.obs_assembler.get_observations()
         self.noise_scale_vec = self._get_noise_scale_vec(self.cfg)
         self.gravity_vec = to_torch(get_axis_params(-1., self.up_axis_idx), device=self.device).repeat((self.num_envs, 1))
         self.forward_vec = to_torch([1., 0., 0.], device=self.device).repeat((self.num_envs, 1))
-        self.torques = torch.zeros(self.num_envs, self.num_real_dofs, dtype=torch.float, device=self.device, requires_grad=False)
+        self.pd_controller = PDController(self.num_envs, self.num_real_dofs, self.torque_limits, self.device)
+        self.torques = self.pd_controller.torques
         self.p_gains = torch.zeros(self.num_real_dofs, dtype=torch.float, device=self.device, requires_grad=False)
         self.d_gains = torch.zeros(self.num_real_dofs, dtype=torch.float, device=self.device, requires_grad=False)
         self.actions = torch.zeros(self.num_envs, self.num_actions, dtype=torch.float, device=self.device, requires_grad=False)
@@ -621,7 +677,16 @@ class LeggedRobot(BaseTask):
         self.feet_ori = torch.zeros(self.num_envs, dtype=torch.float, device=self.device, requires_grad=False).unsqueeze(1)
         self.force = self.cfg.curriculum.force * torch.ones(self.num_envs, dtype=torch.float, device=self.device, requires_grad=False).unsqueeze(1)
         self.action_rescale = self.cfg.control.action_scale * torch.ones(self.num_envs, dtype=torch.float, device=self.device, requires_grad=False).unsqueeze(1)
-        self.delay_buffer = torch.zeros(self.cfg.domain_rand.max_delay_timesteps, self.num_envs, self.num_actions, dtype=torch.float, device=self.device, requires_grad=False)
+        self.delay_line = DelayLine(self.cfg.domain_rand.max_delay_timesteps, self.num_envs, self.num_actions, self.device)
+        self.actions_scaled = torch.zeros(self.num_envs, self.num_actions, dtype=torch.float, device=self.device, requires_grad=False)
+        self.joint_pos_target = torch.zeros(self.num_envs, self.num_actions, dtype=torch.float, device=self.device, requires_grad=False)
+        # persistent force tensor, only the entries of the base bodies are written
+        self.pull_force_tensor = torch.zeros(self.num_envs, self.num_bodies, 3, dtype=torch.float, device=self.device, requires_grad=False)
+        self.base_body_mask = torch.zeros(self.num_bodies, dtype=torch.float, device=self.device, requires_grad=False)
+        self.base_body_mask[self.base_indices] = 1.
+        self.pull_force_gate = torch.zeros(self.num_envs, 1, dtype=torch.float, device=self.device, requires_grad=False)
+        self.actuated_mask = torch.zeros(self.num_envs, 1, dtype=torch.bool, device=self.device, requires_grad=False)
+        self.upright_mask = torch.zeros(self.num_envs, 1, dtype=torch.bool, device=self.device, requires_grad=False)
         
 
         # joint positions offsets and PD gains
@@ -652,23 +717,12 @@ class LeggedRobot(BaseTask):
         self.height_noise_offset = torch.zeros(self.num_envs, 1, dtype=torch.float, device=self.device, requires_grad=False)
         self.motor_strength = torch.ones(self.num_envs, self.num_dofs, dtype=torch.float, device=self.device, requires_grad=False)
 
-        if self.cfg.domain_rand.randomize_kp:
-            self.Kp_factors = torch_rand_float(self.cfg.domain_rand.kp_range[0], self.cfg.domain_rand.kp_range[1], (self.num_envs, self.num_dofs), device=self.device)
-        if self.cfg.domain_rand.randomize_kd:
-            self.Kd_factors = torch_rand_float(self.cfg.domain_rand.kd_range[0], self.cfg.domain_rand.kd_range[1], (self.num_envs, self.num_dofs), device=self.device)
-        if self.cfg.domain_rand.randomize_actuation_offset:
-            self.actuation_offset = torch_rand_float(self.cfg.domain_rand.actuation_offset_range[0], self.cfg.domain_rand.actuation_offset_range[1], (self.num_envs, self.num_dof), device=self.device) * self.torque_limits.unsqueeze(0)
-        if self.cfg.domain_rand.randomize_motor_strength:
-            self.motor_strength = torch_rand_float(self.cfg.domain_rand.motor_strength_range[0], self.cfg.domain_rand.motor_strength_range[1], (self.num_envs, self.num_dofs), device=self.device)
-        if self.cfg.domain_rand.randomize_payload_mass:
-            self.payload = torch_rand_float(self.cfg.domain_rand.payload_mass_range[0], self.cfg.domain_rand.payload_mass_range[1], (self.num_envs, 1), device=self.device)
-        if self.cfg.domain_rand.randomize_com_displacement:
-            self.com_displacement = torch_rand_float(self.cfg.domain_rand.com_displacement_range[0], self.cfg.domain_rand.com_displacement_range[1], (self.num_envs, 3), device=self.device)
-            self.com_displacement[:, 0] = self.com_displacement[:, 0] * 4
-            self.com_displacement[:, 1] = self.com_displacement[:, 1] * 4
-            self.com_displacement[:, 2] = self.com_displacement[:, 2] * 2
         if self.cfg.domain_rand.delay:
-            self.delay_idx = torch.randint(low=0, high=self.cfg.domain_rand.max_delay_timesteps, size=(self.num_envs,), device=self.device)
+            self.delay_idx = torch.zeros(self.num_envs, dtype=torch.long, device=self.device, requires_grad=False)
+        # the initial randomization is episode 0 of each env
+        self.dr_sampler = DomainRandSampler(self._get_dr_params(), self.dr_seed, self.device)
+        self.dr_episode_idx = -torch.ones(self.num_envs, dtype=torch.long, device=self.device, requires_grad=False)
+        self._randomize_episode(torch.arange(self.num_envs, device=self.device))
 
     def _prepare_reward_function(self):
         """ Prepares a list of reward functions, whcih will be called to compute the total reward.
@@ -707,11 +761,28 @@ class LeggedRobot(BaseTask):
             name = '_reward_' + '_'.join(name.split('_')[1:])
             self.constraints.append(getattr(self, name))        
 
-        # reward episode sums
-        self.episode_sums = {name: torch.zeros(self.num_envs, dtype=torch.float, device=self.device, requires_grad=False)
-                             for name in self.reward_scales.keys()}
-        for name in self.constraint_names:
-            self.episode_sums[name] = torch.zeros(self.num_envs, dtype=torch.float, device=self.device, requires_grad=False)
+        # reward engine, the task group multiplies its terms and the constraint groups ('<group>_<name>') sum theirs
+        self.reward_engine = RewardEngine(self.reward_groups, self.num_envs, self.device,
+                                          only_positive_rewards=self.cfg.constraints.only_positive_rewards,
+                                          use_jit=self.cfg.rewards.jit_reward_reduction)
+        for name, function in zip(self.reward_names, self.reward_functions):
+            self.reward_engine.add_term(name, function, self.reward_scales[name], 'task')
+        for name, function in zip(self.constraint_names, self.constraints):
+            if name == "termination":
+                self.reward_engine.add_term(name, self._reward_termination, self.constraints_scales[name], None)
+            else:
+                self.reward_engine.add_term(name, function, self.constraints_scales[name], name.split('_')[0])
+        self.reward_engine.finalize()
+
+        # packed episode info published in extras['episode'], keys are fixed and entries not logged at a step are NaN
+        num_terms = len(self.reward_engine.term_names)
+        self.episode_info_keys = ['base_height'] + ['rew_' + name for name in self.reward_engine.term_names] + ['rew_' + group for group in self.reward_groups]
+        self.episode_info_keys += ['force', 'action_scale']
+        self.episode_info_index = {key: i for i, key in enumerate(self.episode_info_keys)}
+        self.episode_info_terms = slice(1, 1 + num_terms)
+        self.episode_info_groups = slice(1 + num_terms, 1 + num_terms + len(self.reward_groups))
+        self.episode_info = torch.full((len(self.episode_info_keys),), float('nan'), dtype=torch.float, device=self.device)
+        self.extras["episode"] = self.episode_info
 
     def _create_ground_plane(self):
         """ Adds a ground plane to the simulation, sets friction and restitution based on the cfg.
@@ -751,7 +822,8 @@ class LeggedRobot(BaseTask):
         asset_options.thickness = self.cfg.asset.thickness
         asset_options.disable_gravity = self.cfg.asset.disable_gravity
 
-        robot_asset = self.gym.load_asset(self.sim, asset_root, asset_file, asset_options)
+        with self.startup_timer.phase('load_asset'):
+            robot_asset = self.gym.load_asset(self.sim, asset_root, asset_file, asset_options)
         self.num_dof = self.gym.get_asset_dof_count(robot_asset)
         self.num_bodies = self.gym.get_asset_rigid_body_count(robot_asset)
         dof_props_asset = self.gym.get_asset_dof_properties(robot_asset)
@@ -762,6 +834,7 @@ class LeggedRobot(BaseTask):
         self.dof_names = self.gym.get_asset_dof_names(robot_asset)
         self.num_bodies = len(body_names)
         self.num_dofs = len(self.dof_names)
+        self.asset_index = AssetIndex(body_names, self.dof_names, self.device)
         feet_names = [s for s in body_names if self.cfg.asset.foot_name in s and 'auxiliary' not in s]
         penalized_contact_names = []
         # import ipdb; ipdb.set_trace()
@@ -785,242 +858,152 @@ class LeggedRobot(BaseTask):
         self.actor_handles = []
         self.envs = []
 
-        if self.cfg.domain_rand.randomize_payload_mass:
-            self.payload = torch_rand_float(self.cfg.domain_rand.payload_mass_range[0], self.cfg.domain_rand.payload_mass_range[1], (self.num_envs, 1), device=self.device)
-        if self.cfg.domain_rand.randomize_com_displacement:
-            self.com_displacement = torch_rand_float(self.cfg.domain_rand.com_displacement_range[0], self.cfg.domain_rand.com_displacement_range[1], (self.num_envs, 3), device=self.device)
-            self.com_displacement[:, 0] = self.com_displacement[:, 0] * 4
-            self.com_displacement[:, 1] = self.com_displacement[:, 1] * 4
-            self.com_displacement[:, 2] = self.com_displacement[:, 2] * 2
-
-        for i in range(self.num_envs):
-            # create env instance
-            env_handle = self.gym.create_env(self.sim, env_lower, env_upper, int(np.sqrt(self.num_envs)))
-            pos = self.env_origins[i].clone()
-            pos[:2] += torch_rand_float(-1., 1., (2,1), device=self.device).squeeze(1)
-            start_pose.p = gymapi.Vec3(*pos)
+        with self.startup_timer.phase('randomize_props'):
+            # body randomization, drawn once per env on its own stream of the sampler
+            self.dr_seed = domain_rand_seed(getattr(self.cfg, 'seed', -1))
+            body_dr_params = []
+            if self.cfg.domain_rand.randomize_payload_mass:
+                body_dr_params.append(DRParam('payload', *self.cfg.domain_rand.payload_mass_range, size=1))
+            if self.cfg.domain_rand.randomize_com_displacement:
+                body_dr_params.append(DRParam('com_displacement', *self.cfg.domain_rand.com_displacement_range, size=3, scale=[4., 4., 2.]))
+            body_dr_sampler = DomainRandSampler(body_dr_params, self.dr_seed, self.device, stream=1)
+            for name, value in body_dr_sampler.sample(torch.arange(self.num_envs, device=self.device), 0).items():
+                setattr(self, name, value)
+            # start positions of all envs in one draw, read from host memory in the loop
+            start_positions = self.env_origins.clone()
+            start_positions[:, :2] += torch_rand_float(-1., 1., (self.num_envs, 2), device=self.device)
+            start_positions = start_positions.tolist()
+
+        with self.startup_timer.phase('actors'):
+            for i in range(self.num_envs):
+                # create env instance
+                env_handle = self.gym.create_env(self.sim, env_lower, env_upper, int(np.sqrt(self.num_envs)))
+                start_pose.p = gymapi.Vec3(*start_positions[i])
                 
-            rigid_shape_props = self._process_rigid_shape_props(rigid_shape_props_asset, i)
-            self.gym.set_asset_rigid_shape_properties(robot_asset, rigid_shape_props)
-            actor_handle = self.gym.create_actor(env_handle, robot_asset, start_pose, self.cfg.asset.name, i, self.cfg.asset.self_collisions, 0)
-            dof_props = self._process_dof_props(dof_props_asset, i)
-            self.gym.set_actor_dof_properties(env_handle, actor_handle, dof_props)
-            body_props = self.gym.get_actor_rigid_body_properties(env_handle, actor_handle)
-
-            if i == 0:
-                # self.default_com = copy.deepcopy(body_props[0].com)
-                self.default_com_torso = copy.deepcopy(body_props[self.torso_link_index].com)
-                for j in range(len(body_props)):
-                    self.default_rigid_body_mass[j] = body_props[j].mass
+                rigid_shape_props = self._process_rigid_shape_props(rigid_shape_props_asset, i)
+                self.gym.set_asset_rigid_shape_properties(robot_asset, rigid_shape_props)
+                actor_handle = self.gym.create_actor(env_handle, robot_asset, start_pose, self.cfg.asset.name, i, self.cfg.asset.self_collisions, 0)
+                dof_props = self._process_dof_props(dof_props_asset, i)
+                self.gym.set_actor_dof_properties(env_handle, actor_handle, dof_props)
+                body_props = self.gym.get_actor_rigid_body_properties(env_handle, actor_handle)
+
+                if i == 0:
+                    # self.default_com = copy.deepcopy(body_props[0].com)
+                    self.default_com_torso = copy.deepcopy(body_props[self.torso_link_index].com)
+                    self.default_rigid_body_mass[:] = torch.tensor([p.mass for p in body_props], device=self.device)
             
-            body_props = self._process_rigid_body_props(body_props, i)
-            self.gym.set_actor_rigid_body_properties(env_handle, actor_handle, body_props, recomputeInertia=True)
-            self.envs.append(env_handle)
-            self.actor_handles.append(actor_handle)
+                body_props = self._process_rigid_body_props(body_props, i)
+                self.gym.set_actor_rigid_body_properties(env_handle, actor_handle, body_props, recomputeInertia=True)
+                self.envs.append(env_handle)
+                self.actor_handles.append(actor_handle)
 
-        self.feet_indices = torch.zeros(len(feet_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(feet_names)):
-            self.feet_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], feet_names[i])
+        self.feet_indices = self.asset_index.bodies(feet_names)
 
-        self.penalised_contact_indices = torch.zeros(len(penalized_contact_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(penalized_contact_names)):
-            self.penalised_contact_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], penalized_contact_names[i])
+        self.penalised_contact_indices = self.asset_index.bodies(penalized_contact_names)
 
-        self.termination_contact_indices = torch.zeros(len(termination_contact_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(termination_contact_names)):
-            self.termination_contact_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], termination_contact_names[i])
+        self.termination_contact_indices = self.asset_index.bodies(termination_contact_names)
 
         left_shoulder_names = [s for s in body_names if self.cfg.asset.left_shoulder_name in s and 'keyframe' not in s]
         right_shoulder_names = [s for s in body_names if self.cfg.asset.right_shoulder_name in s and 'keyframe' not in s]
-        self.left_shoulder_indices = torch.zeros(len(left_shoulder_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(left_shoulder_names)):
-            self.left_shoulder_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], left_shoulder_names[i])
-        self.right_shoulder_indices = torch.zeros(len(right_shoulder_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(right_shoulder_names)):
-            self.right_shoulder_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], right_shoulder_names[i])
+        self.left_shoulder_indices = self.asset_index.bodies(left_shoulder_names)
+        self.right_shoulder_indices = self.asset_index.bodies(right_shoulder_names)
 
         left_foot_names = [s for s in body_names if self.cfg.asset.left_foot_name in s and 'keyframe' not in s]
         right_foot_names = [s for s in body_names if self.cfg.asset.right_foot_name in s and 'keyframe' not in s]
-        self.left_foot_indices = torch.zeros(len(left_foot_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(left_foot_names)):
-            self.left_foot_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], left_foot_names[i])
+        self.left_foot_indices = self.asset_index.bodies(left_foot_names)
 
-        self.right_foot_indices = torch.zeros(len(right_foot_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(right_foot_names)):
-            self.right_foot_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], right_foot_names[i])
+        self.right_foot_indices = self.asset_index.bodies(right_foot_names)
 
         base_name = [s for s in body_names if self.cfg.asset.base_name in s]
-        self.base_indices = torch.zeros(len(base_name), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(base_name)):
-            self.base_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], base_name[i])
+        self.base_indices = self.asset_index.bodies(base_name)
 
         # import ipdb; ipdb.set_trace()
         left_knee_names = [s for s in body_names if self.cfg.asset.left_knee_name in s and 'keyframe' not in s]
         right_knee_names = [s for s in body_names if self.cfg.asset.right_knee_name in s and 'keyframe' not in s]
-        self.left_knee_indices = torch.zeros(len(left_knee_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(left_knee_names)):
-            self.left_knee_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], left_knee_names[i])
-        self.right_knee_indices = torch.zeros(len(right_knee_names), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(right_knee_names)):
-            self.right_knee_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], right_knee_names[i])
+        self.left_knee_indices = self.asset_index.bodies(left_knee_names)
+        self.right_knee_indices = self.asset_index.bodies(right_knee_names)
         # import ipdb; ipdb.set_trace()
 
 
-        self.knee_joint_indices = torch.zeros(len(self.cfg.asset.knee_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.knee_joints)):
-            self.knee_joint_indices[i] = self.dof_names.index(self.cfg.asset.knee_joints[i])
+        self.knee_joint_indices = self.asset_index.dofs(self.cfg.asset.knee_joints)
 
-        self.ankle_joint_indices = torch.zeros(len(self.cfg.asset.ankle_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.ankle_joints)):
-            self.ankle_joint_indices[i] = self.dof_names.index(self.cfg.asset.ankle_joints[i])
+        self.ankle_joint_indices = self.asset_index.dofs(self.cfg.asset.ankle_joints)
 
-        self.waist_joint_indices = torch.zeros(len(self.cfg.asset.waist_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.waist_joints)):
-            self.waist_joint_indices[i] = self.dof_names.index(self.cfg.asset.waist_joints[i])
+        self.waist_joint_indices = self.asset_index.dofs(self.cfg.asset.waist_joints)
 
         self.keyframe_names = [s for s in body_names if self.cfg.asset.keyframe_name in s]
-        self.keyframe_indices = torch.zeros(len(self.keyframe_names), dtype=torch.long, device=self.device)
-        for i, name in enumerate(self.keyframe_names):
-            self.keyframe_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
+        self.keyframe_indices = self.asset_index.bodies(self.keyframe_names)
 
         self.head_names = [s for s in body_names if self.cfg.asset.head_name in s]
-        self.head_indices = torch.zeros(len(self.head_names), dtype=torch.long, device=self.device)
-        for i, name in enumerate(self.head_names):
-            self.head_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
+        self.head_indices = self.asset_index.bodies(self.head_names)
 
-        self.left_hip_joint_indices = torch.zeros(len(self.cfg.asset.left_hip_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_hip_joints)):
-            self.left_hip_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_hip_joints[i])
+        self.left_hip_joint_indices = self.asset_index.dofs(self.cfg.asset.left_hip_joints)
             
-        self.right_hip_joint_indices = torch.zeros(len(self.cfg.asset.right_hip_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_hip_joints)):
-            self.right_hip_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_hip_joints[i])
+        self.right_hip_joint_indices = self.asset_index.dofs(self.cfg.asset.right_hip_joints)
             
         self.hip_joint_indices = torch.cat((self.left_hip_joint_indices, self.right_hip_joint_indices))
 
-        self.left_hip_roll_joint_indices = torch.zeros(len(self.cfg.asset.left_hip_roll_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_hip_roll_joints)):
-            self.left_hip_roll_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_hip_roll_joints[i])
+        self.left_hip_roll_joint_indices = self.asset_index.dofs(self.cfg.asset.left_hip_roll_joints)
             
-        self.right_hip_roll_joint_indices = torch.zeros(len(self.cfg.asset.right_hip_roll_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_hip_roll_joints)):
-            self.right_hip_roll_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_hip_roll_joints[i])
+        self.right_hip_roll_joint_indices = self.asset_index.dofs(self.cfg.asset.right_hip_roll_joints)
             
         self.hip_roll_joint_indices = torch.cat((self.left_hip_roll_joint_indices, self.right_hip_roll_joint_indices))
 
-        self.left_knee_joint_indices = torch.zeros(len(self.cfg.asset.left_knee_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_knee_joints)):
-            self.left_knee_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_knee_joints[i])
+        self.left_knee_joint_indices = self.asset_index.dofs(self.cfg.asset.left_knee_joints)
             
-        self.right_knee_joint_indices = torch.zeros(len(self.cfg.asset.right_knee_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_knee_joints)):
-            self.right_knee_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_knee_joints[i])
+        self.right_knee_joint_indices = self.asset_index.dofs(self.cfg.asset.right_knee_joints)
 
 
-        self.left_hip_pitch_joint_indices = torch.zeros(len(self.cfg.asset.left_hip_pitch_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_hip_pitch_joints)):
-            self.left_hip_pitch_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_hip_pitch_joints[i])
+        self.left_hip_pitch_joint_indices = self.asset_index.dofs(self.cfg.asset.left_hip_pitch_joints)
             
-        self.right_hip_pitch_joint_indices = torch.zeros(len(self.cfg.asset.right_hip_pitch_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_hip_pitch_joints)):
-            self.right_hip_pitch_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_hip_pitch_joints[i])
+        self.right_hip_pitch_joint_indices = self.asset_index.dofs(self.cfg.asset.right_hip_pitch_joints)
             
         self.hip_pitch_joint_indices = torch.cat((self.left_hip_pitch_joint_indices, self.right_hip_pitch_joint_indices))
         self.all_hip_joint_indices = torch.cat([self.hip_pitch_joint_indices, self.hip_roll_joint_indices, self.hip_joint_indices])
 
-        self.left_shoulder_roll_joint_indices = torch.zeros(len(self.cfg.asset.left_shoulder_roll_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_shoulder_roll_joints)):
-            self.left_shoulder_roll_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_shoulder_roll_joints[i])
+        self.left_shoulder_roll_joint_indices = self.asset_index.dofs(self.cfg.asset.left_shoulder_roll_joints)
             
-        self.right_shoulder_roll_joint_indices = torch.zeros(len(self.cfg.asset.right_shoulder_roll_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_shoulder_roll_joints)):
-            self.right_shoulder_roll_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_shoulder_roll_joints[i])
+        self.right_shoulder_roll_joint_indices = self.asset_index.dofs(self.cfg.asset.right_shoulder_roll_joints)
 
         self.shoulder_roll_joint_indices = torch.cat((self.left_shoulder_roll_joint_indices, self.right_shoulder_roll_joint_indices))
 
 
-        self.left_arm_joint_indices = torch.zeros(len(self.cfg.asset.left_arm_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.left_arm_joints)):
-            self.left_arm_joint_indices[i] = self.dof_names.index(self.cfg.asset.left_arm_joints[i])
+        self.left_arm_joint_indices = self.asset_index.dofs(self.cfg.asset.left_arm_joints)
             
-        self.right_arm_joint_indices = torch.zeros(len(self.cfg.asset.right_arm_joints), dtype=torch.long, device=self.device, requires_grad=False)
-        for i in range(len(self.cfg.asset.right_arm_joints)):
-            self.right_arm_joint_indices[i] = self.dof_names.index(self.cfg.asset.right_arm_joints[i])
+        self.right_arm_joint_indices = self.asset_index.dofs(self.cfg.asset.right_arm_joints)
 
         # import ipdb; ipdb.set_trace()
         self.upper_body_joint_indices = torch.cat([self.right_arm_joint_indices, self.left_arm_joint_indices, self.waist_joint_indices])
         self.lower_body_joint_indices = torch.cat([self.all_hip_joint_indices, self.knee_joint_indices, self.ankle_joint_indices])
 
         # tracking bodies
-        tracking_body_names = []
-        for target_name in self.cfg.asset.tracking_body_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name and 'aux' not in source_name:
-                    tracking_body_names.append(source_name)
-        self.tracking_body_indices = torch.zeros(len(tracking_body_names), dtype=torch.long, device=self.device)
+        tracking_body_names = self.asset_index.match_bodies(self.cfg.asset.tracking_body_names, exclude=('keyframe', 'aux'))
+        self.tracking_body_indices = self.asset_index.bodies(tracking_body_names)
         self.tracking_body_names = tracking_body_names
-        for i, name in enumerate(tracking_body_names):
-            self.tracking_body_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
-
-        left_upper_body_names = []
-        for target_name in self.cfg.asset.left_upper_body_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name and 'aux' not in source_name:
-                    left_upper_body_names.append(source_name)
-        self.left_upper_body_indices = torch.zeros(len(left_upper_body_names), dtype=torch.long, device=self.device)
+
+        left_upper_body_names = self.asset_index.match_bodies(self.cfg.asset.left_upper_body_names, exclude=('keyframe', 'aux'))
+        self.left_upper_body_indices = self.asset_index.bodies(left_upper_body_names)
         self.left_upper_body_names = left_upper_body_names
-        for i, name in enumerate(left_upper_body_names):
-            self.left_upper_body_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
         
-        right_upper_body_names = []
-        for target_name in self.cfg.asset.right_upper_body_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name and 'aux' not in source_name:
-                    right_upper_body_names.append(source_name)
-        self.right_upper_body_indices = torch.zeros(len(right_upper_body_names), dtype=torch.long, device=self.device)
+        right_upper_body_names = self.asset_index.match_bodies(self.cfg.asset.right_upper_body_names, exclude=('keyframe', 'aux'))
+        self.right_upper_body_indices = self.asset_index.bodies(right_upper_body_names)
         self.right_upper_body_names = right_upper_body_names
-        for i, name in enumerate(right_upper_body_names):
-            self.right_upper_body_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
-
-        left_lower_body_names = []
-        for target_name in self.cfg.asset.left_lower_body_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name and 'aux' not in source_name:
-                    left_lower_body_names.append(source_name)
-        self.left_lower_body_indices = torch.zeros(len(left_lower_body_names), dtype=torch.long, device=self.device)
+
+        left_lower_body_names = self.asset_index.match_bodies(self.cfg.asset.left_lower_body_names, exclude=('keyframe', 'aux'))
+        self.left_lower_body_indices = self.asset_index.bodies(left_lower_body_names)
         self.left_lower_body_names = left_lower_body_names
-        for i, name in enumerate(left_lower_body_names):
-            self.left_lower_body_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
-
-        right_lower_body_names = []
-        for target_name in self.cfg.asset.right_lower_body_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name and 'aux' not in source_name:
-                    right_lower_body_names.append(source_name)
-        self.right_lower_body_indices = torch.zeros(len(right_lower_body_names), dtype=torch.long, device=self.device)
+
+        right_lower_body_names = self.asset_index.match_bodies(self.cfg.asset.right_lower_body_names, exclude=('keyframe', 'aux'))
+        self.right_lower_body_indices = self.asset_index.bodies(right_lower_body_names)
         self.right_lower_body_names = right_lower_body_names
-        for i, name in enumerate(right_lower_body_names):
-            self.right_lower_body_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
-
-        left_ankle_names = []
-        for target_name in self.cfg.asset.left_ankle_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name:
-                    left_ankle_names.append(source_name)
-        self.left_ankle_indices = torch.zeros(len(left_ankle_names), dtype=torch.long, device=self.device)
+
+        left_ankle_names = self.asset_index.match_bodies(self.cfg.asset.left_ankle_names, exclude=('keyframe',))
+        self.left_ankle_indices = self.asset_index.bodies(left_ankle_names)
         self.left_ankle_names = left_ankle_names
-        for i, name in enumerate(left_ankle_names):
-            self.left_ankle_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
-
-        right_ankle_names = []
-        for target_name in self.cfg.asset.right_ankle_names:
-            for source_name in body_names:
-                if target_name in source_name and 'keyframe' not in source_name:
-                    right_ankle_names.append(source_name)
-        self.right_ankle_indices = torch.zeros(len(right_ankle_names), dtype=torch.long, device=self.device)
+
+        right_ankle_names = self.asset_index.match_bodies(self.cfg.asset.right_ankle_names, exclude=('keyframe',))
+        self.right_ankle_indices = self.asset_index.bodies(right_ankle_names)
         self.right_ankle_names = right_ankle_names
-        for i, name in enumerate(right_ankle_names):
-            self.right_ankle_indices[i] = self.gym.find_actor_rigid_body_handle(self.envs[0], self.actor_handles[0], name)
 
 
     def _get_env_origins(self):
@@ -10,6 +10,9 @@ class LeggedRobotCfg(BaseConfig):
         send_timeouts = True # send time out information to the algorithm
         episode_length_s = 20 # episode length in seconds
         test = False
+        posture_bank = False # reset into settled postures simulated once and cached on disk instead of simulating the unactuated fall
+        posture_bank_size = 20000 # number of settled postures (split between the envs on terrains)
+        posture_bank_dir = None # cache directory, None for <LEGGED_GYM_ROOT_DIR>/logs/posture_bank
 
     class terrain:
         mesh_type = 'plane' # "heightfield" # none, plane, heightfield or trimesh
@@ -35,6 +38,11 @@ class LeggedRobotCfg(BaseConfig):
         terrain_proportions = [0.1, 0.1, 0.35, 0.25, 0.2]
         # trimesh only:
         slope_treshold = 0.75 # slopes above this threshold will be corrected to vertical surfaces
+        simplify = False # merge the coplanar cells of the mesh
+        simplify_tolerance = 0.005 # [m] maximum height change of the simplified surface
+        simplify_max_block = 64 # side of the largest merged square in cells, a power of 2
+        cache = True # store the generated terrain keyed by a hash of this config and the seed, not used for seed -1
+        cache_dir = None # cache directory, None for <LEGGED_GYM_ROOT_DIR>/logs/terrain_cache
 
     class commands:
         curriculum = False
@@ -117,6 +125,7 @@ class LeggedRobotCfg(BaseConfig):
             stand_still = -0.
 
         only_positive_rewards = False # if true negative total rewards are clipped at zero (avoids early termination problems)
+        jit_reward_reduction = False # reduce the reward term matrix into the reward groups with TorchScript
         tracking_sigma = 0.25 # tracking reward = exp(-error^2/sigma)
         soft_dof_pos_limit = 1. # percentage of urdf limits, values above this limit are penalized
         soft_dof_vel_limit = 1.
@@ -197,15 +206,28 @@ class LeggedRobotCfgPPO(BaseConfig):
         lam = 0.95
         desired_kl = 0.01
         max_grad_norm = 1.
+        compile_gae = False # run the GAE time scan through TorchScript
+        storage_dtype = 'float32' # dtype of stored observations and action statistics: float32, float16 or bfloat16
+        fused_forward = True # one batched actor and critic pass per mini batch for the PPO and smoothness losses
+        log_action_smoothness = False # extra actor pass on the next observations, diagnostic only
 
     class runner:
         policy_class_name = 'ActorCritic'
         algorithm_class_name = 'PPO'
         num_steps_per_env = 50 # per iteration
         max_iterations = 50000 # number of policy updates
+        dedup_obs_history = False # store one observation frame per step instead of the full actor history, the env must keep the history on reset
+        pipeline = False # collect the next rollout with a copy of the previous policy while PPO updates on the last one (two storage buffers)
 
         # logging
         save_interval = 500 # check for potential saves every this many iterations
+        async_save = True # snapshot checkpoints to the CPU and write them from a background thread
+        keep_last_checkpoints = 0 # number of periodic checkpoints kept in the log dir, 0 keeps all
+        best_checkpoint_metric = 'mean_reward' # also keep the checkpoint with the highest value of this metric as best.pt, None to disable
+        save_on_signal = True # on SIGUSR1 save the training state at the end of the iteration, on SIGTERM also stop the run
+        profile = False # time the named phases of the rollout and update and log them to TensorBoard (synchronizes the device at every scope)
+        profile_trace_start = -1 # iteration from which a torch.profiler Chrome trace is written to the log dir, -1 to disable
+        profile_trace_iterations = 3 # number of iterations in the trace
         experiment_name = 'test'
         run_name = ''
         # load and resume
@@ -115,6 +115,9 @@ class G1Cfg( LeggedRobotCfg ):
         terrain_proportions = [0, 0., 1, 0, 0]
         # trimesh only:
         slope_treshold = 0.75 # slopes above this threshold will be corrected to vertical surfaces
+        simplify = True # merge the coplanar cells of the mesh
+        simplify_tolerance = 0.005 # [m] maximum height change of the simplified surface
+        simplify_max_block = 64 # side of the largest merged square in cells, a power of 2
         difficulty = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
 
     class asset( LeggedRobotCfg.asset ):
@@ -116,6 +116,9 @@ class G1Cfg( LeggedRobotCfg ):
         terrain_proportions = [1, 0, 0, 0, 0]
         # trimesh only:
         slope_treshold = 0.75 # slopes above this threshold will be corrected to vertical surfaces
+        simplify = True # merge the coplanar cells of the mesh
+        simplify_tolerance = 0.005 # [m] maximum height change of the simplified surface
+        simplify_max_block = 64 # side of the largest merged square in cells, a power of 2
         difficulty = [0.02, 0.04, 0.06, 0.08, 0.1, 0.12, 0.14, 0.16, 0.18, 0.2, 0.26]
 
 
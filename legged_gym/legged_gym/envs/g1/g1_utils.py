@@ -261,6 +261,6 @@ def tolerance(x, bounds=(0.0, 0.0), margin=0.0, value_at_margin=0.1):
         value = torch.where(in_bounds, 1.0, 0)
     else:
         d = torch.where(x < lower, lower - x, x - upper) / margin
-        value = torch.where(in_bounds, 1.0, sigmoid(d.double(), value_at_margin))
+        value = torch.where(in_bounds, 1.0, sigmoid(d, value_at_margin))
     
     return value
\ No newline at end of file
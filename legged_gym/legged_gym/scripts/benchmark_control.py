@@ -0,0 +1,94 @@
+""" Checks the DelayLine / PDController substep against the previous implementation of _compute_torques
+    and measures the time per control substep.
+
+    python legged_gym/scripts/benchmark_control.py --num_envs 4096 --sim_device cuda:0
+"""
+
+import argparse
+import time
+
+import isaacgym
+import torch
+
+from legged_gym.utils.pd_controller import DelayLine, PDController
+
+
+def reference_substep(state, actions, delay_buffer):
+    # previous implementation of LeggedRobot._compute_torques with delay and P control
+    actions_scaled = actions * state['action_rescale']
+    delay_buffer = torch.concat((delay_buffer[1:], actions_scaled.unsqueeze(0)), dim=0)
+    joint_pos_target = state['dof_pos'] + delay_buffer[state['delay_idx'], torch.arange(len(state['delay_idx'])), :]
+    torques = state['p_gains'] * state['Kp_factors'] * (joint_pos_target - state['dof_pos']) - state['d_gains'] * state['Kd_factors'] * state['dof_vel']
+    torques = state['motor_strength'] * torques + state['actuation_offset']
+    return torch.clip(torques, -state['torque_limits'], state['torque_limits']), delay_buffer
+
+def substep(state, actions, delay_line, pd_controller, joint_pos_target):
+    actions_scaled = delay_line.next_slot()
+    torch.mul(actions, state['action_rescale'], out=actions_scaled)
+    torch.add(state['dof_pos'], delay_line.read(state['delay_idx']), out=joint_pos_target)
+    pd_controller.position(joint_pos_target, state['dof_pos'], state['dof_vel'], state['p_gains'], state['d_gains'], state['Kp_factors'], state['Kd_factors'])
+    return pd_controller.actuate(state['motor_strength'], state['actuation_offset'])
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_dofs', type=int, default=23)
+    parser.add_argument('--max_delay', type=int, default=5)
+    parser.add_argument('--num_steps', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--sim_device', type=str, default='cpu')
+    args = parser.parse_args()
+    device, n, d = args.sim_device, args.num_envs, args.num_dofs
+
+    torch.manual_seed(0)
+    state = {
+        'action_rescale': 0.25 + torch.rand(n, 1, device=device),
+        'dof_pos': torch.randn(n, d, device=device),
+        'dof_vel': torch.randn(n, d, device=device),
+        'delay_idx': torch.randint(0, args.max_delay, (n,), device=device),
+        'p_gains': 100. * torch.rand(d, device=device),
+        'd_gains': 5. * torch.rand(d, device=device),
+        'Kp_factors': 0.8 + 0.4 * torch.rand(n, d, device=device),
+        'Kd_factors': 0.8 + 0.4 * torch.rand(n, d, device=device),
+        'motor_strength': 0.9 + 0.2 * torch.rand(n, d, device=device),
+        'actuation_offset': 0.1 * torch.randn(n, d, device=device),
+        'torque_limits': 20. + 80. * torch.rand(d, device=device),
+    }
+    delay_buffer = torch.zeros(args.max_delay, n, d, device=device)
+    delay_line = DelayLine(args.max_delay, n, d, device)
+    pd_controller = PDController(n, d, state['torque_limits'], device)
+    joint_pos_target = torch.zeros(n, d, device=device)
+
+    for step in range(args.num_steps):
+        actions = torch.randn(n, d, device=device)
+        ref_torques, delay_buffer = reference_substep(state, actions, delay_buffer)
+        torques = substep(state, actions, delay_line, pd_controller, joint_pos_target)
+        assert torch.allclose(torques, ref_torques, rtol=1e-5, atol=1e-4), "torques mismatch at substep {}".format(step)
+        if step == args.num_steps // 2:
+            env_ids = torch.arange(0, n, 7, device=device)
+            delay_buffer[:, env_ids, :] = 0.
+            delay_line.reset(env_ids)
+    print("Torques match the previous implementation.")
+
+    actions = torch.randn(n, d, device=device)
+    buffers = [delay_buffer]
+    def run_reference():
+        _, buffers[0] = reference_substep(state, actions, buffers[0])
+    ref_us = timeit(run_reference, args.repeats, device)
+    new_us = timeit(lambda: substep(state, actions, delay_line, pd_controller, joint_pos_target), args.repeats, device)
+    print(f"{'previous:':>10} {ref_us:8.1f} us/substep")
+    print(f"{'in place:':>10} {new_us:8.1f} us/substep ({ref_us / new_us:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+""" Checks that the counter based DomainRandSampler regenerates the randomization of an episode independently of the
+    envs reset with it, that the values respect the ranges of the parameter table, and measures the time per reset
+    against the separate torch_rand_float draws on the global generator.
+
+    python legged_gym/scripts/check_domain_rand.py --num_envs 4096 --sim_device cuda:0
+"""
+
+import argparse
+import time
+
+import isaacgym
+import torch
+
+from legged_gym.utils.domain_rand import DRParam, DomainRandSampler
+from legged_gym.utils.math import torch_rand_float
+
+
+def make_params(num_dofs, max_delay, torque_limits):
+    return [
+        DRParam('Kp_factors', 0.85, 1.15, size=num_dofs),
+        DRParam('Kd_factors', 0.85, 1.15, size=num_dofs),
+        DRParam('actuation_offset', -0.05, 0.05, size=num_dofs, scale=torque_limits),
+        DRParam('motor_strength', 0.9, 1.1, size=num_dofs),
+        DRParam('delay_idx', 0, max_delay, integer=True),
+    ]
+
+def reference_reset(env_ids, num_dofs, max_delay, torque_limits, device):
+    # previous reset_idx draws, one call per randomized quantity
+    n = len(env_ids)
+    return {
+        'Kp_factors': torch_rand_float(0.85, 1.15, (n, num_dofs), device=device),
+        'Kd_factors': torch_rand_float(0.85, 1.15, (n, num_dofs), device=device),
+        'actuation_offset': torch_rand_float(-0.05, 0.05, (n, num_dofs), device=device) * torque_limits.unsqueeze(0),
+        'motor_strength': torch_rand_float(0.9, 1.1, (n, num_dofs), device=device),
+        'delay_idx': torch.randint(low=0, high=max_delay, size=(n,), device=device),
+    }
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_dofs', type=int, default=23)
+    parser.add_argument('--max_delay', type=int, default=5)
+    parser.add_argument('--reset_fraction', type=float, default=0.02, help='fraction of the envs reset per step in the timing')
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--sim_device', type=str, default='cpu')
+    args = parser.parse_args()
+    device, n, d = args.sim_device, args.num_envs, args.num_dofs
+
+    torque_limits = 20. + 80. * torch.rand(d, device=device)
+    params = make_params(d, args.max_delay, torque_limits)
+    sampler = DomainRandSampler(params, 1, device)
+    all_env_ids = torch.arange(n, device=device)
+    episode_idx = torch.randint(0, 1000, (n,), device=device)
+    full = sampler.sample(all_env_ids, episode_idx)
+
+    # the draw of an env does not depend on the batch it is reset with, nor on its position in the batch
+    subset = torch.randperm(n, device=device)[:n // 3]
+    partial = sampler.sample(subset, episode_idx[subset])
+    single = sampler.sample(subset[:1], int(episode_idx[subset[0]]))
+    for name in full:
+        assert torch.equal(partial[name], full[name][subset]), "{} depends on the reset batch".format(name)
+        assert torch.equal(single[name], full[name][subset[:1]]), "{} of a single episode is not regenerated".format(name)
+    assert torch.equal(sampler.sample(all_env_ids, episode_idx)['Kp_factors'], full['Kp_factors'])
+
+    # other episodes, seeds and streams give other values
+    for other in (sampler.sample(all_env_ids, episode_idx + 1), DomainRandSampler(params, 2, device).sample(all_env_ids, episode_idx),
+                  DomainRandSampler(params, 1, device, stream=1).sample(all_env_ids, episode_idx)):
+        assert (other['Kp_factors'] != full['Kp_factors']).float().mean() > 0.99
+
+    # ranges and moments of the table
+    for param in params:
+        value = full[param.name].float()
+        scale = param.scale if param.scale is not None else 1.
+        low, high = param.low * scale, param.high * scale
+        assert ((value >= low) & (value < high)).all() if param.integer else ((value >= low - 1e-6) & (value <= high + 1e-6)).all(), param.name
+        if param.integer:
+            assert full[param.name].dtype == torch.long
+            counts = torch.bincount(full[param.name], minlength=args.max_delay).float() / n
+            assert (counts - 1. / args.max_delay).abs().max() < 0.05, "delay_idx is not uniform: {}".format(counts.tolist())
+        else:
+            unit = ((value - low) / (high - low)).flatten()
+            assert abs(unit.mean().item() - 0.5) < 0.01 and abs(unit.var().item() - 1. / 12) < 0.005, param.name
+    print("Counter based draws are reproducible per env and episode and respect the parameter table.")
+
+    reset_ids = torch.randperm(n, device=device)[:max(int(n * args.reset_fraction), 1)]
+    ref_us = timeit(lambda: reference_reset(reset_ids, d, args.max_delay, torque_limits, device), args.repeats, device)
+    new_us = timeit(lambda: sampler.sample(reset_ids, episode_idx[reset_ids]), args.repeats, device)
+    print(f"{'separate draws:':>16} {ref_us:8.1f} us/reset of {len(reset_ids)} envs")
+    print(f"{'sampler:':>16} {new_us:8.1f} us/reset of {len(reset_ids)} envs ({ref_us / new_us:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+""" Builds a task and checks the bulk env construction: every index group resolved from the asset names matches the
+    body handles of the gym API, and the randomized shape and body properties of a sample of envs were applied.
+    The env prints the timing report of its startup phases.
+
+    python legged_gym/scripts/check_env_construction.py --task g1_ground --headless --num_envs 4096
+"""
+
+import isaacgym
+from legged_gym.envs import *
+from legged_gym.utils import get_args, task_registry
+
+import numpy as np
+import torch
+
+
+def check_index_groups(env):
+    num_groups = 0
+    for name, value in vars(env).items():
+        if not name.endswith('_indices') or not isinstance(value, torch.Tensor):
+            continue
+        names = getattr(env, name[:-len('_indices')] + '_names', None)
+        if isinstance(names, list) and len(names) == len(value):
+            handles = [env.gym.find_actor_rigid_body_handle(env.envs[0], env.actor_handles[0], n) for n in names]
+            assert value.tolist() == handles, "{} does not match the body handles".format(name)
+        num_groups += 1
+    for i, name in enumerate(env.dof_names):
+        assert env.gym.find_actor_dof_handle(env.envs[0], env.actor_handles[0], name) == i
+    return num_groups
+
+def check_properties(env, num_samples=16):
+    cfg = env.cfg.domain_rand
+    for env_id in np.linspace(0, env.num_envs - 1, num_samples).astype(int):
+        env_handle, actor_handle = env.envs[env_id], env.actor_handles[env_id]
+        shape_props = env.gym.get_actor_rigid_shape_properties(env_handle, actor_handle)
+        if cfg.randomize_friction:
+            assert all(abs(p.friction - env.friction_coeffs[env_id, 0].item()) < 1e-5 for p in shape_props)
+        if cfg.randomize_restitution:
+            assert all(abs(p.restitution - env.restitution_coeffs[env_id, 0].item()) < 1e-5 for p in shape_props)
+        body_props = env.gym.get_actor_rigid_body_properties(env_handle, actor_handle)
+        if cfg.randomize_payload_mass and not getattr(cfg, 'randomize_link_mass', False):
+            expected = env.default_rigid_body_mass[env.torso_link_index].item() + env.payload[env_id, 0].item()
+            assert abs(body_props[env.torso_link_index].mass - expected) < 1e-4
+        if cfg.randomize_com_displacement:
+            com = body_props[env.torso_link_index].com
+            expected = np.array([env.default_com_torso.x, env.default_com_torso.y, env.default_com_torso.z]) + env.com_displacement[env_id].cpu().numpy()
+            assert np.allclose([com.x, com.y, com.z], expected, atol=1e-5)
+
+def main(args):
+    env, _ = task_registry.make_env(name=args.task, args=args)
+    num_groups = check_index_groups(env)
+    check_properties(env)
+    print("{} index groups and the randomized properties of the envs match the gym API.".format(num_groups))
+
+if __name__ == '__main__':
+    main(get_args())
@@ -0,0 +1,129 @@
+""" Checks the RewardEngine against the previous per-term compute_reward loop (group rewards and per-term episode sums),
+    checks the float32 tolerance() against the previous float64 version and reports the time per reward computation.
+
+    python legged_gym/scripts/check_reward_engine.py --num_envs 4096 --sim_device cuda:0
+"""
+
+import argparse
+import time
+
+import isaacgym
+import numpy as np
+import torch
+
+from legged_gym.envs.g1.g1_utils import tolerance, sigmoid
+from legged_gym.utils.reward_engine import RewardEngine
+
+REWARD_GROUPS = ['task', 'regu', 'style', 'target']
+
+
+def reference_compute_reward(rew_buf, episode_sums, reward_terms, constraint_terms, only_positive_rewards):
+    # previous implementation of LeggedRobot.compute_reward
+    rew_buf[:, :] = 0
+    task_group_index = REWARD_GROUPS.index('task')
+    rew_buf[:, task_group_index] = 1
+    for name, function, scale in reward_terms:
+        rew = function() * scale
+        if len(rew.shape) == 2 and rew.shape[1] == 1:
+            rew = rew.squeeze(1)
+        rew_buf[:, task_group_index] *= rew
+        episode_sums[name] += rew
+    for name, function, scale in constraint_terms:
+        rew = function() * scale
+        group_index = REWARD_GROUPS.index(name.split('_')[0])
+        rew_buf[:, group_index] += rew
+        episode_sums[name] += rew
+        if only_positive_rewards:
+            rew_buf[:, group_index] = torch.clip(rew_buf[:, group_index], min=0.)
+
+def reference_tolerance(x, bounds, margin, value_at_margin):
+    # previous implementation of g1_utils.tolerance, evaluated in float64
+    lower, upper = bounds
+    in_bounds = torch.logical_and(lower <= x, x <= upper)
+    d = torch.where(x < lower, lower - x, x - upper) / margin
+    return torch.where(in_bounds, 1.0, sigmoid(d.double(), value_at_margin))
+
+def make_terms(num_envs, device, num_task_terms, num_constraint_terms):
+    values = {}
+    def term(name, shape, low, high):
+        values[name] = low + (high - low) * torch.rand(shape, device=device)
+        return lambda: values[name]
+    reward_terms = [('task_{}'.format(i), term('task_{}'.format(i), (num_envs, 1) if i % 2 else (num_envs,), 0., 1.), 1.)
+                    for i in range(num_task_terms)]
+    # interleave the constraint groups to exercise the column sorting of the engine
+    constraint_terms = []
+    for i in range(num_constraint_terms):
+        name = '{}_{}'.format(REWARD_GROUPS[1 + i % 3], i)
+        constraint_terms.append((name, term(name, (num_envs,), -1., 1.), float(np.random.uniform(-10., 10.))))
+    return reward_terms, constraint_terms, values
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_task_terms', type=int, default=2)
+    parser.add_argument('--num_constraint_terms', type=int, default=33)
+    parser.add_argument('--num_steps', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=100)
+    parser.add_argument('--sim_device', type=str, default='cpu')
+    args = parser.parse_args()
+    device, num_envs = args.sim_device, args.num_envs
+
+    torch.manual_seed(0)
+    np.random.seed(0)
+    for only_positive_rewards in [False, True]:
+        for use_jit in [False, True]:
+            reward_terms, constraint_terms, values = make_terms(num_envs, device, args.num_task_terms, args.num_constraint_terms)
+            engine = RewardEngine(REWARD_GROUPS, num_envs, device, only_positive_rewards=only_positive_rewards, use_jit=use_jit)
+            for name, function, scale in reward_terms:
+                engine.add_term(name, function, scale, 'task')
+            for name, function, scale in constraint_terms:
+                engine.add_term(name, function, scale, name.split('_')[0])
+            engine.finalize()
+
+            ref_rew_buf = torch.zeros(num_envs, len(REWARD_GROUPS), device=device)
+            rew_buf = torch.zeros(num_envs, len(REWARD_GROUPS), device=device)
+            ref_episode_sums = {name: torch.zeros(num_envs, device=device) for name, _, _ in reward_terms + constraint_terms}
+            for step in range(args.num_steps):
+                for name in values:
+                    values[name].uniform_(0. if name.startswith('task') else -1., 1.)
+                reference_compute_reward(ref_rew_buf, ref_episode_sums, reward_terms, constraint_terms, only_positive_rewards)
+                engine.compute(rew_buf)
+                assert torch.allclose(rew_buf, ref_rew_buf, rtol=1e-5, atol=1e-4), \
+                    "group rewards mismatch (only_positive_rewards={}, jit={})".format(only_positive_rewards, use_jit)
+                for name, ref_sum in ref_episode_sums.items():
+                    assert torch.allclose(engine.episode_sum(name), ref_sum, rtol=1e-5, atol=1e-4), "episode sum mismatch for {}".format(name)
+    print("Group rewards and per-term episode sums match the previous implementation.")
+
+    x = 4. * torch.randn(num_envs, device=device)
+    assert torch.allclose(tolerance(x, (-1., 1.), 2., 0.1), reference_tolerance(x, (-1., 1.), 2., 0.1).float(), atol=1e-6), "tolerance mismatch"
+    assert tolerance(x, (-1., 1.), 2., 0.1).dtype == torch.float, "tolerance is not evaluated in float32"
+    print("float32 tolerance matches the float64 version.")
+
+    reward_terms, constraint_terms, values = make_terms(num_envs, device, args.num_task_terms, args.num_constraint_terms)
+    ref_rew_buf = torch.zeros(num_envs, len(REWARD_GROUPS), device=device)
+    ref_episode_sums = {name: torch.zeros(num_envs, device=device) for name, _, _ in reward_terms + constraint_terms}
+    def timeit(fn):
+        fn()
+        if 'cuda' in device:
+            torch.cuda.synchronize()
+        start = time.time()
+        for _ in range(args.repeats):
+            fn()
+        if 'cuda' in device:
+            torch.cuda.synchronize()
+        return (time.time() - start) / args.repeats * 1e3
+    ref_ms = timeit(lambda: reference_compute_reward(ref_rew_buf, ref_episode_sums, reward_terms, constraint_terms, False))
+    print(f"{'previous:':>10} {ref_ms:7.3f} ms")
+    for use_jit in [False, True]:
+        engine = RewardEngine(REWARD_GROUPS, num_envs, device, use_jit=use_jit)
+        for name, function, scale in reward_terms:
+            engine.add_term(name, function, scale, 'task')
+        for name, function, scale in constraint_terms:
+            engine.add_term(name, function, scale, name.split('_')[0])
+        engine.finalize()
+        rew_buf = torch.zeros(num_envs, len(REWARD_GROUPS), device=device)
+        engine_ms = timeit(lambda: engine.compute(rew_buf))
+        print(f"{'jit:' if use_jit else 'engine:':>10} {engine_ms:7.3f} ms ({ref_ms / engine_ms:.1f}x)")
+
+if __name__ == '__main__':
+    main()
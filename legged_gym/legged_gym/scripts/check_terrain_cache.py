@@ -0,0 +1,57 @@
+""" Generates the terrain of a task into an empty cache directory, loads it back from the cache and checks that the
+    arrays are identical, that the loaded heightfield and mesh are memory mapped and that the global numpy generator
+    is in the same state after both paths. Prints the time of the generation and of the load.
+
+    python legged_gym/scripts/check_terrain_cache.py --task g1_wall
+"""
+
+import isaacgym
+from legged_gym.envs import *
+from legged_gym.utils import get_args, task_registry
+from legged_gym.utils.terrain_cache import TERRAIN_ARRAYS, MAPPED_ARRAYS
+
+import copy
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def build(terrain_class, terrain_cfg, num_envs, seed):
+    # selected terrains pop their type from the config, every build gets its own copy
+    np.random.seed(0)
+    start = time.time()
+    terrain = terrain_class(copy.deepcopy(terrain_cfg), num_envs, seed=seed)
+    return terrain, time.time() - start, np.random.random()
+
+def main(args):
+    env_cfg, _ = task_registry.get_cfgs(name=args.task)
+    terrain_class = sys.modules[task_registry.get_task_class(args.task).__module__].Terrain
+    seed = env_cfg.seed if env_cfg.seed != -1 else 1
+    if env_cfg.terrain.mesh_type in ['none', 'plane']:
+        print("The terrain of {} is a {}, nothing is generated.".format(args.task, env_cfg.terrain.mesh_type))
+        return
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env_cfg.terrain.cache = True
+        env_cfg.terrain.cache_dir = cache_dir
+        generated, generate_time, generated_draw = build(terrain_class, env_cfg.terrain, env_cfg.env.num_envs, seed)
+        loaded, load_time, loaded_draw = build(terrain_class, env_cfg.terrain, env_cfg.env.num_envs, seed)
+
+        names = [name for name in TERRAIN_ARRAYS if hasattr(generated, name)]
+        for name in names:
+            assert np.array_equal(getattr(generated, name), getattr(loaded, name)), "{} differs after the load".format(name)
+            if name in MAPPED_ARRAYS:
+                assert isinstance(getattr(loaded, name), np.memmap), "{} is not memory mapped".format(name)
+        assert generated_draw == loaded_draw, "the terrain generation changed the global numpy generator"
+
+        env_cfg.terrain.cache = False
+        regenerated, _, _ = build(terrain_class, env_cfg.terrain, env_cfg.env.num_envs, seed)
+        assert np.array_equal(regenerated.height_field_raw, generated.height_field_raw), "the terrain is not reproducible from the seed"
+
+    print("Cached terrain matches the generated one ({}).".format(', '.join(names)))
+    print(f"{'generate:':>10} {generate_time:8.2f} s")
+    print(f"{'load:':>10} {load_time:8.2f} s ({generate_time / max(load_time, 1e-9):.0f}x)")
+
+if __name__ == '__main__':
+    main(get_args())
@@ -0,0 +1,128 @@
+""" Checks that the mesh simplification changes the height of the surface by at most simplify_tolerance and leaves
+    no cracks, first on a small heightfield built to defeat the merge test (single step bumps next to the corners and
+    on the edges of the blocks, ramps, walls and noise) on a dense grid of points, then on the trimesh terrain of a
+    task at random points. Prints the triangle counts of both meshes of the task.
+
+    python legged_gym/scripts/check_terrain_mesh.py --task g1_wall
+"""
+
+import isaacgym
+from isaacgym import terrain_utils
+from legged_gym.envs import *
+from legged_gym.utils import get_args, task_registry
+from legged_gym.utils.terrain_mesh import simplify_heightfield_trimesh
+
+import copy
+import sys
+import time
+
+import numpy as np
+
+
+def build(terrain_class, terrain_cfg, num_envs, seed, simplify):
+    cfg = copy.deepcopy(terrain_cfg)
+    cfg.cache = False
+    cfg.simplify = simplify
+    start = time.time()
+    terrain = terrain_class(cfg, num_envs, seed=seed)
+    return terrain, time.time() - start
+
+def surface_heights(vertices, triangles, points, bucket):
+    """ Lowest and highest height of the triangles of the mesh containing each point, found among the triangles whose
+        centroid is in a neighbouring bucket. They differ where the mesh has a crack.
+    """
+    corners = vertices[triangles].astype(np.float64)
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    det = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+    # vertical triangles of the slope correction have no area seen from above
+    flat = np.abs(det) > 1e-12
+    a, b, c, det = a[flat], b[flat], c[flat], det[flat]
+    keys = np.floor((a[:, :2] + b[:, :2] + c[:, :2]) / 3. / bucket).astype(np.int64)
+    num_keys = keys[:, 1].max() + 3
+    key = (keys[:, 0] + 1) * num_keys + keys[:, 1] + 1
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+
+    low, high = np.full(len(points), np.nan), np.full(len(points), np.nan)
+    for n, (x, y) in enumerate(points):
+        i, j = int(np.floor(x / bucket)), int(np.floor(y / bucket))
+        ids = np.concatenate([order[np.searchsorted(key, k, 'left'):np.searchsorted(key, k, 'right')]
+                              for di in (-1, 0, 1) for dj in (-1, 0, 1) for k in [(i + 1 + di) * num_keys + j + 1 + dj]])
+        u = ((x - a[ids, 0]) * (c[ids, 1] - a[ids, 1]) - (c[ids, 0] - a[ids, 0]) * (y - a[ids, 1])) / det[ids]
+        v = ((b[ids, 0] - a[ids, 0]) * (y - a[ids, 1]) - (x - a[ids, 0]) * (b[ids, 1] - a[ids, 1])) / det[ids]
+        inside = (u >= -1e-9) & (v >= -1e-9) & (u + v <= 1 + 1e-9)
+        if inside.any():
+            k, u, v = ids[inside], u[inside], v[inside]
+            heights = a[k, 2] + u * (b[k, 2] - a[k, 2]) + v * (c[k, 2] - a[k, 2])
+            low[n], high[n] = heights.min(), heights.max()
+    return low, high
+
+def adversarial_heightfield():
+    # 64 x 64 cells in units of vertical_scale, flat blocks of 8 and 16 cells with features at their corners and edges
+    hf = np.zeros((65, 65), dtype=np.int16)
+    # far corner of a block raised by one step, the vertex before it lowered by one step
+    hf[8, 8], hf[7, 7] = 1, -1
+    # one step bump on the edge of a block, in the middle of a flat region
+    hf[16, 12] = 1
+    # exact ramp along the rows, and a ramp with a bump on a block edge
+    hf[16:33, 16:33] = np.arange(17)[:, None]
+    hf[16:33, 40:57] = np.arange(17)[:, None]
+    hf[24, 48] += 1
+    # wall
+    hf[:32, 60:] = 40
+    # single step noise on sparse vertices
+    rng = np.random.default_rng(0)
+    noise = hf[33:, :]
+    bumps = rng.uniform(size=noise.shape) < 0.05
+    noise[bumps] += rng.choice(np.array([-1, 1], dtype=np.int16), size=int(bumps.sum()))
+    return hf
+
+def check_adversarial(horizontal_scale=0.1, vertical_scale=0.005, tolerance=0.005, max_block=16):
+    hf = adversarial_heightfield()
+    vertices, triangles = terrain_utils.convert_heightfield_to_trimesh(hf, horizontal_scale, vertical_scale, None)
+    simplified_vertices, simplified_triangles = simplify_heightfield_trimesh(vertices, triangles, hf.shape, horizontal_scale, tolerance, max_block)
+    assert len(simplified_triangles) < len(triangles) // 2, "the flat regions of the heightfield are not merged"
+
+    # half cell grid, including every vertex of both meshes
+    x = np.arange(2 * hf.shape[0] - 1) * horizontal_scale / 2
+    y = np.arange(2 * hf.shape[1] - 1) * horizontal_scale / 2
+    points = np.stack(np.meshgrid(x, y, indexing='ij'), axis=-1).reshape(-1, 2)
+    reference, _ = surface_heights(vertices, triangles, points, max_block * horizontal_scale)
+    low, high = surface_heights(simplified_vertices, simplified_triangles, points, max_block * horizontal_scale)
+    assert not np.isnan(low).any(), "the simplified mesh does not cover the heightfield"
+    assert (high - low).max() <= 1e-5, "the simplified mesh has a crack of {:.4f} m".format((high - low).max())
+    error = max(np.abs(low - reference).max(), np.abs(high - reference).max())
+    assert error <= tolerance + 1e-5, "the simplified surface moved by {:.4f} m, more than {} m".format(error, tolerance)
+    print("Adversarial heightfield: {} -> {} triangles, surface within {:.4f} m at {} points, no cracks.".format(
+          len(triangles), len(simplified_triangles), error, len(points)))
+
+def main(args, num_points=20000):
+    check_adversarial()
+    env_cfg, _ = task_registry.get_cfgs(name=args.task)
+    terrain_class = sys.modules[task_registry.get_task_class(args.task).__module__].Terrain
+    cfg = env_cfg.terrain
+    if cfg.mesh_type != 'trimesh':
+        print("The terrain of {} is a {}, there is no mesh to simplify.".format(args.task, cfg.mesh_type))
+        return
+    seed = env_cfg.seed if env_cfg.seed != -1 else 1
+    reference, reference_time = build(terrain_class, cfg, env_cfg.env.num_envs, seed, simplify=False)
+    simplified, simplified_time = build(terrain_class, cfg, env_cfg.env.num_envs, seed, simplify=True)
+    tolerance = getattr(cfg, 'simplify_tolerance', 0.005)
+
+    rng = np.random.default_rng(0)
+    extent = (np.array(reference.height_field_raw.shape) - 1) * cfg.horizontal_scale
+    points = rng.uniform(0., 1., (num_points, 2)) * extent
+    bucket = getattr(cfg, 'simplify_max_block', 64) * cfg.horizontal_scale
+    reference_heights, _ = surface_heights(reference.vertices, reference.triangles, points, bucket)
+    simplified_heights, _ = surface_heights(simplified.vertices, simplified.triangles, points, bucket)
+    assert not np.isnan(reference_heights).any() and not np.isnan(simplified_heights).any(), "the meshes do not cover the heightfield"
+    error = np.abs(simplified_heights - reference_heights).max()
+    assert error <= tolerance + 1e-5, "the simplified surface moved by {:.4f} m, more than {} m".format(error, tolerance)
+
+    print("Simplified surface stays within {:.4f} m of the heightfield mesh at {} points (tolerance {} m).".format(error, num_points, tolerance))
+    print(f"{'triangles:':>12} {len(reference.triangles):>10} -> {len(simplified.triangles):>10} ({len(reference.triangles) / len(simplified.triangles):.1f}x)")
+    print(f"{'vertices:':>12} {len(reference.vertices):>10} -> {len(simplified.vertices):>10}")
+    print(f"{'build:':>12} {reference_time:>9.2f}s -> {simplified_time:>9.2f}s")
+
+if __name__ == '__main__':
+    main(get_args())
@@ -0,0 +1,52 @@
+""" Records the transitions of a task into a chunked archive that rsl_rl.env.ReplayVecEnv serves back without Isaac Gym.
+    The actions come from the policy of the run to resume with --resume, otherwise they are sampled at random.
+
+    python legged_gym/scripts/record_rollouts.py --task g1_ground --headless --num_envs 1024 --record_steps 500 [--resume]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import isaacgym
+from legged_gym import LEGGED_GYM_ROOT_DIR
+from legged_gym.envs import *
+from legged_gym.utils import get_args, task_registry
+from rsl_rl.env import RecordingVecEnv
+
+import torch
+
+
+def record(args, record_args):
+    env_cfg, train_cfg = task_registry.get_cfgs(name=args.task)
+    env, env_cfg = task_registry.make_env(name=args.task, args=args, env_cfg=env_cfg)
+
+    policy = None
+    if args.resume:
+        ppo_runner, train_cfg = task_registry.make_alg_runner(env=env, env_cfg=env_cfg, name=args.task, args=args, train_cfg=train_cfg)
+        policy = ppo_runner.get_inference_policy(device=env.device)
+
+    directory = record_args.record_dir or os.path.join(LEGGED_GYM_ROOT_DIR, 'logs', train_cfg.runner.experiment_name, 'rollouts',
+                                                       datetime.now().strftime('%b%d_%H-%M-%S'))
+    recorder = RecordingVecEnv(env, directory, chunk_size=record_args.chunk_size,
+                               obs_dtype=torch.float16 if record_args.half else torch.float32)
+    obs = recorder.get_observations()
+    with torch.inference_mode():
+        for _ in range(record_args.record_steps):
+            if policy is not None:
+                actions = policy(obs)
+            else:
+                actions = torch.randn(env.num_envs, env.num_actions, device=env.device)
+            obs, _, _, _, _ = recorder.step(actions)
+    recorder.close()
+    print("Recorded {} steps of {} envs to {}".format(recorder.num_steps, env.num_envs, directory))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--record_dir', type=str, default=None)
+    parser.add_argument('--record_steps', type=int, default=500)
+    parser.add_argument('--chunk_size', type=int, default=100)
+    parser.add_argument('--half', action='store_true', help='store the observations in float16')
+    record_args, sys.argv[1:] = parser.parse_known_args()
+    record(get_args(), record_args)
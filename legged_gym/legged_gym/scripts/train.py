@@ -9,7 +9,10 @@ from legged_gym.utils import get_args, task_registry
 import torch
 
 def train(args):
-    env, env_cfg = task_registry.make_env(name=args.task, args=args)
+    if args.num_shards > 0:
+        env, env_cfg = task_registry.make_sharded_env(name=args.task, args=args, num_shards=args.num_shards)
+    else:
+        env, env_cfg = task_registry.make_env(name=args.task, args=args)
     ppo_runner, train_cfg = task_registry.make_alg_runner(env=env, env_cfg=env_cfg, name=args.task, args=args)
     ppo_runner.learn(num_learning_iterations=train_cfg.runner.max_iterations, init_at_random_ep_len=train_cfg.runner.init_at_random_ep_len)
 
@@ -0,0 +1,101 @@
+""" Compares the settled postures of the posture bank of a task with falls simulated now with the falling procedure
+    of the env (base height, roll, pitch, joint positions and velocities), reports means, standard deviations and the
+    Kolmogorov-Smirnov distance of each quantity, and checks that resets into the bank start after the unactuated phase
+    and leave the observation stored for the step before the reset unchanged.
+    Builds and caches the bank if it does not exist yet.
+
+    python legged_gym/scripts/validate_posture_bank.py --task g1_ground --headless --num_envs 1024 --rounds 4
+"""
+
+import argparse
+import sys
+
+import isaacgym
+from legged_gym.envs import *
+from legged_gym.utils import get_args, task_registry
+from legged_gym.utils.posture_bank import simulate_falls, settled_episode_length
+from legged_gym.utils.isaacgym_utils import get_euler_xyz as get_euler_xyz_in_tensor
+from rsl_rl.storage import RolloutStorage
+
+import torch
+from isaacgym.torch_utils import quat_rotate_inverse
+
+
+def ks_distance(a, b):
+    a, b = a.sort().values, b.sort().values
+    values = torch.cat((a, b))
+    cdf_a = torch.searchsorted(a, values, right=True).float() / len(a)
+    cdf_b = torch.searchsorted(b, values, right=True).float() / len(b)
+    return (cdf_a - cdf_b).abs().max().item()
+
+def quantities(root_states, dof_pos, dof_vel, dof_names):
+    rpy = get_euler_xyz_in_tensor(root_states[:, 3:7])
+    result = {'base_height': root_states[:, 2], 'roll': rpy[:, 0], 'pitch': rpy[:, 1],
+              'dof_vel_norm': dof_vel.norm(dim=1)}
+    for i, name in enumerate(dof_names):
+        result['dof_pos/' + name] = dof_pos[:, i]
+    return result
+
+def check_stored_observations(env):
+    # the rollout storage copies the observation view of the policy step after the env step that resets the envs
+    env_ids = torch.arange(env.num_envs, device=env.device)
+    actions = torch.zeros(env.num_envs, env.num_actions, device=env.device)
+    for history_length in (1, env.cfg.env.num_actor_history):
+        storage = RolloutStorage(env.num_envs, 1, [env.num_obs], [None], [env.num_actions], 1, [1.], device=env.device, obs_history_length=history_length)
+        transition = RolloutStorage.Transition()
+        transition.observations = transition.critic_observations = env.get_observations()
+        expected = transition.observations.clone()
+        transition.actions = transition.action_mean = transition.action_sigma = actions
+        transition.rewards = transition.values = torch.zeros(env.num_envs, 1, device=env.device)
+        transition.dones = torch.zeros(env.num_envs, dtype=torch.bool, device=env.device)
+        transition.actions_log_prob = torch.zeros(env.num_envs, device=env.device)
+        env.reset_idx(env_ids)
+        env.step(actions)
+        storage.add_transitions(transition)
+        assert torch.equal(storage.get_observations()[0], expected), "the observation before a reset into the bank is overwritten"
+        assert (env.get_observations()[:, :-env.num_one_step_obs] == 0).all(), "the history of envs reset into the bank is not cleared"
+
+def validate(args, validate_args):
+    env_cfg, _ = task_registry.get_cfgs(name=args.task)
+    env_cfg.env.posture_bank = True
+    env, env_cfg = task_registry.make_env(name=args.task, args=args, env_cfg=env_cfg)
+    bank = env.posture_bank
+
+    with torch.inference_mode():
+        root_states, dof_pos, dof_vel, valid = simulate_falls(env, validate_args.rounds)
+    fresh = quantities(root_states[valid], dof_pos[valid], dof_vel[valid], env.dof_names)
+    banked = quantities(bank.root_states, bank.dof_pos, bank.dof_vel, env.dof_names)
+    print("{} postures in the bank, {} simulated falls ({} interrupted)".format(len(bank), int(valid.sum()), int((~valid).sum())))
+
+    print(f"{'quantity':>32} {'bank mean':>10} {'fall mean':>10} {'bank std':>9} {'fall std':>9} {'KS':>6}")
+    worst = 0.
+    for name in fresh:
+        distance = ks_distance(banked[name].float(), fresh[name].float())
+        worst = max(worst, distance)
+        print(f"{name:>32} {banked[name].mean().item():>10.3f} {fresh[name].mean().item():>10.3f} "
+              f"{banked[name].std().item():>9.3f} {fresh[name].std().item():>9.3f} {distance:>6.3f}")
+
+    # resets into the bank continue after the unactuated phase with actuated observations
+    env_ids = torch.arange(env.num_envs, device=env.device)
+    with torch.inference_mode():
+        env.reset_idx(env_ids)
+        assert (env.real_episode_length_buf == settled_episode_length(env)).all()
+        # the first observation uses the base state of the posture and no action of the previous episode
+        assert torch.allclose(env.projected_gravity, quat_rotate_inverse(env.base_quat, env.gravity_vec))
+        assert torch.allclose(env.base_lin_vel, quat_rotate_inverse(env.base_quat, env.root_states[:, 7:10]))
+        assert (env.actions == 0).all() and (env.last_actions == 0).all() and (env.last_last_actions == 0).all()
+        obs, _, _, _, _ = env.step(torch.zeros(env.num_envs, env.num_actions, device=env.device))
+    assert (obs[:, -env.num_one_step_obs:].abs().sum(dim=1) > 0).all(), "observations of envs reset into the bank are zeroed"
+    with torch.inference_mode():
+        check_stored_observations(env)
+
+    print("Largest KS distance: {:.3f} ({})".format(worst, 'ok' if worst < validate_args.max_ks else 'distributions differ'))
+    if worst >= validate_args.max_ks:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--rounds', type=int, default=4, help='number of falls simulated per env for the comparison')
+    parser.add_argument('--max_ks', type=float, default=0.1, help='largest accepted Kolmogorov-Smirnov distance')
+    validate_args, sys.argv[1:] = parser.parse_known_args()
+    validate(get_args(), validate_args)
@@ -0,0 +1,106 @@
+import torch
+
+
+@torch.jit.script
+def _mul32(x, c: int):
+    # x * c modulo 2**32, split in 16 bit halves so that the int64 products never overflow
+    return (x * (c & 0xffff) + (((x * (c >> 16)) & 0xffff) << 16)) & 0xffffffff
+
+@torch.jit.script
+def hash32(x):
+    """ lowbias32 integer hash of 32 bit values stored in an int64 tensor
+    """
+    x = x ^ (x >> 16)
+    x = _mul32(x, 0x7feb352d)
+    x = x ^ (x >> 15)
+    x = _mul32(x, 0x846ca68b)
+    return x ^ (x >> 16)
+
+@torch.jit.script
+def counter_uniform(key: int, env_ids, episode_idx, columns):
+    """ Uniform values in [0, 1) of shape [len(env_ids), len(columns)], a pure function of
+        (key, env id, episode index, column): no generator state is read or advanced.
+    """
+    h = hash32((env_ids ^ key) & 0xffffffff)
+    h = hash32(h ^ (episode_idx & 0xffffffff))
+    h = hash32(h.unsqueeze(1) ^ columns.unsqueeze(0))
+    return (h >> 8).float() * (1. / 16777216.)
+
+def domain_rand_seed(seed):
+    """ The env seed, or a seed drawn from the global torch generator for seed == -1
+    """
+    if seed == -1:
+        return int(torch.randint(0, 2**31 - 1, (1,)).item())
+    return seed
+
+
+class DRParam:
+    """ One randomized quantity, drawn uniformly for each env.
+
+    Args:
+        name (str): Name of the quantity, the key of the values returned by DomainRandSampler.sample
+        low (float): Lower bound
+        high (float): Upper bound, exclusive for integer quantities
+        size (int, optional): Number of entries per env, None for a scalar per env. Defaults to None.
+        integer (bool, optional): Draw integers in [low, high) returned as long. Defaults to False.
+        scale (float or Tensor, optional): Factor (per entry) applied to the drawn values. Defaults to None.
+    """
+    def __init__(self, name, low, high, size=None, integer=False, scale=None):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.size = size
+        self.integer = integer
+        self.scale = scale
+
+
+class DomainRandSampler:
+    """ Draws all the quantities of a declarative list of DRParam for a set of envs in one call.
+
+        The values are generated by a counter based hash of (seed, stream, env id, episode index, column) instead of
+        a stateful generator. The draw of an env does not depend on the other envs reset with it or on the number of
+        draws before it, so the randomization of any single episode can be regenerated with
+        sample(env_id, episode_idx) from the seed alone.
+    """
+    def __init__(self, params, seed, device, stream=0):
+        self.params = params
+        self.seed = seed
+        self.stream = stream
+        self.device = device
+        self.key = int(hash32(hash32(torch.tensor([seed & 0xffffffff])) ^ stream).item())
+
+        self.slices = {}
+        low, width = [], []
+        start = 0
+        for param in params:
+            size = param.size or 1
+            self.slices[param.name] = slice(start, start + size)
+            start += size
+            scale = param.scale if param.scale is not None else 1.
+            scale = torch.as_tensor(scale, dtype=torch.float, device=device).expand(size)
+            low.append(param.low * scale)
+            width.append((param.high - param.low) * scale)
+        self.num_columns = start
+        self.columns = torch.arange(start, dtype=torch.long, device=device)
+        self.low = torch.cat(low) if params else torch.zeros(0, device=device)
+        self.width = torch.cat(width) if params else torch.zeros(0, device=device)
+
+    def sample(self, env_ids, episode_idx):
+        """ Values of the parameters for the envs env_ids in their episode episode_idx (a tensor or an int)
+
+        Returns:
+            dict of name to tensor of shape [len(env_ids), size] ([len(env_ids)] for scalar parameters)
+        """
+        if self.num_columns == 0:
+            return {}
+        env_ids = torch.as_tensor(env_ids, dtype=torch.long, device=self.device).view(-1)
+        if not isinstance(episode_idx, torch.Tensor):
+            episode_idx = torch.full_like(env_ids, episode_idx)
+        values = torch.addcmul(self.low, self.width, counter_uniform(self.key, env_ids, episode_idx.view(-1), self.columns))
+        result = {}
+        for param in self.params:
+            value = values[:, self.slices[param.name]]
+            if param.integer:
+                value = value.floor().long().clamp_(max=int(param.high) - 1)
+            result[param.name] = value if param.size is not None else value.squeeze(1)
+        return result
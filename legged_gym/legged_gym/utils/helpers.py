@@ -6,6 +6,8 @@ import random
 from isaacgym import gymapi
 from isaacgym import gymutil
 
+from rsl_rl.utils import init_distributed
+
 from legged_gym import LEGGED_GYM_ROOT_DIR, LEGGED_GYM_ENVS_DIR
 
 def class_to_dict(obj) -> dict:
@@ -133,17 +135,28 @@ def get_args():
         {"name": "--checkpoint_path", "type": str,  "help": "Saved model checkpoint number. If -1: will load the last checkpoint. Overrides config file if provided."},
 
         {"name": "--headless", "action": "store_true", "default": False, "help": "Force display off at all times"},
-        {"name": "--horovod", "action": "store_true", "default": False, "help": "Use horovod for multi-gpu training"},
+        {"name": "--horovod", "action": "store_true", "default": False, "help": "Data parallel training over the processes launched by torchrun, one GPU per process"},
         {"name": "--rl_device", "type": str, "default": "cuda:0", "help": 'Device used by the RL algorithm, (cpu, gpu, cuda:0, cuda:1 etc..)'},
         {"name": "--num_envs", "type": int, "help": "Number of environments to create. Overrides config file if provided."},
         {"name": "--seed", "type": int, "help": "Random seed. Overrides config file if provided."},
         {"name": "--max_iterations", "type": int, "help": "Maximum number of training iterations. Overrides config file if provided."},
+        {"name": "--num_shards", "type": int, "default": 0, "help": "Split the envs over this many worker processes, 0 to simulate them in this process"},
     ]
     # parse arguments
     args = gymutil.parse_arguments(
         description="RL Policy",
         custom_parameters=custom_parameters)
 
+    args.rank, args.world_size = 0, 1
+    if args.horovod:
+        # every process simulates its own envs on the GPU of its local rank, gloo on CPU
+        backend = 'nccl' if args.rl_device.startswith('cuda') else 'gloo'
+        args.rank, args.world_size, local_rank = init_distributed(backend)
+        if args.sim_device_type == 'cuda':
+            args.compute_device_id = local_rank
+        if args.rl_device.startswith('cuda'):
+            args.rl_device = f"cuda:{local_rank}"
+
     # name allignment
     args.sim_device_id = args.compute_device_id
     args.sim_device = args.sim_device_type
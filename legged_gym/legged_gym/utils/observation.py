@@ -0,0 +1,112 @@
+import torch
+
+
+class ObsTerm:
+    """ One term of the single step observation.
+
+    Args:
+        name (str): Name of the term
+        size (int): Number of entries of the term
+        source (callable): Returns the term as a tensor of shape [num_envs, size]
+        scale (float, optional): Observation scale. Defaults to 1.
+        noise (str, optional): Name of the entry in cfg.noise.noise_scales, None for a noise free term. Defaults to None.
+    """
+    def __init__(self, name, size, source, scale=1., noise=None):
+        self.name = name
+        self.size = size
+        self.source = source
+        self.scale = scale
+        self.noise = noise
+
+
+class ObservationAssembler:
+    """ Assembles the single step observation from a declarative list of ObsTerm and keeps the observation history.
+
+        Each term is written in place into the newest frame of a preallocated history buffer. Frames are appended
+        along the buffer and the history is returned as a view of the last history_length frames, so no step copies
+        the whole history. When the end of the buffer is reached, the last history_length - 1 frames are moved to the
+        front. The buffer holds at least 3 * history_length frames so that the view returned at the previous step is
+        never overwritten by the next one (the rollout storage copies it after the following env step).
+        Clearing the history of some envs does not touch that view either: the next frame starts a new window after it,
+        in which the previous frames of the cleared envs are zero.
+    """
+    def __init__(self, terms, num_envs, history_length, device, clip=None, num_frames=None):
+        self.terms = terms
+        self.slices = {}
+        start = 0
+        for term in terms:
+            self.slices[term.name] = slice(start, start + term.size)
+            start += term.size
+        self.num_one_step_obs = start
+        self.num_envs = num_envs
+        self.history_length = history_length
+        self.clip = clip
+
+        num_frames = num_frames or 4 * history_length
+        assert num_frames >= 3 * history_length, "The history buffer must hold at least 3 * history_length frames"
+        self.buffer = torch.zeros(num_envs, num_frames, self.num_one_step_obs, dtype=torch.float, device=device)
+        self.noise = torch.zeros(num_envs, self.num_one_step_obs, dtype=torch.float, device=device)
+        self.head = history_length # index after the newest frame
+        # envs whose history is cleared when the next frame is appended
+        self.cleared = torch.zeros(num_envs, dtype=torch.bool, device=device)
+        self.has_cleared = False
+
+    def noise_scale_vec(self, noise_cfg):
+        """ Vector used to scale the uniform noise added to the single step observation, generated from the layout
+        """
+        noise_vec = torch.zeros(self.num_one_step_obs, dtype=torch.float, device=self.buffer.device)
+        for term in self.terms:
+            if term.noise is not None:
+                noise_vec[self.slices[term.name]] = getattr(noise_cfg.noise_scales, term.noise) * noise_cfg.noise_level * term.scale
+        return noise_vec
+
+    def get_observations(self):
+        """ History of shape [num_envs, history_length * num_one_step_obs], oldest frame first
+        """
+        return self.buffer[:, self.head - self.history_length:self.head].reshape(self.num_envs, -1)
+
+    def reset_idx(self, env_ids):
+        """ Clears the history of the selected envs: the next view holds zero frames before the new frame.
+            The frames of the current view are kept, it is still referenced by the rollout storage.
+        """
+        self.cleared[env_ids] = True
+        self.has_cleared = True
+
+    def _move_history(self, start):
+        # copies the last history_length - 1 frames to start, zeroed for the cleared envs
+        num_kept = self.history_length - 1
+        kept = self.buffer[:, start:start + num_kept]
+        kept.copy_(self.buffer[:, self.head - num_kept:self.head])
+        if self.has_cleared:
+            kept.masked_fill_(self.cleared.view(-1, 1, 1), 0.)
+            self.cleared.zero_()
+            self.has_cleared = False
+        self.head = start + num_kept
+
+    def step(self, noise_scale_vec=None, mask=None):
+        """ Appends a new frame computed from the terms and returns the updated history view.
+
+        Args:
+            noise_scale_vec (torch.Tensor, optional): Scales of the uniform noise in [-1, 1]. Defaults to None (no noise).
+            mask (torch.Tensor, optional): Boolean tensor of shape [num_envs], zeroes the frame of masked out envs. Defaults to None.
+        """
+        num_frames = self.buffer.shape[1]
+        if self.has_cleared:
+            # the cleared frames follow the current view, or restart at the front when it does not fit
+            self._move_history(self.head if self.head + self.history_length <= num_frames else 0)
+        elif self.head == num_frames:
+            self._move_history(0)
+        frame = self.buffer[:, self.head]
+        for term in self.terms:
+            frame_term = frame[:, self.slices[term.name]]
+            frame_term.copy_(term.source())
+            if term.scale != 1.:
+                frame_term.mul_(term.scale)
+        if noise_scale_vec is not None:
+            frame.add_(self.noise.uniform_().mul_(2).sub_(1).mul_(noise_scale_vec))
+        if mask is not None:
+            frame.mul_(mask.unsqueeze(1))
+        if self.clip is not None:
+            frame.clamp_(-self.clip, self.clip)
+        self.head += 1
+        return self.get_observations()
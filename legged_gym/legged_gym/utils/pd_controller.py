@@ -0,0 +1,75 @@
+import torch
+
+
+class DelayLine:
+    """ Ring indexed action delay line of max_delay slots.
+        Delay index i reads the action pushed max_delay - 1 - i substeps ago (max_delay - 1 is the newest action),
+        the same convention as the previous shift register built with torch.concat.
+    """
+    def __init__(self, max_delay, num_envs, num_actions, device):
+        self.max_delay = max_delay
+        self.num_envs = num_envs
+        self.buffer = torch.zeros(max_delay, num_envs, num_actions, dtype=torch.float, device=device)
+        self.output = torch.zeros(num_envs, num_actions, dtype=torch.float, device=device)
+        self.head = max_delay - 1 # slot of the newest action
+        self._env_offsets = torch.arange(num_envs, dtype=torch.long, device=device)
+        self._read_idx = torch.zeros(num_envs, dtype=torch.long, device=device)
+
+    def next_slot(self):
+        """ Advances the ring and returns the slot the newest action is written into
+        """
+        self.head = (self.head + 1) % self.max_delay
+        return self.buffer[self.head]
+
+    def read(self, delay_idx):
+        """ Gathers the delayed action of each env into self.output
+        """
+        torch.add(delay_idx, self.head + 1, out=self._read_idx)
+        self._read_idx.remainder_(self.max_delay).mul_(self.num_envs).add_(self._env_offsets)
+        torch.index_select(self.buffer.view(-1, self.buffer.shape[-1]), 0, self._read_idx, out=self.output)
+        return self.output
+
+    def reset(self, env_ids):
+        self.buffer[:, env_ids] = 0.
+
+
+class PDController:
+    """ Joint controller writing the torques in place into a persistent buffer.
+        Gains and actuator randomizations are passed at every call since domain randomization may reassign them.
+    """
+    def __init__(self, num_envs, num_dofs, torque_limits, device):
+        self.torques = torch.zeros(num_envs, num_dofs, dtype=torch.float, device=device)
+        self._tmp = torch.zeros(num_envs, num_dofs, dtype=torch.float, device=device)
+        self.torque_limits = torque_limits
+        self._neg_torque_limits = -torque_limits
+
+    def position(self, joint_pos_target, dof_pos, dof_vel, p_gains, d_gains, kp_factors, kd_factors):
+        """ p_gains * kp_factors * (joint_pos_target - dof_pos) - d_gains * kd_factors * dof_vel
+        """
+        torch.sub(joint_pos_target, dof_pos, out=self.torques)
+        torch.mul(p_gains, kp_factors, out=self._tmp)
+        self.torques.mul_(self._tmp)
+        torch.mul(d_gains, kd_factors, out=self._tmp)
+        self.torques.sub_(self._tmp.mul_(dof_vel))
+        return self.torques
+
+    def velocity(self, dof_vel_target, dof_vel, last_dof_vel, p_gains, d_gains, dt):
+        """ p_gains * (dof_vel_target - dof_vel) - d_gains * (dof_vel - last_dof_vel) / dt
+        """
+        torch.sub(dof_vel_target, dof_vel, out=self.torques)
+        self.torques.mul_(p_gains)
+        torch.sub(dof_vel, last_dof_vel, out=self._tmp)
+        self.torques.sub_(self._tmp.mul_(d_gains).div_(dt))
+        return self.torques
+
+    def torque(self, torques):
+        self.torques.copy_(torques)
+        return self.torques
+
+    def actuate(self, motor_strength, actuation_offset):
+        """ Applies the actuator randomization to the torques of the last call and clips them to the torque limits
+        """
+        self.torques.mul_(motor_strength).add_(actuation_offset)
+        torch.maximum(self.torques, self._neg_torque_limits, out=self.torques)
+        torch.minimum(self.torques, self.torque_limits, out=self.torques)
+        return self.torques
@@ -0,0 +1,138 @@
+import copy
+import hashlib
+import json
+import math
+import os
+
+import torch
+
+from legged_gym import LEGGED_GYM_ROOT_DIR
+from rsl_rl.utils import atomic_write
+from .helpers import class_to_dict
+
+
+class PostureBank:
+    """ Settled lying postures: the root states (position relative to the env origin), dof positions and dof velocities
+        reached at the end of the unactuated falling phase. Resetting into a sampled posture skips the simulation of
+        the fall, which only produces zeroed observations that never reach the learner.
+
+        On flat ground the postures are shared by all envs. On terrains the landing depends on the terrain under the
+        env origin, the postures are then kept per env (postures_per_env consecutive entries for each env).
+    """
+    def __init__(self, root_states, dof_pos, dof_vel, postures_per_env=None):
+        self.root_states = root_states
+        self.dof_pos = dof_pos
+        self.dof_vel = dof_vel
+        self.postures_per_env = postures_per_env
+
+    def __len__(self):
+        return self.dof_pos.shape[0]
+
+    def sample(self, env_ids):
+        """ Root states relative to the env origin, dof positions and dof velocities of a random posture for each env
+        """
+        if self.postures_per_env is None:
+            idx = torch.randint(0, len(self), (len(env_ids),), device=self.dof_pos.device)
+        else:
+            idx = env_ids * self.postures_per_env + torch.randint(0, self.postures_per_env, (len(env_ids),), device=self.dof_pos.device)
+        return self.root_states[idx], self.dof_pos[idx], self.dof_vel[idx]
+
+    def save(self, path):
+        state = {'root_states': self.root_states.cpu(), 'dof_pos': self.dof_pos.cpu(), 'dof_vel': self.dof_vel.cpu(),
+                 'postures_per_env': self.postures_per_env}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, lambda f: torch.save(state, f))
+
+    @classmethod
+    def load(cls, path, device):
+        state = torch.load(path, map_location=device)
+        return cls(state['root_states'], state['dof_pos'], state['dof_vel'], state['postures_per_env'])
+
+
+def settled_episode_length(env):
+    """ Number of policy steps of the unactuated phase, the episode length at which the actions are first applied
+    """
+    return int(math.floor(env.unactuated_time)) + 1
+
+def _postures_per_env(env):
+    return env.cfg.terrain.mesh_type not in ['plane', 'none', None]
+
+def posture_bank_key(env):
+    """ Hash of everything the fall depends on: robot, initial state and its randomization, control, sim and terrain
+    """
+    cfg = env.cfg
+    description = {
+        'task': type(env).__name__,
+        'asset': class_to_dict(cfg.asset),
+        'init_state': class_to_dict(cfg.init_state),
+        'control': class_to_dict(cfg.control),
+        'domain_rand': class_to_dict(cfg.domain_rand),
+        'terrain': class_to_dict(cfg.terrain),
+        'dt': env.dt,
+        'substeps': env.sim_params.substeps,
+        'settled_episode_length': settled_episode_length(env),
+        }
+    if _postures_per_env(env):
+        description['num_envs'] = env.num_envs
+    return hashlib.sha1(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def simulate_falls(env, num_rounds):
+    """ Resets all envs with the falling procedure of the env and simulates the unactuated phase num_rounds times.
+        The curriculum and randomization state of the env is restored afterwards.
+
+    Returns:
+        root states relative to the env origins, dof positions, dof velocities, each of shape [num_rounds, num_envs, ...],
+        and a boolean tensor [num_rounds, num_envs] marking the falls that were not interrupted by a reset
+    """
+    training_state = {name: value.clone() if isinstance(value, torch.Tensor) else copy.deepcopy(value)
+                      for name, value in env.get_training_state().items()}
+    posture_bank, env.posture_bank = env.posture_bank, None
+    env_ids = torch.arange(env.num_envs, device=env.device)
+    actions = torch.zeros(env.num_envs, env.num_actions, device=env.device)
+    length = settled_episode_length(env)
+    root_states, dof_pos, dof_vel, valid = [], [], [], []
+    for _ in range(num_rounds):
+        env.reset_idx(env_ids)
+        for _ in range(length):
+            env.step(actions)
+        root = env.root_states.clone()
+        root[:, :3] -= env.env_origins
+        root_states.append(root)
+        dof_pos.append(env.dof_pos.clone())
+        dof_vel.append(env.dof_vel.clone())
+        valid.append(env.real_episode_length_buf == length)
+    env.posture_bank = posture_bank
+    env.set_training_state(training_state)
+    return torch.stack(root_states), torch.stack(dof_pos), torch.stack(dof_vel), torch.stack(valid)
+
+def build_posture_bank(env, num_postures):
+    per_env = _postures_per_env(env)
+    num_rounds = math.ceil(num_postures / env.num_envs)
+    root_states, dof_pos, dof_vel, valid = simulate_falls(env, num_rounds)
+    if per_env:
+        # interrupted falls are replaced by the first complete fall of the same env
+        if not valid.any(dim=0).all():
+            raise RuntimeError("Some envs never completed the unactuated phase, increase posture_bank_size")
+        first_valid = valid.float().argmax(dim=0)
+        rounds = torch.where(valid, torch.arange(num_rounds, device=env.device).unsqueeze(1), first_valid.unsqueeze(0))
+        envs = torch.arange(env.num_envs, device=env.device).unsqueeze(0).expand_as(rounds)
+        # env major layout
+        rounds, envs = rounds.t().reshape(-1), envs.t().reshape(-1)
+        return PostureBank(root_states[rounds, envs], dof_pos[rounds, envs], dof_vel[rounds, envs], postures_per_env=num_rounds)
+    return PostureBank(root_states[valid], dof_pos[valid], dof_vel[valid])
+
+def load_or_build_posture_bank(env):
+    """ Loads the posture bank of the env config from the cache directory, simulates and caches it if it is missing
+    """
+    cfg = env.cfg.env
+    directory = getattr(cfg, 'posture_bank_dir', None) or os.path.join(LEGGED_GYM_ROOT_DIR, 'logs', 'posture_bank')
+    path = os.path.join(directory, '{}_{}.pt'.format(env.cfg.asset.name, posture_bank_key(env)))
+    if os.path.exists(path):
+        bank = PostureBank.load(path, env.device)
+        print("Loaded {} settled postures from {}".format(len(bank), path))
+        return bank
+    print("Simulating {} settled postures...".format(cfg.posture_bank_size))
+    bank = build_posture_bank(env, cfg.posture_bank_size)
+    bank.save(path)
+    print("Saved {} settled postures to {}".format(len(bank), path))
+    return bank
@@ -0,0 +1,122 @@
+from typing import List
+
+import torch
+from torch import Tensor
+
+
+def _reduce_rewards(terms: Tensor, scales: Tensor, episode_sums: Tensor, rew_buf: Tensor, task_group: int, num_task_terms: int,
+                    constraint_groups: List[int], group_sizes: List[int], has_termination: bool, only_positive_rewards: bool):
+    """ Scales the term matrix, accumulates the episode sums and reduces the terms into the reward groups.
+        The task group is the product of its terms, the other groups are the sums of their terms.
+        Constraint columns are sorted by group, constraint_groups / group_sizes describe the consecutive group slices.
+    """
+    terms.mul_(scales)
+    episode_sums.add_(terms)
+    rew_buf.zero_()
+    rew_buf[:, task_group] = torch.prod(terms[:, :num_task_terms], dim=1)
+
+    column = num_task_terms
+    for i in range(len(constraint_groups)):
+        group = constraint_groups[i]
+        size = group_sizes[i]
+        if only_positive_rewards:
+            # the group reward is clipped after each term
+            for j in range(column, column + size):
+                rew_buf[:, group] = torch.clamp(rew_buf[:, group] + terms[:, j], min=0.)
+        else:
+            rew_buf[:, group] += torch.sum(terms[:, column:column + size], dim=1)
+        column += size
+
+    if has_termination:
+        rew_buf += terms[:, column:column + 1]
+
+_reduce_rewards_jit = None
+
+def _get_reduce_rewards(use_jit):
+    global _reduce_rewards_jit
+    if not use_jit:
+        return _reduce_rewards
+    if _reduce_rewards_jit is None:
+        _reduce_rewards_jit = torch.jit.script(_reduce_rewards)
+    return _reduce_rewards_jit
+
+
+class RewardEngine:
+    """ Evaluates all reward terms into a preallocated [num_envs, num_terms] matrix and reduces it into the reward groups.
+
+        Terms of the 'task' group are multiplied (follow "Learning to Get Up"), terms of the other (constraint) groups are summed.
+        An optional termination term is added to every group. Episode sums are kept as one [num_envs, num_terms] tensor.
+
+    Args:
+        reward_groups (list[str]): Names of the reward groups, the columns of rew_buf
+        num_envs (int): Number of environments
+        device (str): Device of the buffers
+        only_positive_rewards (bool, optional): Clip the constraint groups at zero after each term. Defaults to False.
+        use_jit (bool, optional): Run the reduction through TorchScript. Defaults to False.
+    """
+    def __init__(self, reward_groups, num_envs, device, only_positive_rewards=False, use_jit=False):
+        self.reward_groups = reward_groups
+        self.num_envs = num_envs
+        self.device = device
+        self.only_positive_rewards = only_positive_rewards
+        self.use_jit = use_jit
+        self._task_terms = []
+        self._constraint_terms = []
+        self._termination_term = None
+
+    def add_term(self, name, function, scale, group):
+        """ Registers a reward term. group is the name of its reward group, None for the termination term
+            which is added to every group.
+        """
+        if group is None:
+            self._termination_term = (name, function, scale)
+        elif group == 'task':
+            self._task_terms.append((name, function, scale))
+        else:
+            self._constraint_terms.append((name, function, scale, self.reward_groups.index(group)))
+
+    def finalize(self):
+        """ Fixes the column layout and allocates the term matrix and the episode sums
+        """
+        # stable sort of the constraints by group keeps the order of the terms within each group
+        constraint_terms = sorted(self._constraint_terms, key=lambda term: term[3])
+        self.constraint_groups, self.group_sizes = [], []
+        for term in constraint_terms:
+            if self.constraint_groups and self.constraint_groups[-1] == term[3]:
+                self.group_sizes[-1] += 1
+            else:
+                self.constraint_groups.append(term[3])
+                self.group_sizes.append(1)
+
+        terms = self._task_terms + [term[:3] for term in constraint_terms]
+        if self._termination_term is not None:
+            terms.append(self._termination_term)
+        self.term_names = [term[0] for term in terms]
+        self.term_functions = [term[1] for term in terms]
+        self.term_index = {name: i for i, name in enumerate(self.term_names)}
+        self.num_task_terms = len(self._task_terms)
+        self.task_group = self.reward_groups.index('task')
+
+        num_terms = len(terms)
+        self.scales = torch.tensor([term[2] for term in terms], dtype=torch.float, device=self.device)
+        self.terms = torch.zeros(self.num_envs, num_terms, dtype=torch.float, device=self.device)
+        self.episode_sums = torch.zeros(self.num_envs, num_terms, dtype=torch.float, device=self.device)
+        self._reduce = _get_reduce_rewards(self.use_jit)
+
+    def episode_sum(self, name):
+        return self.episode_sums[:, self.term_index[name]]
+
+    def evaluate_terms(self):
+        """ Writes the unscaled value of every term into its column of the term matrix
+        """
+        for i, function in enumerate(self.term_functions):
+            self.terms[:, i] = function().reshape(self.num_envs)
+        return self.terms
+
+    def compute(self, rew_buf):
+        """ Evaluates the terms and writes the reward of each group into rew_buf [num_envs, num_reward_groups]
+        """
+        self.evaluate_terms()
+        self._reduce(self.terms, self.scales, self.episode_sums, rew_buf, self.task_group, self.num_task_terms,
+                     self.constraint_groups, self.group_sizes, self._termination_term is not None, self.only_positive_rewards)
+        return rew_buf
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+
+import torch
+
+
+class StartupTimer:
+    """ Wall clock time of the named phases of the env construction, nested phases are named 'parent/child'.
+        The device is synchronized at the phase boundaries so that queued kernels are attributed to their phase.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = OrderedDict()
+        self._stack = []
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _enter(self, name):
+        self._stack.append(name)
+        return '/'.join(self._stack)
+
+    def _exit(self, path, elapsed):
+        self._stack.pop()
+        self.timings[path] = self.timings.get(path, 0.) + elapsed
+
+    def report(self, title="Startup"):
+        total = time.perf_counter() - self.start
+        lines = ["{} phases ({:.2f} s total):".format(title, total)]
+        for path, elapsed in self.timings.items():
+            depth = path.count('/')
+            name = '  ' * depth + path.split('/')[-1]
+            lines.append(f"  {name:<36} {elapsed:>8.2f} s {100 * elapsed / max(total, 1e-9):>6.1f} %")
+        print('\n'.join(lines))
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'path', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        _synchronize()
+        self.path = self.timer._enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        _synchronize()
+        self.timer._exit(self.path, time.perf_counter() - self.start)
+        return False
+
+def _synchronize():
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        torch.cuda.synchronize()
+
+
+class AssetIndex:
+    """ Rigid body and dof indices of the asset, resolved once from the asset names.
+
+        With one actor per env the body handles returned by find_actor_rigid_body_handle are the asset body indices,
+        so the index groups are looked up in a dict and created as one tensor instead of being written entry by entry.
+    """
+    def __init__(self, body_names, dof_names, device):
+        self.body_names = list(body_names)
+        self.dof_names = list(dof_names)
+        self.device = device
+        self.body_ids = {name: i for i, name in enumerate(self.body_names)}
+        self.dof_ids = {name: i for i, name in enumerate(self.dof_names)}
+
+    def match_bodies(self, patterns, exclude=()):
+        """ Names of the bodies containing one of the patterns and none of the exclude strings, in pattern order
+        """
+        return [name for pattern in patterns for name in self.body_names
+                if pattern in name and not any(e in name for e in exclude)]
+
+    def bodies(self, names):
+        return torch.tensor([self.body_ids[name] for name in names], dtype=torch.long, device=self.device)
+
+    def dofs(self, names):
+        return torch.tensor([self.dof_ids[name] for name in names], dtype=torch.long, device=self.device)
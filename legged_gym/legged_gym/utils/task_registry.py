@@ -1,17 +1,39 @@
 import os
+import copy
+import math
 from datetime import datetime
 from typing import Tuple
 import torch
 import numpy as np
 import sys
 
-from rsl_rl.env import VecEnv
+from rsl_rl.env import VecEnv, ShardedVecEnv
 from rsl_rl.runners import OnPolicyRunner
 
 from legged_gym import LEGGED_GYM_ROOT_DIR, LEGGED_GYM_ENVS_DIR
 from .helpers import get_args, update_cfg_from_args, class_to_dict, get_load_path, set_seed, parse_sim_params
 from legged_gym.envs.base.legged_robot_config import LeggedRobotCfg, LeggedRobotCfgPPO
 
+class ShardedEnvFactory():
+    """ Picklable env_fn of ShardedVecEnv: creates the registered task name with num_envs envs in a worker process.
+        The tasks are registered in the worker when it imports the main script, which imports isaacgym first.
+    """
+    def __init__(self, name, args, num_envs, num_shards):
+        self.name = name
+        self.args = args
+        self.num_envs = num_envs
+        self.num_shards = num_shards
+
+    def __call__(self, shard):
+        args = copy.copy(self.args)
+        args.num_envs = self.num_envs
+        # make_env seeds the shard with seed + rank * num_shards + shard
+        args.num_shards = self.num_shards
+        args.shard = shard
+        env, _ = task_registry.make_env(self.name, args)
+        return env
+
+
 class TaskRegistry():
     def __init__(self):
         self.task_classes = {}
@@ -61,6 +83,10 @@ class TaskRegistry():
             env_cfg, _ = self.get_cfgs(name)
         # override cfg from args (if specified)
         env_cfg, _ = update_cfg_from_args(env_cfg, None, args)
+        # distinct seeds for the ranks of a distributed run and their shards, the env seed also keys the domain
+        # randomization and the terrain
+        if env_cfg.seed != -1:
+            env_cfg.seed += getattr(args, 'rank', 0) * max(getattr(args, 'num_shards', 0), 1) + getattr(args, 'shard', 0)
         set_seed(env_cfg.seed)
         # parse sim params (convert to dict first)
         sim_params = {"sim": class_to_dict(env_cfg.sim)}
@@ -72,6 +98,26 @@ class TaskRegistry():
                             headless=args.headless)
         return env, env_cfg
 
+    def make_sharded_env(self, name, args, num_shards, mode='lockstep') -> Tuple[ShardedVecEnv, LeggedRobotCfg]:
+        """ Creates the registered env 'name' split into num_shards worker processes, each simulating its share of the envs.
+
+        Args:
+            name (string): Name of a registered env.
+            args (Args): Isaac Gym comand line arguments.
+            num_shards (int): Number of worker processes.
+            mode (str, optional): Stepping mode of ShardedVecEnv, 'lockstep' or 'async'. Defaults to 'lockstep'.
+
+        Returns:
+            ShardedVecEnv: The created environment
+            Dict: the corresponding config file
+        """
+        env_cfg, _ = self.get_cfgs(name)
+        env_cfg, _ = update_cfg_from_args(env_cfg, None, args)
+        num_envs = math.ceil(env_cfg.env.num_envs / num_shards)
+        env = ShardedVecEnv(ShardedEnvFactory(name, args, num_envs, num_shards), num_shards, mode=mode, device=args.rl_device)
+        env_cfg.env.num_envs = env.num_envs
+        return env, env_cfg
+
     def make_alg_runner(self, env, name=None, args=None, train_cfg=None, env_cfg=None, log_root="default") -> Tuple[OnPolicyRunner, LeggedRobotCfgPPO]:
         """ Creates the training algorithm  either from a registered namme or from the provided config file.
 
@@ -0,0 +1,90 @@
+import contextlib
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from legged_gym import LEGGED_GYM_ROOT_DIR
+from .helpers import class_to_dict
+from . import terrain_mesh
+
+# arrays of a generated terrain, the large ones are memory mapped when loaded from the cache
+TERRAIN_ARRAYS = ('height_field_raw', 'env_origins', 'terrain_types', 'vertices', 'triangles')
+MAPPED_ARRAYS = ('height_field_raw', 'vertices', 'triangles')
+# config entries that do not change the generated terrain
+IGNORED_KEYS = ('num_sub_terrains', 'cache', 'cache_dir')
+
+
+def _source_hash(obj):
+    with open(inspect.getsourcefile(obj), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def terrain_cache_path(terrain, seed):
+    """ Cache directory of the terrain, keyed by a hash of the terrain config, the seed and the source of the
+        generators and of the mesh simplification. None when caching is disabled or the seed is random (-1).
+    """
+    cfg = terrain.cfg
+    if not getattr(cfg, 'cache', True) or seed == -1:
+        return None
+    from isaacgym import terrain_utils
+    config = {key: value for key, value in class_to_dict(cfg).items() if key not in IGNORED_KEYS}
+    description = {
+        'terrain': type(terrain).__module__ + '.' + type(terrain).__qualname__,
+        'source': _source_hash(type(terrain)),
+        'terrain_utils': _source_hash(terrain_utils),
+        'terrain_mesh': _source_hash(terrain_mesh),
+        'cfg': config,
+        'seed': seed,
+        }
+    key = hashlib.sha1(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    directory = getattr(cfg, 'cache_dir', None) or os.path.join(LEGGED_GYM_ROOT_DIR, 'logs', 'terrain_cache')
+    return os.path.join(directory, '{}_{}'.format(cfg.mesh_type, key))
+
+def load_terrain(terrain, path):
+    """ Sets the arrays of the terrain from the cache directory path, returns False if it is not cached
+    """
+    if not os.path.isdir(path):
+        return False
+    for name in TERRAIN_ARRAYS:
+        file = os.path.join(path, name + '.npy')
+        if os.path.exists(file):
+            setattr(terrain, name, np.load(file, mmap_mode='r' if name in MAPPED_ARRAYS else None))
+    print("Loaded terrain from {}".format(path))
+    return True
+
+def save_terrain(terrain, path):
+    """ Writes the arrays of the terrain as uncompressed .npy files. The directory is written under a temporary
+        name and renamed, so concurrent launches never read a partial cache entry.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=directory, prefix='.tmp_')
+    try:
+        for name in TERRAIN_ARRAYS:
+            value = getattr(terrain, name, None)
+            if value is not None:
+                np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(value))
+        os.rename(tmp_path, path)
+        print("Saved terrain to {}".format(path))
+    except OSError:
+        # another launch cached the same terrain first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+@contextlib.contextmanager
+def numpy_seed(seed):
+    """ Generates with the global numpy generator seeded with seed and restores its state afterwards, so the terrain
+        and the draws following it are the same whether the terrain is generated or loaded from the cache.
+    """
+    if seed == -1:
+        yield
+        return
+    state = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        yield
+    finally:
+        np.random.set_state(state)
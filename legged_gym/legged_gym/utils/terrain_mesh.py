@@ -0,0 +1,85 @@
+import numpy as np
+
+# [m] deviation of the vertices on the edges of a merged block from the straight edge, float rounding only
+EDGE_TOLERANCE = 1e-5
+
+
+def _blocks(a, size, num_rows, num_cols):
+    # read only view of the overlapping (size + 1) x (size + 1) vertex blocks of the aligned size x size cell blocks
+    stride_0, stride_1 = a.strides
+    return np.lib.stride_tricks.as_strided(a, shape=(num_rows, num_cols, size + 1, size + 1),
+                                           strides=(size * stride_0, size * stride_1, stride_0, stride_1), writeable=False)
+
+def _block_triangles(ids, size, num_cols):
+    # two triangles over the corners of each block, with the winding of convert_heightfield_to_trimesh
+    i, j = ids
+    ind0 = (i * size * num_cols + j * size).astype(np.uint32)
+    ind1 = ind0 + size
+    ind2 = ind0 + size * num_cols
+    ind3 = ind2 + size
+    return np.stack([np.stack([ind0, ind3, ind1], axis=1), np.stack([ind0, ind2, ind3], axis=1)], axis=1).reshape(-1, 3)
+
+def simplify_heightfield_trimesh(vertices, triangles, shape, horizontal_scale, tolerance, max_block=64):
+    """ Merges the coplanar cells of a mesh created by terrain_utils.convert_heightfield_to_trimesh.
+
+        Aligned square blocks of 2 to max_block cells, tested from the largest, are replaced by two triangles over
+        their corners, split along the same diagonal as the cells. A block is merged when every vertex of the block is
+        within tolerance [m] of the merged triangle it falls in, and every vertex on the boundary of the block lies on
+        the straight edge between the corners. The original triangles lie inside the merged ones, so the height of
+        the surface changes by at most tolerance anywhere, and the T-junctions with the neighbouring cells and blocks
+        leave no cracks. Cells containing a vertex moved by the slope correction, and cells on sharp edges, keep their
+        triangles.
+
+    Args:
+        vertices (np.array): Vertices of the mesh, [num_rows * num_cols, 3]
+        triangles (np.array): Triangles of the mesh, two per cell in row major order split along the diagonal from
+            vertex (i, j) to vertex (i + 1, j + 1), [2 * (num_rows - 1) * (num_cols - 1), 3]
+        shape (tuple): Shape (num_rows, num_cols) of the heightfield
+        horizontal_scale (float): Horizontal scale of the heightfield [m]
+        tolerance (float): Maximum height change of the surface [m]
+        max_block (int, optional): Side of the largest merged block in cells, a power of 2. Defaults to 64.
+
+    Returns:
+        vertices (np.array): Vertices used by the simplified mesh
+        triangles (np.array): Triangles of the simplified mesh, indexing the returned vertices
+    """
+    num_rows, num_cols = shape
+    heights = np.ascontiguousarray(vertices[:, 2].reshape(num_rows, num_cols))
+    grid_x, grid_y = np.meshgrid(np.linspace(0, (num_rows - 1) * horizontal_scale, num_rows),
+                                 np.linspace(0, (num_cols - 1) * horizontal_scale, num_cols), indexing='ij')
+    moved = (np.abs(vertices[:, 0].reshape(num_rows, num_cols) - grid_x) > 0.01 * horizontal_scale) \
+            | (np.abs(vertices[:, 1].reshape(num_rows, num_cols) - grid_y) > 0.01 * horizontal_scale)
+
+    # cells covered by a merged block
+    merged = np.zeros((num_rows - 1, num_cols - 1), dtype=bool)
+    new_triangles = []
+    size = max_block
+    while size >= 2:
+        block_rows, block_cols = (num_rows - 1) // size, (num_cols - 1) // size
+        if block_rows > 0 and block_cols > 0:
+            blocks = _blocks(heights, size, block_rows, block_cols)
+            u = np.linspace(0., 1., size + 1, dtype=heights.dtype)
+            r, c = u[:, None], u[None, :]
+            z00 = blocks[:, :, 0, 0, None, None]
+            z01 = blocks[:, :, 0, size, None, None] - z00
+            z10 = blocks[:, :, size, 0, None, None] - z00
+            z11 = blocks[:, :, size, size, None, None] - z00
+            # triangle (0, 0), (size, size), (0, size) above the diagonal, (0, 0), (size, 0), (size, size) below it
+            surface = z00 + np.where(r <= c, r * z11 + (c - r) * z01, c * z11 + (r - c) * z10)
+            error = np.abs(blocks - surface)
+            planar = error.max(axis=(2, 3)) <= tolerance
+            for edge in (error[:, :, 0, :], error[:, :, size, :], error[:, :, :, 0], error[:, :, :, size]):
+                planar &= edge.max(axis=2) <= EDGE_TOLERANCE
+            planar &= ~_blocks(moved, size, block_rows, block_cols).any(axis=(2, 3))
+            # blocks are aligned, a block is either inside a merged block of a larger size or disjoint from all of them
+            covered = merged[:block_rows * size:size, :block_cols * size:size]
+            selected = planar & ~covered
+            if selected.any():
+                merged[:block_rows * size, :block_cols * size] |= selected.repeat(size, axis=0).repeat(size, axis=1)
+                new_triangles.append(_block_triangles(np.nonzero(selected), size, num_cols))
+        size //= 2
+
+    kept = triangles.reshape(num_rows - 1, num_cols - 1, 2, 3)[~merged].reshape(-1, 3)
+    new_triangles = np.concatenate(new_triangles + [kept], axis=0)
+    used, new_triangles = np.unique(new_triangles, return_inverse=True)
+    return vertices[used], new_triangles.reshape(-1, 3).astype(np.uint32)
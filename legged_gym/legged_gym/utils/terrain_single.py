@@ -4,9 +4,11 @@ from scipy import interpolate
 
 from isaacgym import terrain_utils
 from legged_gym.envs.base.legged_robot_config import LeggedRobotCfg
+from legged_gym.utils.terrain_cache import terrain_cache_path, load_terrain, save_terrain, numpy_seed
+from legged_gym.utils.terrain_mesh import simplify_heightfield_trimesh
 
 class Terrain:
-    def __init__(self, cfg: LeggedRobotCfg.terrain, num_robots) -> None:
+    def __init__(self, cfg: LeggedRobotCfg.terrain, num_robots, seed=-1) -> None:
 
         self.cfg = cfg
         self.num_robots = num_robots
@@ -29,12 +31,19 @@ class Terrain:
         self.tot_rows = int(cfg.num_rows * self.length_per_env_pixels) + 2 * self.border
 
         self.height_field_raw = np.zeros((self.tot_rows , self.tot_cols), dtype=np.int16)
-        if cfg.curriculum:
-            self.curiculum()
-        elif cfg.selected:
-            self.selected_terrain()
-        else:    
-            self.randomized_terrain()   
+        # the key is computed before the generation, selected_terrain pops the type from terrain_kwargs
+        cache_path = terrain_cache_path(self, seed)
+        if cache_path is not None and load_terrain(self, cache_path):
+            self.heightsamples = self.height_field_raw
+            return
+
+        with numpy_seed(seed):
+            if cfg.curriculum:
+                self.curiculum()
+            elif cfg.selected:
+                self.selected_terrain()
+            else:    
+                self.randomized_terrain()   
         
         self.heightsamples = self.height_field_raw
         if self.type=="trimesh":
@@ -42,6 +51,17 @@ class Terrain:
                                                                                             self.cfg.horizontal_scale,
                                                                                             self.cfg.vertical_scale,
                                                                                             self.cfg.slope_treshold)
+            if getattr(self.cfg, 'simplify', False):
+                num_triangles = len(self.triangles)
+                self.vertices, self.triangles = simplify_heightfield_trimesh(self.vertices,
+                                                                             self.triangles,
+                                                                             self.height_field_raw.shape,
+                                                                             self.cfg.horizontal_scale,
+                                                                             self.cfg.simplify_tolerance,
+                                                                             self.cfg.simplify_max_block)
+                print("Simplified terrain mesh from {} to {} triangles".format(num_triangles, len(self.triangles)))
+        if cache_path is not None:
+            save_terrain(self, cache_path)
     
     def randomized_terrain(self):
         for k in range(self.cfg.num_sub_terrains):
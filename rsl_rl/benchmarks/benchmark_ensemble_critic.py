@@ -0,0 +1,72 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Compares the batched EnsembleCritic against the previous per-critic nn.ModuleList,
+    checks that the outputs match after loading a per-critic state dict and that the state dict round-trips.
+
+    python benchmarks/benchmark_ensemble_critic.py --num_obs 456 --device cuda:0
+"""
+
+import argparse
+import time
+
+import torch
+
+from rsl_rl.modules import EnsembleCritic
+from rsl_rl.modules.actor_critic import get_activation
+
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_obs', type=int, default=456)
+    parser.add_argument('--hidden_dims', type=int, nargs='+', default=[512, 256])
+    parser.add_argument('--num_critics', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[4096, 24576])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+    activation = get_activation('elu')
+
+    for num_critics in args.num_critics:
+        torch.manual_seed(0)
+        ensemble = EnsembleCritic(num_critics, args.num_obs, args.hidden_dims, activation).to(args.device)
+        reference = ensemble.to_module_list()
+        # perturb the reference so the check does not pass trivially, then load it into the ensemble
+        with torch.no_grad():
+            for p in reference.parameters():
+                p.add_(0.01 * torch.randn_like(p))
+        ensemble.load_state_dict(reference.state_dict())
+        assert set(ensemble.state_dict().keys()) == set(reference.state_dict().keys()), "state dict keys differ"
+        for key, value in reference.state_dict().items():
+            assert torch.equal(ensemble.state_dict()[key], value), "state dict round-trip mismatch for {}".format(key)
+
+        for batch_size in args.batch_sizes:
+            obs = torch.randn(batch_size, args.num_obs, device=args.device)
+            with torch.no_grad():
+                ref_values = torch.cat([critic(obs) for critic in reference], dim=-1)
+                values = ensemble(obs)
+            assert torch.allclose(values, ref_values, atol=1e-5), "values mismatch ({} critics)".format(num_critics)
+
+            # forward + backward, as in PPO.update
+            def run_reference():
+                torch.cat([critic(obs) for critic in reference], dim=-1).sum().backward()
+            def run_ensemble():
+                ensemble(obs).sum().backward()
+            ref_ms = timeit(run_reference, args.repeats, args.device)
+            ens_ms = timeit(run_ensemble, args.repeats, args.device)
+            print(f"critics {num_critics:2d}, batch {batch_size:6d}: module list {ref_ms:7.2f} ms, ensemble {ens_ms:7.2f} ms ({ref_ms / ens_ms:.1f}x)")
+    print("Outputs and state dicts match the per-critic implementation.")
+
+if __name__ == '__main__':
+    main()
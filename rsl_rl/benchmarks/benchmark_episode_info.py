@@ -0,0 +1,72 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Compares the packed episode info accumulation of OnPolicyRunner against the previous per-key torch.cat loop
+    over a list of info dicts, for one iteration of num_steps env steps.
+
+    python benchmarks/benchmark_episode_info.py --num_keys 45 --num_steps 50 --device cuda:0
+"""
+
+import argparse
+import math
+import time
+
+import torch
+
+
+def reference_reduce(ep_infos, device):
+    # previous implementation of OnPolicyRunner.log
+    values = {}
+    for key in ep_infos[0]:
+        infotensor = torch.tensor([], device=device)
+        for ep_info in ep_infos:
+            if not isinstance(ep_info[key], torch.Tensor):
+                ep_info[key] = torch.Tensor([ep_info[key]])
+            if len(ep_info[key].shape) == 0:
+                ep_info[key] = ep_info[key].unsqueeze(0)
+            infotensor = torch.cat((infotensor, ep_info[key].to(device)))
+        values[key] = torch.mean(infotensor).item()
+    return values
+
+def packed_reduce(packed_infos, keys, device):
+    ep_info_sum = torch.zeros(len(keys), dtype=torch.float, device=device)
+    ep_info_count = torch.zeros(len(keys), dtype=torch.float, device=device)
+    for ep_info in packed_infos:
+        ep_info_sum += torch.nan_to_num(ep_info)
+        ep_info_count += ~torch.isnan(ep_info)
+    ep_info_mean = (ep_info_sum / ep_info_count).tolist()
+    return {key: value for key, value in zip(keys, ep_info_mean) if not math.isnan(value)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_keys', type=int, default=45)
+    parser.add_argument('--num_steps', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+    device = args.device
+
+    torch.manual_seed(0)
+    keys = ['key_{}'.format(i) for i in range(args.num_keys)]
+    packed_infos = [torch.randn(args.num_keys, device=device) for _ in range(args.num_steps)]
+    dict_infos = [{key: value for key, value in zip(keys, info.unbind())} for info in packed_infos]
+
+    reference = reference_reduce(dict_infos, device)
+    packed = packed_reduce(packed_infos, keys, device)
+    for key in keys:
+        assert math.isclose(reference[key], packed[key], rel_tol=1e-5, abs_tol=1e-6), "mismatch for {}".format(key)
+    print("Packed episode infos match the previous reduction.")
+
+    def timeit(fn):
+        fn()
+        start = time.time()
+        for _ in range(args.repeats):
+            fn()
+        return (time.time() - start) / args.repeats * 1e3
+    ref_ms = timeit(lambda: reference_reduce([dict(info) for info in dict_infos], device))
+    new_ms = timeit(lambda: packed_reduce(packed_infos, keys, device))
+    print(f"{'previous:':>10} {ref_ms:8.2f} ms/iteration")
+    print(f"{'packed:':>10} {new_ms:8.2f} ms/iteration ({ref_ms / new_ms:.1f}x)")
+
+if __name__ == '__main__':
+    main()
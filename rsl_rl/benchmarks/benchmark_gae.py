@@ -0,0 +1,83 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Compares the vectorized GAE of RolloutStorage against the previous per-critic loop.
+
+    python benchmarks/benchmark_gae.py --num_envs 4096 --num_steps 50 --num_critics 4 --device cuda:0
+"""
+
+import argparse
+import time
+
+import torch
+
+from rsl_rl.storage.gae import compute_gae
+
+
+def reference_compute_returns(rewards, values, dones, last_values, gamma, lam):
+    # previous implementation of RolloutStorage.compute_returns
+    num_transitions_per_env, _, num_critics = values.shape
+    returns = torch.zeros_like(values)
+    advantages = torch.zeros_like(values)
+    advantage = 0
+    for step in reversed(range(num_transitions_per_env)):
+        if step == num_transitions_per_env - 1:
+            next_values = last_values
+        else:
+            next_values = values[step + 1]
+        next_is_not_terminal = 1.0 - dones[step].float()
+        delta = rewards[step] + next_is_not_terminal * gamma * next_values - values[step]
+        advantage = delta + next_is_not_terminal * gamma * lam * advantage
+        returns[step] = advantage + values[step]
+
+        for critic_idx in range(num_critics):
+            advantages[:, :, critic_idx] = returns[:, :, critic_idx] - values[:, :, critic_idx]
+            advantages[:, :, critic_idx] = (advantages[:, :, critic_idx] - advantages[:, :, critic_idx].mean()) / (advantages[:, :, critic_idx].std() + 1e-8)
+    return returns, advantages
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_steps', type=int, default=50)
+    parser.add_argument('--num_critics', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    shape = (args.num_steps, args.num_envs, args.num_critics)
+    rewards = torch.randn(shape, device=args.device)
+    values = torch.randn(shape, device=args.device)
+    dones = (torch.rand(args.num_steps, args.num_envs, 1, device=args.device) < 0.02).byte()
+    last_values = torch.randn(args.num_envs, args.num_critics, device=args.device)
+    gamma, lam = 0.99, 0.95
+
+    ref_returns, ref_advantages = reference_compute_returns(rewards, values, dones, last_values, gamma, lam)
+    for use_jit in [False, True]:
+        returns, advantages = compute_gae(rewards, values, dones, last_values, gamma, lam, use_jit=use_jit)
+        assert torch.allclose(returns, ref_returns, atol=1e-5), "returns mismatch (jit={})".format(use_jit)
+        assert torch.allclose(advantages, ref_advantages, atol=1e-4), "advantages mismatch (jit={})".format(use_jit)
+    print("Results match the reference implementation.")
+
+    with torch.inference_mode():
+        ref_ms = timeit(lambda: reference_compute_returns(rewards, values, dones, last_values, gamma, lam), args.repeats, args.device)
+        vec_ms = timeit(lambda: compute_gae(rewards, values, dones, last_values, gamma, lam), args.repeats, args.device)
+        jit_ms = timeit(lambda: compute_gae(rewards, values, dones, last_values, gamma, lam, use_jit=True), args.repeats, args.device)
+
+    print(f"{'reference:':>12} {ref_ms:8.2f} ms")
+    print(f"{'vectorized:':>12} {vec_ms:8.2f} ms ({ref_ms / vec_ms:.1f}x)")
+    print(f"{'jit:':>12} {jit_ms:8.2f} ms ({ref_ms / jit_ms:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Iteration time of OnPolicyRunner.learn with collection and learning in series and pipelined (runner cfg pipeline),
+    on the synthetic G1 shaped env. --env_step_ms adds a sleep to every env step to stand in for the simulator, which
+    runs outside of the Python interpreter like the sleep. The pipelined iteration time should approach
+    max(collection, learning) instead of their sum.
+
+    python benchmarks/benchmark_pipeline.py --num_envs 4096 --env_step_ms 2 --iterations 10 --device cuda:0
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import torch
+
+from rsl_rl.env import SyntheticVecEnv
+from rsl_rl.runners import OnPolicyRunner
+
+from benchmark_runner import train_cfg
+
+
+def run(pipeline, args):
+    torch.manual_seed(0)
+    env = SyntheticVecEnv(args.num_envs, device=args.device)
+    step = env.step
+    def slow_step(actions):
+        result = step(actions)
+        if args.env_step_ms > 0:
+            time.sleep(args.env_step_ms / 1000)
+        return result
+    env.step = slow_step
+
+    cfg = train_cfg(args.num_steps_per_env, args.num_mini_batches)
+    cfg['runner']['pipeline'] = pipeline
+    records = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner = OnPolicyRunner(env, env.cfg, cfg, log_dir=log_dir, device=args.device)
+            runner.log = lambda locs: records.append({key: locs[key] for key in ['collection_time', 'learn_time', 'iteration_time']
+                                                      + (['overlap_efficiency'] if pipeline else [])})
+            runner.learn(2) # warm-up
+            records.clear()
+            runner.learn(args.iterations)
+    # the first pipelined iteration has no update to overlap with
+    records = records[1:] if pipeline else records
+    return {key: sum(record[key] for record in records) / len(records) for key in records[0]}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=2048)
+    parser.add_argument('--num_steps_per_env', type=int, default=50)
+    parser.add_argument('--num_mini_batches', type=int, default=4)
+    parser.add_argument('--env_step_ms', type=float, default=2.)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'collection ms':>14} {'learning ms':>12} {'iteration ms':>13} {'overlap':>8}")
+    for pipeline in [False, True]:
+        r = run(pipeline, args)
+        print(f"{'pipelined' if pipeline else 'serial':>10} {r['collection_time'] * 1000:>14.1f} {r['learn_time'] * 1000:>12.1f} "
+              f"{r['iteration_time'] * 1000:>13.1f} {r.get('overlap_efficiency', 0.):>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Measures the time of PPO.update with and without the fused actor/critic forward pass.
+
+    python benchmarks/benchmark_ppo_update.py --num_envs 4096 --num_steps 50 --device cuda:0
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+
+from rsl_rl.algorithms import PPO
+from rsl_rl.modules import ActorCritic
+
+
+def time_update(actor_critic, rollout, args, **kwargs):
+    ppo = PPO(copy.deepcopy(actor_critic), args.reward_group_weights, num_learning_epochs=5, num_mini_batches=4,
+              schedule='adaptive', smoothness_lower_bound=0.1, device=args.device, **kwargs)
+    ppo.init_storage(args.num_envs, args.num_steps, [args.num_obs], [None], [args.num_actions], args.num_critics)
+
+    update_times = []
+    for it in range(args.iterations + 1):
+        with torch.inference_mode():
+            for obs, rewards, dones in rollout:
+                ppo.act(obs, obs)
+                ppo.process_env_step(rewards, dones, {})
+            ppo.compute_returns(rollout[-1][0])
+        if 'cuda' in args.device:
+            torch.cuda.synchronize()
+        start = time.time()
+        ppo.update()
+        if 'cuda' in args.device:
+            torch.cuda.synchronize()
+        # skip the warm-up iteration
+        if it > 0:
+            update_times.append(time.time() - start)
+    return sum(update_times) / len(update_times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=1024)
+    parser.add_argument('--num_steps', type=int, default=50)
+    parser.add_argument('--num_obs', type=int, default=456)
+    parser.add_argument('--num_actions', type=int, default=23)
+    parser.add_argument('--num_critics', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+    args.reward_group_weights = [1.] * args.num_critics
+
+    torch.manual_seed(0)
+    actor_critic = ActorCritic(args.num_obs, args.num_obs, args.num_actions, args.num_critics,
+                               actor_hidden_dims=[512, 256, 128], critic_hidden_dims=[512, 256], init_noise_std=0.8).to(args.device)
+    rollout = [(torch.randn(args.num_envs, args.num_obs, device=args.device),
+                torch.randn(args.num_envs, args.num_critics, device=args.device),
+                (torch.rand(args.num_envs, device=args.device) < 0.02).long()) for _ in range(args.num_steps)]
+
+    settings = [("separate passes + smoothness log", dict(fused_forward=False, log_action_smoothness=True)),
+                ("separate passes", dict(fused_forward=False, log_action_smoothness=False)),
+                ("fused + smoothness log", dict(fused_forward=True, log_action_smoothness=True)),
+                ("fused", dict(fused_forward=True, log_action_smoothness=False))]
+    baseline = None
+    for name, kwargs in settings:
+        update_ms = time_update(actor_critic, rollout, args, **kwargs)
+        baseline = baseline or update_ms
+        print(f"{name + ':':>34} {update_ms:8.1f} ms/update (saved {baseline - update_ms:7.1f} ms)")
+
+if __name__ == '__main__':
+    main()
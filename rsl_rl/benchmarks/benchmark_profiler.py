@@ -0,0 +1,61 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Measures the overhead of the profiler scopes when the profiler is disabled and enabled,
+    and checks that nested scopes and profiled generators are accounted for.
+
+    python benchmarks/benchmark_profiler.py --device cuda:0
+"""
+
+import argparse
+import time
+
+import torch
+
+from rsl_rl.utils import Profiler, profiler, profiled
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeats', type=int, default=100000)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    x = torch.zeros(16, device=args.device)
+    def plain():
+        x.add_(1.)
+    decorated = profiled('benchmark/decorated')(plain)
+    def scoped():
+        with profiler.scope('benchmark/scoped'):
+            x.add_(1.)
+
+    def timeit(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            fn()
+        return (time.perf_counter() - start) / args.repeats * 1e9
+
+    plain_ns = timeit(plain)
+    print(f"{'plain call:':>28} {plain_ns:8.0f} ns")
+    for enabled in [False, True]:
+        if enabled:
+            profiler.enable(args.device)
+        print(f"{'decorated (enabled={}):'.format(enabled):>28} {timeit(decorated) - plain_ns:8.0f} ns overhead")
+        print(f"{'scoped (enabled={}):'.format(enabled):>28} {timeit(scoped) - plain_ns:8.0f} ns overhead")
+    profiler.disable()
+    profiler.collect()
+
+    local = Profiler()
+    local.enable(args.device)
+    with local.scope('outer'):
+        for _ in local.iterate('inner', range(5)):
+            pass
+    timings = local.collect()
+    assert timings['outer'][1] == 1 and timings['inner'][1] == 6, "unexpected scope counts {}".format(timings)
+    assert timings['outer'][0] >= timings['inner'][0], "nested scope longer than its parent"
+    assert local.collect() == {}, "collect() does not reset the timings"
+    print("Scope accounting OK.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks that ReplayVecEnv serves back exactly what RecordingVecEnv recorded (on the synthetic env) and measures
+    OnPolicyRunner.learn on a replayed archive, e.g. one recorded from a legged_gym task with
+    legged_gym/scripts/record_rollouts.py.
+
+    python benchmarks/benchmark_replay.py --archive logs/g1_ground/rollouts --iterations 5 --device cuda:0
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import torch
+
+from rsl_rl.env import SyntheticVecEnv, RecordingVecEnv, ReplayVecEnv
+from rsl_rl.runners import OnPolicyRunner
+
+from benchmark_runner import train_cfg
+
+
+def check_round_trip(device):
+    with tempfile.TemporaryDirectory() as directory:
+        env = RecordingVecEnv(SyntheticVecEnv(64, reset_prob=0.05, device=device), directory, chunk_size=16)
+        recorded = []
+        for _ in range(40):
+            obs, _, rewards, dones, infos = env.step(torch.randn(env.num_envs, env.num_actions, device=device))
+            recorded.append((obs.clone(), rewards.clone(), dones.bool(), infos['time_outs'].clone(), infos['episode'].clone()))
+        env.close()
+
+        replay = ReplayVecEnv(directory, device=device)
+        assert replay.num_recorded_steps == len(recorded), "{} steps replayed, {} recorded".format(replay.num_recorded_steps, len(recorded))
+        for obs, rewards, dones, time_outs, episode in recorded:
+            r_obs, _, r_rewards, r_dones, r_infos = replay.step(None)
+            assert torch.equal(r_obs, obs) and torch.equal(r_rewards, rewards) and torch.equal(r_dones, dones), "replayed step differs"
+            assert torch.equal(r_infos['time_outs'], time_outs), "replayed time outs differ"
+            assert torch.equal(torch.nan_to_num(r_infos['episode']), torch.nan_to_num(episode)), "replayed episode infos differ"
+    print("Replay matches the recording.")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--archive', type=str, default=None, help='archive to replay, the synthetic env is recorded if not set')
+    parser.add_argument('--num_steps_per_env', type=int, default=50)
+    parser.add_argument('--num_mini_batches', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    check_round_trip(args.device)
+    with tempfile.TemporaryDirectory() as directory:
+        archive = args.archive
+        if archive is None:
+            archive = directory
+            env = RecordingVecEnv(SyntheticVecEnv(1024, device=args.device), archive)
+            for _ in range(args.num_steps_per_env * 2):
+                env.step(torch.zeros(env.num_envs, env.num_actions, device=args.device))
+            env.close()
+        env = ReplayVecEnv(archive, device=args.device)
+        runner = OnPolicyRunner(env, env.cfg, train_cfg(args.num_steps_per_env, args.num_mini_batches), log_dir=directory, device=args.device)
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner.learn(1) # warm-up
+            start = time.time()
+            runner.learn(args.iterations)
+            if 'cuda' in args.device:
+                torch.cuda.synchronize()
+        total_time = time.time() - start
+    print(f"{env.num_envs} envs, {env.num_recorded_steps} recorded steps: "
+          f"{args.iterations * args.num_steps_per_env * env.num_envs / total_time:.0f} steps/s, {total_time / args.iterations * 1000:.1f} ms/iteration")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Throughput of OnPolicyRunner.learn on the synthetic G1 shaped env (456 observations, 23 actions, 4 reward groups),
+    over a grid of num_envs, num_steps_per_env and num_mini_batches. Reports env steps/s, the time of PPO.update and the
+    peak memory. Each configuration runs in its own process so that the peak resident memory is per configuration.
+
+    python benchmarks/benchmark_runner.py --num_envs 512 2048 --num_steps_per_env 24 50 --num_mini_batches 4 --iterations 5
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+
+from rsl_rl.env import SyntheticVecEnv
+from rsl_rl.runners import OnPolicyRunner
+
+
+def train_cfg(num_steps_per_env, num_mini_batches):
+    # defaults of LeggedRobotCfgPPO with the G1 policy
+    return {
+        'runner': {'policy_class_name': 'ActorCritic', 'algorithm_class_name': 'PPO', 'num_steps_per_env': num_steps_per_env,
+                   'save_interval': 10**9, 'async_save': False, 'save_on_signal': False},
+        'algorithm': {'value_loss_coef': 1.0, 'use_clipped_value_loss': True, 'clip_param': 0.2, 'entropy_coef': 0.01,
+                      'num_learning_epochs': 5, 'num_mini_batches': num_mini_batches, 'learning_rate': 1.e-3,
+                      'schedule': 'adaptive', 'gamma': 0.99, 'lam': 0.95, 'desired_kl': 0.01, 'max_grad_norm': 1.,
+                      'value_smoothness_coef': 0.1, 'smoothness_upper_bound': 1.0, 'smoothness_lower_bound': 0.1},
+        'policy': {'init_noise_std': 0.8, 'actor_hidden_dims': [512, 256, 128], 'critic_hidden_dims': [512, 256],
+                   'activation': 'elu'},
+    }
+
+def run_config(num_envs, num_steps_per_env, num_mini_batches, iterations, device):
+    torch.manual_seed(0)
+    env = SyntheticVecEnv(num_envs, device=device)
+    with tempfile.TemporaryDirectory() as log_dir:
+        runner = OnPolicyRunner(env, env.cfg, train_cfg(num_steps_per_env, num_mini_batches), log_dir=log_dir, device=device)
+        update_times = []
+        update = runner.alg.update
+        def timed_update():
+            if 'cuda' in device:
+                torch.cuda.synchronize()
+            start = time.time()
+            result = update()
+            if 'cuda' in device:
+                torch.cuda.synchronize()
+            update_times.append(time.time() - start)
+            return result
+        runner.alg.update = timed_update
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner.learn(1) # warm-up
+            update_times.clear()
+            if 'cuda' in device:
+                torch.cuda.reset_peak_memory_stats()
+                torch.cuda.synchronize()
+            start = time.time()
+            runner.learn(iterations)
+            if 'cuda' in device:
+                torch.cuda.synchronize()
+            total_time = time.time() - start
+
+    result = {
+        'num_envs': num_envs,
+        'num_steps_per_env': num_steps_per_env,
+        'num_mini_batches': num_mini_batches,
+        'steps_per_s': iterations * num_steps_per_env * num_envs / total_time,
+        'update_ms': sum(update_times) / len(update_times) * 1000,
+        'iteration_ms': total_time / iterations * 1000,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if 'cuda' in device:
+        result['peak_cuda_mb'] = torch.cuda.max_memory_allocated() / 2**20
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, nargs='+', default=[512, 2048])
+    parser.add_argument('--num_steps_per_env', type=int, nargs='+', default=[50])
+    parser.add_argument('--num_mini_batches', type=int, nargs='+', default=[4])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--device', type=str, default='cpu')
+    parser.add_argument('--in_process', action='store_true', help='run all configurations in this process (shared peak memory)')
+    parser.add_argument('--json', action='store_true', help='print one json line per configuration')
+    args = parser.parse_args()
+
+    results = []
+    for num_envs, num_steps_per_env, num_mini_batches in itertools.product(args.num_envs, args.num_steps_per_env, args.num_mini_batches):
+        if args.in_process:
+            results.append(run_config(num_envs, num_steps_per_env, num_mini_batches, args.iterations, args.device))
+            continue
+        output = subprocess.run([sys.executable, __file__, '--in_process', '--json', '--iterations', str(args.iterations),
+                                 '--device', args.device, '--num_envs', str(num_envs), '--num_steps_per_env', str(num_steps_per_env),
+                                 '--num_mini_batches', str(num_mini_batches)], check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    print(f"{'envs':>7} {'steps':>6} {'minib':>6} {'steps/s':>10} {'iter ms':>9} {'update ms':>10} {'peak RSS MB':>12}"
+          + (f" {'peak CUDA MB':>13}" if 'cuda' in args.device else ''))
+    for r in results:
+        print(f"{r['num_envs']:>7} {r['num_steps_per_env']:>6} {r['num_mini_batches']:>6} {r['steps_per_s']:>10.0f} "
+              f"{r['iteration_ms']:>9.1f} {r['update_ms']:>10.1f} {r['peak_rss_mb']:>12.1f}"
+              + (f" {r['peak_cuda_mb']:>13.1f}" if 'cuda' in args.device else ''))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Env steps/s of the synthetic G1 shaped env in this process and split over worker processes with ShardedVecEnv,
+    in lockstep and in async mode. --host_overhead_ms adds a busy Python loop to every step of every env instance,
+    standing in for the host side work of post_physics_step. Checks that the lockstep sharded env returns the
+    transitions of the shard envs stepped in this process.
+
+    python benchmarks/benchmark_sharded_env.py --num_envs 4096 --num_shards 2 4 8 --host_overhead_ms 2
+"""
+
+import argparse
+import functools
+import time
+
+import torch
+
+from rsl_rl.env import SyntheticVecEnv, ShardedVecEnv
+
+
+class BusySyntheticVecEnv(SyntheticVecEnv):
+    def __init__(self, num_envs, host_overhead_ms=0., **kwargs):
+        super().__init__(num_envs, **kwargs)
+        self.host_overhead_ms = host_overhead_ms
+
+    def step(self, actions):
+        end = time.perf_counter() + self.host_overhead_ms / 1000
+        while time.perf_counter() < end:
+            pass
+        return super().step(actions)
+
+def make_shard(shard, num_envs, host_overhead_ms):
+    return BusySyntheticVecEnv(num_envs, host_overhead_ms=host_overhead_ms, seed=shard)
+
+def check_lockstep(num_shards, num_envs):
+    env = ShardedVecEnv(functools.partial(make_shard, num_envs=num_envs, host_overhead_ms=0.), num_shards)
+    references = [make_shard(shard, num_envs, 0.) for shard in range(num_shards)]
+    env.reset()
+    for reference in references:
+        reference.reset()
+    for _ in range(20):
+        actions = torch.randn(env.num_envs, env.num_actions)
+        obs, _, rewards, dones, infos = env.step(actions)
+        results = [reference.step(a) for reference, a in zip(references, actions.split(num_envs))]
+        assert torch.allclose(obs, torch.cat([r[0] for r in results]), atol=1e-6)
+        assert torch.allclose(rewards, torch.cat([r[2] for r in results]), atol=1e-6)
+        assert torch.equal(dones, torch.cat([r[3] for r in results]))
+        assert torch.equal(infos['time_outs'], torch.cat([r[4]['time_outs'] for r in results]))
+    env.close()
+
+def run_single(args):
+    env = make_shard(0, args.num_envs, args.host_overhead_ms)
+    env.reset()
+    actions = torch.zeros(env.num_envs, env.num_actions)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(actions)
+    return args.steps * env.num_envs / (time.perf_counter() - start)
+
+def run_sharded(args, num_shards, mode):
+    num_envs = args.num_envs // num_shards
+    batch_shards = max(num_shards // 2, 1) if mode == 'async' else None
+    env = ShardedVecEnv(functools.partial(make_shard, num_envs=num_envs, host_overhead_ms=args.host_overhead_ms),
+                        num_shards, mode=mode, batch_shards=batch_shards)
+    env.reset()
+    actions = torch.zeros(env.num_envs, env.num_actions)
+    num_steps = 0
+    start = time.perf_counter()
+    if mode == 'lockstep':
+        for _ in range(args.steps):
+            env.step(actions)
+        num_steps = args.steps * env.num_envs
+    else:
+        env.step_async(actions)
+        while num_steps < args.steps * env.num_envs:
+            shard_ids, obs, _, _, _, _ = env.recv()
+            num_steps += len(obs)
+            env.step_async(actions[:len(obs)], shard_ids)
+    steps_per_s = num_steps / (time.perf_counter() - start)
+    env.close()
+    return steps_per_s
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_shards', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--host_overhead_ms', type=float, default=2.)
+    parser.add_argument('--steps', type=int, default=200)
+    args = parser.parse_args()
+
+    check_lockstep(2, 64)
+    print(f"{'shards':>7} {'mode':>9} {'steps/s':>12}")
+    print(f"{1:>7} {'process':>9} {run_single(args):>12.0f}")
+    for num_shards in args.num_shards:
+        for mode in ['lockstep', 'async']:
+            print(f"{num_shards:>7} {mode:>9} {run_sharded(args, num_shards, mode):>12.0f}")
+
+if __name__ == '__main__':
+    main()
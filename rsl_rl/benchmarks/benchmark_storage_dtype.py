@@ -0,0 +1,63 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Reports the rollout storage memory for each storage dtype and checks that the PPO losses
+    stay within tolerance of the float32 path.
+
+    python benchmarks/benchmark_storage_dtype.py --num_envs 1024 --num_steps 24 --device cuda:0
+"""
+
+import argparse
+import copy
+
+import torch
+
+from rsl_rl.algorithms import PPO
+from rsl_rl.modules import ActorCritic
+
+
+def run_update(actor_critic, rollout, args, storage_dtype):
+    ppo = PPO(copy.deepcopy(actor_critic), args.reward_group_weights, num_learning_epochs=2, num_mini_batches=4,
+              schedule='adaptive', device=args.device, storage_dtype=storage_dtype)
+    ppo.init_storage(args.num_envs, args.num_steps, [args.num_obs], [None], [args.num_actions], args.num_critics)
+
+    torch.manual_seed(1)
+    with torch.inference_mode():
+        for obs, rewards, dones in rollout:
+            ppo.act(obs, obs)
+            ppo.process_env_step(rewards, dones, {})
+        ppo.compute_returns(rollout[-1][0])
+    memory = sum(ppo.storage.get_memory_usage().values())
+    mean_value_loss, mean_surrogate_loss = ppo.update()
+    return memory, mean_value_loss, mean_surrogate_loss
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=1024)
+    parser.add_argument('--num_steps', type=int, default=24)
+    parser.add_argument('--num_obs', type=int, default=456)
+    parser.add_argument('--num_actions', type=int, default=23)
+    parser.add_argument('--num_critics', type=int, default=4)
+    parser.add_argument('--rtol', type=float, default=0.05)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+    args.reward_group_weights = [2.5, 0.1, 1, 1][:args.num_critics] + [1.] * max(0, args.num_critics - 4)
+
+    torch.manual_seed(0)
+    actor_critic = ActorCritic(args.num_obs, args.num_obs, args.num_actions, args.num_critics,
+                               actor_hidden_dims=[512, 256, 128], critic_hidden_dims=[512, 256], init_noise_std=0.8).to(args.device)
+    rollout = [(torch.randn(args.num_envs, args.num_obs, device=args.device),
+                torch.randn(args.num_envs, args.num_critics, device=args.device),
+                (torch.rand(args.num_envs, device=args.device) < 0.02).long()) for _ in range(args.num_steps)]
+
+    ref_memory, ref_value_loss, ref_surrogate_loss = run_update(actor_critic, rollout, args, 'float32')
+    print(f"{'float32:':>10} {ref_memory / 2**20:8.1f} MB, value loss {ref_value_loss:.5f}, surrogate loss {ref_surrogate_loss:.5f}")
+    for storage_dtype in ['float16', 'bfloat16']:
+        memory, value_loss, surrogate_loss = run_update(actor_critic, rollout, args, storage_dtype)
+        print(f"{storage_dtype + ':':>10} {memory / 2**20:8.1f} MB, value loss {value_loss:.5f}, surrogate loss {surrogate_loss:.5f}")
+        assert abs(value_loss - ref_value_loss) <= args.rtol * abs(ref_value_loss) + 1e-4, f"value loss out of tolerance ({storage_dtype})"
+        assert abs(surrogate_loss - ref_surrogate_loss) <= args.rtol * abs(ref_surrogate_loss) + 1e-4, f"surrogate loss out of tolerance ({storage_dtype})"
+    print("Losses are within tolerance of the float32 path.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks the retention, the manifest and best.pt of CheckpointWriter and compares the time spent in the
+    training loop per checkpoint against a synchronous torch.save.
+
+    python benchmarks/check_checkpoint_writer.py --hidden_dim 512 --device cuda:0
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import torch
+import torch.nn as nn
+
+from rsl_rl.utils import CheckpointWriter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hidden_dim', type=int, default=512)
+    parser.add_argument('--num_checkpoints', type=int, default=10)
+    parser.add_argument('--keep_last', type=int, default=3)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    model = nn.Sequential(*[nn.Linear(args.hidden_dim, args.hidden_dim) for _ in range(8)]).to(args.device)
+    optimizer = torch.optim.Adam(model.parameters())
+    model(torch.randn(16, args.hidden_dim, device=args.device)).sum().backward()
+    optimizer.step()
+    def state(iteration):
+        return {'model_state_dict': model.state_dict(), 'optimizer_state_dict': optimizer.state_dict(), 'iter': iteration, 'infos': None}
+
+    rewards = [1., 5., 3., 2., 4., 0., 1., 2., 3., 4.][:args.num_checkpoints]
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CheckpointWriter(directory, keep_last=args.keep_last, best_metric='mean_reward')
+        for it, reward in enumerate(rewards):
+            writer.save(os.path.join(directory, 'model_{}.pt'.format(it)), state(it), it, {'mean_reward': reward})
+        writer.wait()
+
+        with open(os.path.join(directory, CheckpointWriter.manifest_name)) as f:
+            manifest = json.load(f)
+        kept = sorted(file for file in os.listdir(directory) if file.startswith('model_'))
+        expected = sorted('model_{}.pt'.format(it) for it in range(len(rewards))[-args.keep_last:])
+        assert kept == expected, "kept {}, expected {}".format(kept, expected)
+        assert [c['file'] for c in manifest['checkpoints']] == sorted(expected, key=lambda f: int(f[6:-3])), "manifest does not match the kept files"
+        best_iteration = max(range(len(rewards)), key=lambda i: rewards[i])
+        assert manifest['best']['iteration'] == best_iteration, "best checkpoint is iteration {}".format(manifest['best']['iteration'])
+        assert torch.load(os.path.join(directory, CheckpointWriter.best_name))['iter'] == best_iteration, "best.pt does not hold the best checkpoint"
+        assert not [file for file in os.listdir(directory) if file.endswith('.tmp')], "temporary files left behind"
+        print("Retention, manifest and best.pt OK.")
+
+        start = time.time()
+        for it in range(args.num_checkpoints):
+            torch.save(state(it), os.path.join(directory, 'sync_{}.pt'.format(it)))
+        sync_ms = (time.time() - start) / args.num_checkpoints * 1e3
+        start = time.time()
+        for it in range(args.num_checkpoints):
+            writer.save(os.path.join(directory, 'model_{}.pt'.format(it)), state(it), it, {'mean_reward': 0.})
+        async_ms = (time.time() - start) / args.num_checkpoints * 1e3
+        writer.wait()
+        print(f"{'torch.save:':>12} {sync_ms:8.1f} ms per checkpoint in the training loop")
+        print(f"{'async:':>12} {async_ms:8.1f} ms per checkpoint in the training loop")
+
+if __name__ == '__main__':
+    main()
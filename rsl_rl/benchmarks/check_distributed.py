@@ -0,0 +1,82 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks data parallel training on CPU processes with the gloo backend and the synthetic env:
+    the advantage normalization over the ranks matches the normalization of the concatenated rollouts,
+    and after a few iterations of OnPolicyRunner.learn the policies of all ranks are identical.
+
+    python benchmarks/check_distributed.py --world_size 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import socket
+import tempfile
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from rsl_rl.env import SyntheticVecEnv
+from rsl_rl.runners import OnPolicyRunner
+from rsl_rl.storage.gae import compute_gae, _get_gae_scan
+from rsl_rl.utils import init_distributed, all_gather_cat
+
+from benchmark_runner import train_cfg
+
+
+def check_advantage_normalization(rank):
+    generator = torch.Generator().manual_seed(rank)
+    num_steps, num_envs, num_critics = 24, 64, 4
+    rewards = torch.randn(num_steps, num_envs, num_critics, generator=generator) * (rank + 1)
+    values = torch.randn(num_steps, num_envs, num_critics, generator=generator)
+    dones = torch.rand(num_steps, num_envs, 1, generator=generator) < 0.05
+    last_values = torch.randn(num_envs, num_critics, generator=generator)
+    _, advantages = compute_gae(rewards, values, dones, last_values, 0.99, 0.95)
+
+    # reference: normalization of the rollouts of all ranks in one process
+    all_rewards, all_values, all_dones, all_last_values = [all_gather_cat(x, dim=1 if x.dim() == 3 else 0)
+                                                           for x in (rewards, values, dones.float(), last_values)]
+    reference = _get_gae_scan(False)(all_rewards, all_values, 1.0 - all_dones, all_last_values, 0.99, 0.95)
+    flat = reference.flatten(0, 1)
+    reference = (reference - flat.mean(dim=0)) / (flat.std(dim=0) + 1e-8)
+    assert torch.allclose(all_gather_cat(advantages, dim=1), reference, atol=1e-5)
+
+def worker(rank, world_size, port, log_dir, num_envs, iterations):
+    os.environ.update(RANK=str(rank), WORLD_SIZE=str(world_size), LOCAL_RANK=str(rank), MASTER_ADDR='127.0.0.1', MASTER_PORT=str(port))
+    init_distributed('gloo')
+    torch.manual_seed(rank) # the parameters must be synchronized by the runner
+    check_advantage_normalization(rank)
+
+    env = SyntheticVecEnv(num_envs, seed=rank)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        runner = OnPolicyRunner(env, env.cfg, train_cfg(24, 4), log_dir=log_dir, device='cpu')
+        runner.learn(iterations)
+    params = torch.cat([p.detach().view(-1) for p in runner.alg.actor_critic.parameters()])
+    all_params = all_gather_cat(params.unsqueeze(0))
+    assert torch.equal(all_params, params.expand_as(all_params)), "the policies of the ranks diverged"
+    assert runner.log_dir is None or rank == 0
+    if rank == 0:
+        assert 'Learning iteration' in output.getvalue()
+        print("rank 0 log:\n" + output.getvalue().strip().split('#' * 80)[-1])
+    dist.destroy_process_group()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--world_size', type=int, default=2)
+    parser.add_argument('--num_envs', type=int, default=256)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    with tempfile.TemporaryDirectory() as log_dir:
+        mp.spawn(worker, args=(args.world_size, port, log_dir, args.num_envs, args.iterations), nprocs=args.world_size)
+        assert os.path.exists(os.path.join(log_dir, 'model_{}.pt'.format(args.iterations)))
+    print("Distributed training checks passed on {} processes".format(args.world_size))
+
+if __name__ == '__main__':
+    main()
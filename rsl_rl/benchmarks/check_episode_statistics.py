@@ -0,0 +1,89 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks EpisodeStatistics against the previous deque based book keeping of OnPolicyRunner.learn
+    and compares the time per env step.
+
+    python benchmarks/check_episode_statistics.py --num_envs 4096 --device cuda:0
+"""
+
+import argparse
+import statistics
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from rsl_rl.utils import EpisodeStatistics
+
+
+class ReferenceStatistics:
+    # previous book keeping of OnPolicyRunner.learn
+    def __init__(self, num_envs, device):
+        self.rewbuffer = deque(maxlen=100)
+        self.lenbuffer = deque(maxlen=100)
+        self.cur_reward_sum = torch.zeros(num_envs, dtype=torch.float, device=device)
+        self.cur_episode_length = torch.zeros(num_envs, dtype=torch.float, device=device)
+
+    def record(self, rewards, dones):
+        self.cur_reward_sum += rewards.sum(-1)
+        self.cur_episode_length += 1
+        new_ids = (dones > 0).nonzero(as_tuple=False)
+        self.rewbuffer.extend(self.cur_reward_sum[new_ids][:, 0].cpu().numpy().tolist())
+        self.lenbuffer.extend(self.cur_episode_length[new_ids][:, 0].cpu().numpy().tolist())
+        self.cur_reward_sum[new_ids] = 0
+        self.cur_episode_length[new_ids] = 0
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_reward_groups', type=int, default=4)
+    parser.add_argument('--num_steps', type=int, default=500)
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+    device, n, g = args.device, args.num_envs, args.num_reward_groups
+
+    torch.manual_seed(0)
+    for done_prob in [0.001, 0.02, 0.5]:
+        reference = ReferenceStatistics(n, device)
+        episode_statistics = EpisodeStatistics(n, g, window_size=100, device=device)
+        assert episode_statistics.summary() is None, "summary before the first finished episode"
+        for step in range(args.num_steps):
+            rewards = torch.randn(n, g, device=device)
+            dones = (torch.rand(n, device=device) < done_prob).long()
+            reference.record(rewards, dones)
+            episode_statistics.record(rewards, dones)
+            if len(reference.rewbuffer) == 0 or step % 50:
+                continue
+            stats = episode_statistics.summary()
+            assert np.isclose(stats['mean_reward'], statistics.mean(reference.rewbuffer), rtol=1e-4, atol=1e-3), "mean reward mismatch"
+            assert np.isclose(stats['mean_episode_length'], statistics.mean(reference.lenbuffer)), "mean episode length mismatch"
+            assert np.isclose(sum(stats['mean_group_rewards']), stats['mean_reward'], rtol=1e-4, atol=1e-3), "group rewards mismatch"
+            assert np.allclose(stats['reward_percentiles'], np.percentile(list(reference.rewbuffer), episode_statistics.percentiles),
+                               rtol=1e-4, atol=1e-3), "reward percentiles mismatch"
+    print("Episode statistics match the previous deque book keeping.")
+
+    rewards = torch.randn(n, g, device=device)
+    dones = (torch.rand(n, device=device) < 0.02).long()
+    reference = ReferenceStatistics(n, device)
+    episode_statistics = EpisodeStatistics(n, g, device=device)
+    ref_us = timeit(lambda: reference.record(rewards, dones), args.repeats, device)
+    new_us = timeit(lambda: episode_statistics.record(rewards, dones), args.repeats, device)
+    print(f"{'previous:':>10} {ref_us:8.1f} us/step")
+    print(f"{'on device:':>10} {new_us:8.1f} us/step ({ref_us / new_us:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks the diagonal Gaussian head of ActorCritic against torch.distributions.Normal
+    (log prob, entropy, gradients and sample statistics) and compares the time of PPO.act style calls.
+
+    python benchmarks/check_gaussian_head.py --batch_size 4096 --device cuda:0
+"""
+
+import argparse
+import time
+
+import torch
+from torch.distributions import Normal
+
+from rsl_rl.modules.gaussian import gaussian_sample, gaussian_log_prob, gaussian_entropy, gaussian_sample_log_prob
+
+
+def timeit(fn, repeats, device):
+    fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if 'cuda' in str(device):
+        torch.cuda.synchronize()
+    return (time.time() - start) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=4096)
+    parser.add_argument('--num_actions', type=int, default=23)
+    parser.add_argument('--num_samples', type=int, default=256)
+    parser.add_argument('--repeats', type=int, default=100)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    mean = torch.randn(args.batch_size, args.num_actions, device=args.device, requires_grad=True)
+    std = (0.1 + torch.rand(args.num_actions, device=args.device)).requires_grad_()
+    actions = mean.detach() + torch.randn_like(mean) * std.detach()
+
+    # log prob and entropy, including gradients w.r.t. mean and std
+    ref_distribution = Normal(mean, mean*0. + std)
+    ref_log_prob = ref_distribution.log_prob(actions).sum(dim=-1)
+    ref_entropy = ref_distribution.entropy().sum(dim=-1)
+    ref_grads = torch.autograd.grad((ref_log_prob + ref_entropy).sum(), [mean, std])
+
+    log_prob = gaussian_log_prob(actions, mean, std)
+    entropy = gaussian_entropy(std, mean.shape[:-1])
+    grads = torch.autograd.grad((log_prob + entropy).sum(), [mean, std])
+
+    assert torch.allclose(log_prob, ref_log_prob, atol=1e-4), "log prob mismatch"
+    assert torch.allclose(entropy, ref_entropy, atol=1e-5), "entropy mismatch"
+    for grad, ref_grad, name in zip(grads, ref_grads, ['mean', 'std']):
+        assert torch.allclose(grad, ref_grad, rtol=1e-4, atol=1e-3), "gradient mismatch w.r.t. {}".format(name)
+
+    # fused call returns consistent values
+    sampled, sampled_log_prob, sampled_mean, sampled_std, sampled_entropy = gaussian_sample_log_prob(mean, std)
+    assert torch.allclose(sampled_log_prob, Normal(mean, mean*0. + std).log_prob(sampled).sum(dim=-1), atol=1e-4), "fused log prob mismatch"
+    assert torch.equal(sampled_std, std.expand_as(mean)) and torch.equal(sampled_mean, mean), "fused mean/std mismatch"
+    assert torch.allclose(sampled_entropy, ref_entropy, atol=1e-5), "fused entropy mismatch"
+
+    # sample statistics
+    samples = torch.stack([gaussian_sample(mean.detach()[:64], std.detach()) for _ in range(args.num_samples)])
+    z = (samples - mean.detach()[:64]) / std.detach()
+    tolerance = 5.0 / args.num_samples ** 0.5
+    assert z.mean().abs() < tolerance and (z.std() - 1.0).abs() < tolerance, "sample statistics mismatch"
+    print("Diagonal Gaussian head matches torch.distributions.Normal.")
+
+    with torch.no_grad():
+        def run_reference():
+            distribution = Normal(mean, mean*0. + std)
+            sample = distribution.sample()
+            return distribution.log_prob(sample).sum(dim=-1), distribution.mean, distribution.stddev, distribution.entropy().sum(dim=-1)
+        def run_fused():
+            return gaussian_sample_log_prob(mean, std)
+        ref_ms = timeit(run_reference, args.repeats, args.device)
+        fused_ms = timeit(run_fused, args.repeats, args.device)
+    print(f"{'Normal:':>8} {ref_ms:7.3f} ms")
+    print(f"{'fused:':>8} {fused_ms:7.3f} ms ({ref_ms / fused_ms:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+""" Checks that the RNG states saved with the training state survive a checkpoint round trip
+    (including torch.load(weights_only=True)), that restoring them replays the same random streams and that
+    offsetting them by rank gives every rank a distinct stream.
+
+    python benchmarks/check_training_state.py
+"""
+
+import os
+import random
+import tempfile
+
+import numpy as np
+import torch
+
+from rsl_rl.utils import CheckpointWriter, get_rng_state, set_rng_state, offset_rng_state
+
+
+def draw():
+    values = [random.random(), float(np.random.rand()), torch.rand(4).tolist()]
+    if torch.cuda.is_available():
+        values.append(torch.rand(4, device='cuda').tolist())
+    return values
+
+def main():
+    random.seed(1)
+    np.random.seed(1)
+    torch.manual_seed(1)
+    draw()
+
+    env_state = {'force': torch.rand(16, 1), 'delay_idx': torch.randint(0, 5, (16,)), 'command_ranges': {'lin_vel_x': [0., 1.]}}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model_0.pt')
+        writer = CheckpointWriter(directory, async_write=True)
+        writer.save(path, {'training_state': {'next_iteration': 1, 'env': env_state, 'rng': get_rng_state()}}, 0)
+        writer.wait()
+        expected = draw()
+
+        load_kwargs = {'weights_only': True} if 'weights_only' in torch.load.__code__.co_varnames else {}
+        training_state = torch.load(path, **load_kwargs)['training_state']
+        set_rng_state(training_state['rng'])
+        assert draw() == expected, "random streams differ after restoring the RNG states"
+        for name, value in env_state.items():
+            if isinstance(value, torch.Tensor):
+                assert torch.equal(training_state['env'][name], value), "env state {} differs".format(name)
+            else:
+                assert training_state['env'][name] == value, "env state {} differs".format(name)
+
+        # the ranks of a distributed run restore the same state and offset it by their rank
+        streams = []
+        for rank in range(4):
+            set_rng_state(training_state['rng'])
+            offset_rng_state(rank)
+            streams.append(draw())
+        assert all(streams[i] != streams[j] for i in range(4) for j in range(i)), "ranks share a random stream"
+    print("RNG and env training state round trip OK, ranks draw distinct streams.")
+
+if __name__ == '__main__':
+    main()
@@ -34,6 +34,7 @@ import torch.optim as optim
 
 from rsl_rl.modules import ActorCritic
 from rsl_rl.storage import RolloutStorage
+from rsl_rl.utils import profiler, profiled, all_reduce_mean, all_reduce_gradients
 
 class PPO:
     actor_critic: ActorCritic
@@ -56,6 +57,10 @@ class PPO:
                 value_smoothness_coef=0.1,
                 smoothness_upper_bound=1.0,
                 smoothness_lower_bound=0.0,
+                compile_gae=False,
+                storage_dtype='float32',
+                fused_forward=True,
+                log_action_smoothness=False,
                  ):
 
         self.device = device
@@ -67,8 +72,13 @@ class PPO:
         # PPO components
         self.actor_critic = actor_critic
         self.actor_critic.to(self.device)
+        # module used to act, a delayed copy of actor_critic when collection and learning are pipelined
+        self.policy = self.actor_critic
         self.storage = None # initialized later
-        self.optimizer = optim.Adam(self.actor_critic.parameters(), lr=learning_rate)
+        self.storages = []
+        # the adaptive schedule passes the learning rate to Adam as a device tensor, capturable keeps the step on device
+        capturable = schedule == 'adaptive' and desired_kl is not None and 'cuda' in str(device)
+        self.optimizer = optim.Adam(self.actor_critic.parameters(), lr=learning_rate, capturable=capturable)
         self.transition = RolloutStorage.Transition()
         self.reward_group_weights = reward_group_weights
 
@@ -86,9 +96,26 @@ class PPO:
         self.value_smoothness_coef = value_smoothness_coef
         self.smoothness_upper_bound = smoothness_upper_bound
         self.smoothness_lower_bound = smoothness_lower_bound
+        self.compile_gae = compile_gae
+        self.storage_dtype = getattr(torch, storage_dtype)
+        # batch the policy/smoothness/value inputs into one actor and one critic pass per mini batch
+        self.fused_forward = fused_forward
+        # diagnostic only: distance between the actions at consecutive observations
+        self.log_action_smoothness = log_action_smoothness
+        self.mean_action_smoothness = None
 
-    def init_storage(self, num_envs, num_transitions_per_env, actor_obs_shape, critic_obs_shape, action_shape, num_critics):
-        self.storage = RolloutStorage(num_envs, num_transitions_per_env, actor_obs_shape, critic_obs_shape, action_shape, num_critics, self.reward_group_weights, self.device)
+    def init_storage(self, num_envs, num_transitions_per_env, actor_obs_shape, critic_obs_shape, action_shape, num_critics, obs_history_length=1, num_buffers=1):
+        self.storages = [RolloutStorage(num_envs, num_transitions_per_env, actor_obs_shape, critic_obs_shape, action_shape, num_critics, self.reward_group_weights, self.device,
+                                        compile_gae=self.compile_gae, obs_history_length=obs_history_length, storage_dtype=self.storage_dtype)
+                         for _ in range(num_buffers)]
+        self.storage = self.storages[0]
+
+    def swap_storage(self):
+        """ Moves the collection to the next storage buffer and returns the filled one
+        """
+        filled = self.storage
+        self.storage = self.storages[(self.storages.index(filled) + 1) % len(self.storages)]
+        return filled
 
     def test_mode(self):
         self.actor_critic.test()
@@ -96,20 +123,23 @@ class PPO:
     def train_mode(self):
         self.actor_critic.train()
 
+    @profiled('ppo/act')
     def act(self, obs, critic_obs):
-        if self.actor_critic.is_recurrent:
-            self.transition.hidden_states = self.actor_critic.get_hidden_states()
+        if self.policy.is_recurrent:
+            self.transition.hidden_states = self.policy.get_hidden_states()
         # Compute the actions and values
-        self.transition.actions = self.actor_critic.act(obs).detach()
-        self.transition.values = self.actor_critic.evaluate(critic_obs).detach()
-        self.transition.actions_log_prob = self.actor_critic.get_actions_log_prob(self.transition.actions).detach()
-        self.transition.action_mean = self.actor_critic.action_mean.detach()
-        self.transition.action_sigma = self.actor_critic.action_std.detach()
+        actions, actions_log_prob, action_mean, action_sigma, _ = self.policy.act_with_log_prob(obs)
+        self.transition.actions = actions.detach()
+        self.transition.values = self.policy.evaluate(critic_obs).detach()
+        self.transition.actions_log_prob = actions_log_prob.detach()
+        self.transition.action_mean = action_mean.detach()
+        self.transition.action_sigma = action_sigma.detach()
         # need to record obs and critic_obs before env.step()
         self.transition.observations = obs
         self.transition.critic_observations = critic_obs
         return self.transition.actions
     
+    @profiled('ppo/process_env_step')
     def process_env_step(self, rewards, dones, infos):
         self.transition.rewards = rewards.clone()
         self.transition.dones = dones
@@ -122,90 +152,153 @@ class PPO:
             self.storage.add_transitions(self.transition)
 
         self.transition.clear()
-        self.actor_critic.reset(dones)
+        self.policy.reset(dones)
     
+    @profiled('ppo/compute_returns')
     def compute_returns(self, last_critic_obs):
-        last_values= self.actor_critic.evaluate(last_critic_obs).detach()
+        last_values= self.policy.evaluate(last_critic_obs).detach()
         self.storage.compute_returns(last_values, self.gamma, self.lam)
 
-    def update(self):
-        mean_value_loss = 0
-        mean_surrogate_loss = 0
+    def _forward(self, obs_batch, critic_obs_batch, next_obs_batch, cont_batch, actions_batch, masks_batch, hid_states_batch):
+        """ Runs the actor and the critics on the mini batch and on the mixed observations used by the smoothness loss.
+
+        Returns:
+            Log prob of actions_batch, values, action mean, action std, entropy, mixed action mean, mixed values
+            and the action mean at next_obs_batch (None if action smoothness is not logged)
+        """
+        mix_weights = cont_batch * (torch.rand_like(cont_batch) - 0.5) * 2.0
+        mix_obs_batch = obs_batch + mix_weights * (next_obs_batch - obs_batch)
+
+        if self.fused_forward and not self.actor_critic.is_recurrent:
+            batch_size = obs_batch.shape[0]
+            actor_inputs = [obs_batch, mix_obs_batch]
+            if self.log_action_smoothness:
+                actor_inputs.append(next_obs_batch)
+            actor_outputs = self.actor_critic.act_inference(torch.cat(actor_inputs, dim=0)).split(batch_size)
+            mu_batch, mix_mu_batch = actor_outputs[0], actor_outputs[1]
+            next_mu_batch = actor_outputs[2].detach() if self.log_action_smoothness else None
+            self.actor_critic.update_distribution_from_mean(mu_batch)
+
+            value_batch, mix_value_batch = self.actor_critic.evaluate(torch.cat((critic_obs_batch, mix_obs_batch), dim=0)).split(batch_size)
+        else:
+            self.actor_critic.act(obs_batch, masks=masks_batch, hidden_states=hid_states_batch[0])
+            value_batch = self.actor_critic.evaluate(critic_obs_batch, masks=masks_batch, hidden_states=hid_states_batch[1])
+            mu_batch = self.actor_critic.action_mean
+            mix_mu_batch = self.actor_critic.act_inference(mix_obs_batch)
+            mix_value_batch = self.actor_critic.evaluate(mix_obs_batch)
+            next_mu_batch = None
+            if self.log_action_smoothness:
+                with torch.inference_mode():
+                    next_mu_batch = self.actor_critic.act_inference(next_obs_batch)
+
+        actions_log_prob_batch = self.actor_critic.get_actions_log_prob(actions_batch)
+        sigma_batch = self.actor_critic.action_std
+        entropy_batch = self.actor_critic.entropy
+        return actions_log_prob_batch, value_batch, mu_batch, sigma_batch, entropy_batch, mix_mu_batch, mix_value_batch, next_mu_batch
+
+    def _adaptive_learning_rate(self, learning_rate, mu_batch, sigma_batch, old_mu_batch, old_sigma_batch):
+        """ Adapts the learning rate to the KL divergence between the old and the new policy, without leaving the device
+        """
+        kl = torch.sum(
+            torch.log(sigma_batch / old_sigma_batch + 1.e-5) + (torch.square(old_sigma_batch) + torch.square(old_mu_batch - mu_batch)) / (2.0 * torch.square(sigma_batch)) - 0.5, axis=-1)
+        kl_mean = all_reduce_mean(torch.mean(kl)) # same learning rate on all ranks in distributed training
+
+        decrease = kl_mean > self.desired_kl * 2.0
+        increase = ~decrease & (kl_mean < self.desired_kl / 2.0) & (kl_mean > 0.0)
+        learning_rate = torch.where(decrease, torch.clamp(learning_rate / 1.5, min=1e-5), learning_rate)
+        learning_rate = torch.where(increase, torch.clamp(learning_rate * 1.5, max=1e-2), learning_rate)
+        return learning_rate
+
+    @profiled('ppo/update')
+    def update(self, storage=None):
+        """ Learns on storage (defaults to the collection buffer self.storage) and clears it
+        """
+        storage = self.storage if storage is None else storage
+        mean_value_loss = torch.zeros((), device=self.device)
+        mean_surrogate_loss = torch.zeros((), device=self.device)
+        mean_action_smoothness = torch.zeros((), device=self.device)
+
+        adaptive_schedule = self.desired_kl != None and self.schedule == 'adaptive'
+        if adaptive_schedule:
+            # the schedule is computed in double precision as on the host, Adam reads the rate from optimizer_lr
+            learning_rate = torch.tensor(self.learning_rate, dtype=torch.float64, device=self.device)
+            optimizer_lr = learning_rate.float()
+            for param_group in self.optimizer.param_groups:
+                param_group['lr'] = optimizer_lr
+
         if self.actor_critic.is_recurrent:
-            generator = self.storage.reccurent_mini_batch_generator(self.num_mini_batches, self.num_learning_epochs)
+            generator = storage.reccurent_mini_batch_generator(self.num_mini_batches, self.num_learning_epochs)
         else:
-            generator = self.storage.mini_batch_generator(self.num_mini_batches, self.num_learning_epochs)
+            generator = storage.mini_batch_generator(self.num_mini_batches, self.num_learning_epochs)
+        generator = profiler.iterate('ppo/mini_batch', generator)
         for obs_batch, critic_obs_batch, next_obs_batch, cont_batch, actions_batch, target_values_batch, advantages_batch, returns_batch, old_actions_log_prob_batch, \
             old_mu_batch, old_sigma_batch, hid_states_batch, masks_batch in generator:
 
-                self.actor_critic.act(obs_batch, masks=masks_batch, hidden_states=hid_states_batch[0])
-                actions_log_prob_batch = self.actor_critic.get_actions_log_prob(actions_batch)
-                value_batch = self.actor_critic.evaluate(critic_obs_batch, masks=masks_batch, hidden_states=hid_states_batch[1])
-                mu_batch = self.actor_critic.action_mean
-                sigma_batch = self.actor_critic.action_std
-                entropy_batch = self.actor_critic.entropy
-
-                # KL
-                if self.desired_kl != None and self.schedule == 'adaptive':
-                    with torch.inference_mode():
-                        kl = torch.sum(
-                            torch.log(sigma_batch / old_sigma_batch + 1.e-5) + (torch.square(old_sigma_batch) + torch.square(old_mu_batch - mu_batch)) / (2.0 * torch.square(sigma_batch)) - 0.5, axis=-1)
-                        kl_mean = torch.mean(kl)
-
-                        if kl_mean > self.desired_kl * 2.0:
-                            self.learning_rate = max(1e-5, self.learning_rate / 1.5)
-                        elif kl_mean < self.desired_kl / 2.0 and kl_mean > 0.0:
-                            self.learning_rate = min(1e-2, self.learning_rate * 1.5)
-                        
-                        for param_group in self.optimizer.param_groups:
-                            param_group['lr'] = self.learning_rate
-
-                # Surrogate loss
-                ratio = torch.exp(actions_log_prob_batch - torch.squeeze(old_actions_log_prob_batch))
-                surrogate = -torch.squeeze(advantages_batch) * ratio
-                surrogate_clipped = -torch.squeeze(advantages_batch) * torch.clamp(ratio, 1.0 - self.clip_param,
-                                                                                1.0 + self.clip_param)
-                surrogate_loss = torch.max(surrogate, surrogate_clipped).mean()
-
-                # Value function loss
-                if self.use_clipped_value_loss:
-                    value_clipped = target_values_batch + (value_batch - target_values_batch).clamp(-self.clip_param,
-                                                                                                    self.clip_param)
-                    value_losses = (value_batch - returns_batch).pow(2)
-                    value_losses_clipped = (value_clipped - returns_batch).pow(2)
-                    value_loss = torch.max(value_losses, value_losses_clipped).mean()
-                else:
-                    value_loss = (returns_batch - value_batch).pow(2).mean()
-
-                loss = surrogate_loss + self.value_loss_coef * value_loss - self.entropy_coef * entropy_batch.mean()
-
-                # Smooth loss
-                epsilon = self.smoothness_lower_bound / (self.smoothness_upper_bound - self.smoothness_lower_bound)
-                policy_smooth_coef = self.smoothness_upper_bound * epsilon; value_smooth_coef = self.value_smoothness_coef * policy_smooth_coef
-
-                mix_weights = cont_batch * (torch.rand_like(cont_batch) - 0.5) * 2.0
-                mix_obs_batch = obs_batch + mix_weights * (next_obs_batch - obs_batch)
-
-                policy_smooth_loss = torch.square(torch.norm(mu_batch - self.actor_critic.act_inference(mix_obs_batch), dim=-1)).mean()
-                value_smooth_loss = torch.square(torch.norm(value_batch - self.actor_critic.evaluate(mix_obs_batch), dim=-1)).mean()
-                smooth_loss = policy_smooth_coef * policy_smooth_loss + value_smooth_coef * value_smooth_loss
-                with torch.inference_mode():
-                    action_smoothness = torch.norm(mu_batch - self.actor_critic.act_inference(next_obs_batch), dim=-1).mean()
+                with profiler.scope('ppo/forward'):
+                    actions_log_prob_batch, value_batch, mu_batch, sigma_batch, entropy_batch, mix_mu_batch, mix_value_batch, next_mu_batch = \
+                        self._forward(obs_batch, critic_obs_batch, next_obs_batch, cont_batch, actions_batch, masks_batch, hid_states_batch)
+
+                    # KL
+                    if adaptive_schedule:
+                        with torch.no_grad():
+                            learning_rate = self._adaptive_learning_rate(learning_rate, mu_batch, sigma_batch, old_mu_batch, old_sigma_batch)
+                            optimizer_lr.copy_(learning_rate)
+
+                    # Surrogate loss
+                    ratio = torch.exp(actions_log_prob_batch - torch.squeeze(old_actions_log_prob_batch))
+                    surrogate = -torch.squeeze(advantages_batch) * ratio
+                    surrogate_clipped = -torch.squeeze(advantages_batch) * torch.clamp(ratio, 1.0 - self.clip_param,
+                                                                                    1.0 + self.clip_param)
+                    surrogate_loss = torch.max(surrogate, surrogate_clipped).mean()
+
+                    # Value function loss
+                    if self.use_clipped_value_loss:
+                        value_clipped = target_values_batch + (value_batch - target_values_batch).clamp(-self.clip_param,
+                                                                                                        self.clip_param)
+                        value_losses = (value_batch - returns_batch).pow(2)
+                        value_losses_clipped = (value_clipped - returns_batch).pow(2)
+                        value_loss = torch.max(value_losses, value_losses_clipped).mean()
+                    else:
+                        value_loss = (returns_batch - value_batch).pow(2).mean()
+
+                    loss = surrogate_loss + self.value_loss_coef * value_loss - self.entropy_coef * entropy_batch.mean()
+
+                    # Smooth loss
+                    epsilon = self.smoothness_lower_bound / (self.smoothness_upper_bound - self.smoothness_lower_bound)
+                    policy_smooth_coef = self.smoothness_upper_bound * epsilon; value_smooth_coef = self.value_smoothness_coef * policy_smooth_coef
+
+                    policy_smooth_loss = torch.square(torch.norm(mu_batch - mix_mu_batch, dim=-1)).mean()
+                    value_smooth_loss = torch.square(torch.norm(value_batch - mix_value_batch, dim=-1)).mean()
+                    smooth_loss = policy_smooth_coef * policy_smooth_loss + value_smooth_coef * value_smooth_loss
+                    if next_mu_batch is not None:
+                        mean_action_smoothness += torch.norm(mu_batch - next_mu_batch, dim=-1).mean().detach()
                     
-                loss += smooth_loss
+                    loss += smooth_loss
 
                 # Gradient step
-                self.optimizer.zero_grad()
-                loss.backward()
-                nn.utils.clip_grad_norm_(self.actor_critic.parameters(), self.max_grad_norm)
-                self.optimizer.step()
+                with profiler.scope('ppo/backward'):
+                    self.optimizer.zero_grad()
+                    loss.backward()
+                    all_reduce_gradients(self.actor_critic.parameters())
+                with profiler.scope('ppo/optimizer'):
+                    nn.utils.clip_grad_norm_(self.actor_critic.parameters(), self.max_grad_norm)
+                    self.optimizer.step()
 
-                mean_value_loss += value_loss.item()
-                mean_surrogate_loss += surrogate_loss.item()
+                mean_value_loss += value_loss.detach()
+                mean_surrogate_loss += surrogate_loss.detach()
 
+        # single transfer of the update statistics to the host
         num_updates = self.num_learning_epochs * self.num_mini_batches
-        mean_value_loss /= num_updates
-        mean_surrogate_loss /= num_updates
-        self.storage.clear()
+        stats = [mean_value_loss / num_updates, mean_surrogate_loss / num_updates, mean_action_smoothness / num_updates]
+        if adaptive_schedule:
+            stats.append(learning_rate)
+        stats = all_reduce_mean(torch.stack([stat.double() for stat in stats])).tolist()
+        mean_value_loss, mean_surrogate_loss = stats[0], stats[1]
+        self.mean_action_smoothness = stats[2] if self.log_action_smoothness else None
+        if adaptive_schedule:
+            self.learning_rate = stats[3]
+            for param_group in self.optimizer.param_groups:
+                param_group['lr'] = self.learning_rate
+        storage.clear()
 
         return mean_value_loss, mean_surrogate_loss
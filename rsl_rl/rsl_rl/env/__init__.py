@@ -28,4 +28,7 @@
 #
 # Copyright (c) 2021 ETH Zurich, Nikita Rudin
 
-from .vec_env import VecEnv
\ No newline at end of file
+from .vec_env import VecEnv
+from .synthetic_env import SyntheticVecEnv
+from .record_replay import RecordingVecEnv, ReplayVecEnv
+from .sharded_env import ShardedVecEnv
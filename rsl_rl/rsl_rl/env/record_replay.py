@@ -0,0 +1,200 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import glob
+import json
+import os
+from types import SimpleNamespace
+
+import torch
+
+from rsl_rl.utils import atomic_write
+from .vec_env import VecEnv
+
+
+class RecordingVecEnv(VecEnv):
+    """ Wraps a VecEnv and records what step() returns into a chunked archive directory:
+        meta.json and chunk_<k>.pt files of chunk_size steps, each holding the stacked obs, privileged obs, rewards,
+        dones, time_outs and packed episode infos. Attributes not defined here are forwarded to the wrapped env.
+
+    Args:
+        env (VecEnv): Environment to record
+        directory (str): Archive directory
+        chunk_size (int, optional): Number of steps per chunk file. Defaults to 100.
+        obs_dtype (torch.dtype, optional): dtype of the recorded observations. Defaults to torch.float32.
+    """
+    def __init__(self, env, directory, chunk_size=100, obs_dtype=torch.float32):
+        self.env = env
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.obs_dtype = obs_dtype
+        self.num_steps = 0
+        self.num_chunks = 0
+        self._chunk = None
+        self._chunk_steps = 0
+        os.makedirs(directory, exist_ok=True)
+
+    _own_attributes = ('env', 'directory', 'chunk_size', 'obs_dtype', 'num_steps', 'num_chunks', '_chunk', '_chunk_steps')
+
+    def __getattr__(self, name):
+        # only called for attributes that are not found on the wrapper
+        return getattr(self.__dict__['env'], name)
+
+    def __setattr__(self, name, value):
+        # e.g. the runner assigns episode_length_buf, which must reach the wrapped env
+        if name in self._own_attributes:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.env, name, value)
+
+    def _allocate_chunk(self, obs, privileged_obs, rewards, dones, infos):
+        def buffer(tensor, dtype=None):
+            return torch.zeros(self.chunk_size, *tensor.shape, dtype=dtype or tensor.dtype)
+        chunk = {
+            'obs': buffer(obs, self.obs_dtype),
+            'rewards': buffer(rewards.view(self.env.num_envs, -1)),
+            'dones': buffer(dones, torch.bool),
+            'time_outs': torch.zeros(self.chunk_size, self.env.num_envs, dtype=torch.bool),
+        }
+        if privileged_obs is not None:
+            chunk['privileged_obs'] = buffer(privileged_obs, self.obs_dtype)
+        if isinstance(infos.get('episode'), torch.Tensor):
+            chunk['episode'] = buffer(infos['episode'])
+        return chunk
+
+    def _write_meta(self):
+        env = self.env
+        rewards_cfg = getattr(getattr(env, 'cfg', None), 'rewards', None)
+        meta = {
+            'num_envs': env.num_envs,
+            'num_obs': env.num_obs,
+            'num_privileged_obs': env.num_privileged_obs,
+            'num_actions': env.num_actions,
+            'max_episode_length': int(env.max_episode_length),
+            'num_actor_history': getattr(getattr(getattr(env, 'cfg', None), 'env', None), 'num_actor_history', 1),
+            'reward_groups': list(getattr(rewards_cfg, 'reward_groups', [])),
+            'reward_group_weights': list(getattr(rewards_cfg, 'reward_group_weights', [])),
+            'episode_info_keys': list(getattr(env, 'episode_info_keys', [])),
+            'chunk_size': self.chunk_size,
+            'num_chunks': self.num_chunks,
+            'num_steps': self.num_steps,
+        }
+        atomic_write(os.path.join(self.directory, 'meta.json'), lambda f: f.write(json.dumps(meta, indent=2).encode()))
+
+    def _flush(self):
+        if self._chunk_steps == 0:
+            return
+        chunk = {key: value[:self._chunk_steps].clone() for key, value in self._chunk.items()}
+        path = os.path.join(self.directory, 'chunk_{:05d}.pt'.format(self.num_chunks))
+        atomic_write(path, lambda f: torch.save(chunk, f))
+        self.num_chunks += 1
+        self._chunk_steps = 0
+        self._write_meta()
+
+    def step(self, actions):
+        obs, privileged_obs, rewards, dones, infos = self.env.step(actions)
+        if self._chunk is None:
+            self._chunk = self._allocate_chunk(obs, privileged_obs, rewards, dones, infos)
+        t = self._chunk_steps
+        self._chunk['obs'][t].copy_(obs)
+        self._chunk['rewards'][t].copy_(rewards.view(self.env.num_envs, -1))
+        self._chunk['dones'][t].copy_(dones)
+        if 'time_outs' in infos:
+            self._chunk['time_outs'][t].copy_(infos['time_outs'])
+        if 'privileged_obs' in self._chunk:
+            self._chunk['privileged_obs'][t].copy_(privileged_obs)
+        if 'episode' in self._chunk:
+            self._chunk['episode'][t].copy_(infos['episode'])
+        self._chunk_steps += 1
+        self.num_steps += 1
+        if self._chunk_steps == self.chunk_size:
+            self._flush()
+        return obs, privileged_obs, rewards, dones, infos
+
+    def reset(self, *args, **kwargs):
+        return self.env.reset(*args, **kwargs)
+
+    def get_observations(self):
+        return self.env.get_observations()
+
+    def get_privileged_observations(self):
+        return self.env.get_privileged_observations()
+
+    def close(self):
+        """ Writes the last partial chunk
+        """
+        self._flush()
+
+
+class ReplayVecEnv(VecEnv):
+    """ Serves the transitions of an archive written by RecordingVecEnv, ignoring the actions.
+
+        All chunks are loaded to the device up front and step() returns views of the recorded tensors, so the replay
+        runs at memory bandwidth. After the last recorded step the replay starts over from the first one.
+        The observation returned before the first step is the one recorded at the last step.
+
+    Args:
+        directory (str): Archive directory
+        device (str, optional): Defaults to 'cpu'.
+        num_steps (int, optional): Number of recorded steps to load, None for all. Defaults to None.
+    """
+    def __init__(self, directory, device='cpu', num_steps=None):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.device = device
+        self.num_envs = self.meta['num_envs']
+        self.num_obs = self.meta['num_obs']
+        self.num_privileged_obs = self.meta['num_privileged_obs']
+        self.num_actions = self.meta['num_actions']
+        self.max_episode_length = self.meta['max_episode_length']
+        self.episode_info_keys = self.meta['episode_info_keys']
+        self.cfg = SimpleNamespace(
+            env=SimpleNamespace(num_actor_history=self.meta['num_actor_history']),
+            rewards=SimpleNamespace(reward_groups=self.meta['reward_groups'],
+                                    num_reward_groups=len(self.meta['reward_groups']),
+                                    reward_group_weights=self.meta['reward_group_weights']))
+
+        chunks = []
+        num_loaded = 0
+        for path in sorted(glob.glob(os.path.join(directory, 'chunk_*.pt'))):
+            if num_steps is not None and num_loaded >= num_steps:
+                break
+            chunks.append(torch.load(path, map_location='cpu'))
+            num_loaded += len(chunks[-1]['obs'])
+        if not chunks:
+            raise ValueError("No recorded chunks in " + directory)
+        self.data = {key: torch.cat([chunk[key] for chunk in chunks])[:num_steps].to(device) for key in chunks[0]}
+        self.data['obs'] = self.data['obs'].float()
+        if 'privileged_obs' in self.data:
+            self.data['privileged_obs'] = self.data['privileged_obs'].float()
+        self.num_recorded_steps = len(self.data['obs'])
+
+        self.step_index = self.num_recorded_steps - 1
+        self.episode_length_buf = torch.zeros(self.num_envs, dtype=torch.long, device=device)
+        self.extras = {}
+        self._load_step(self.step_index)
+
+    def _load_step(self, t):
+        self.obs_buf = self.data['obs'][t]
+        self.privileged_obs_buf = self.data['privileged_obs'][t] if 'privileged_obs' in self.data else None
+        self.rew_buf = self.data['rewards'][t]
+        self.reset_buf = self.data['dones'][t]
+        self.extras['time_outs'] = self.data['time_outs'][t]
+        if 'episode' in self.data:
+            self.extras['episode'] = self.data['episode'][t]
+
+    def step(self, actions):
+        self.step_index = (self.step_index + 1) % self.num_recorded_steps
+        self._load_step(self.step_index)
+        self.episode_length_buf += 1
+        self.episode_length_buf *= ~self.reset_buf
+        return self.obs_buf, self.privileged_obs_buf, self.rew_buf, self.reset_buf, self.extras
+
+    def reset(self, env_ids=None):
+        return self.obs_buf, self.privileged_obs_buf
+
+    def get_observations(self):
+        return self.obs_buf
+
+    def get_privileged_observations(self):
+        return self.privileged_obs_buf
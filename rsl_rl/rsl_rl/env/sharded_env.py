@@ -0,0 +1,308 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import pickle
+import traceback
+from multiprocessing.connection import wait
+
+import torch
+import torch.multiprocessing as mp
+
+from .vec_env import VecEnv
+
+
+def _to_cpu(value):
+    # sim device tensors are not sent through the pipes, they would be shared through CUDA IPC
+    if isinstance(value, torch.Tensor):
+        return value.cpu()
+    if isinstance(value, dict):
+        return {key: _to_cpu(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_cpu(v) for v in value)
+    return value
+
+def _picklable(value):
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return None
+
+def _worker(shard, env_fn, pipe, num_threads):
+    torch.set_num_threads(num_threads)
+    try:
+        env = env_fn(shard)
+        device = getattr(env, 'device', 'cpu')
+        pipe.send(('meta', {
+            'num_envs': env.num_envs,
+            'num_obs': env.num_obs,
+            'num_privileged_obs': env.num_privileged_obs,
+            'num_actions': env.num_actions,
+            'num_rewards': env.rew_buf.view(env.num_envs, -1).shape[1],
+            'max_episode_length': int(env.max_episode_length),
+            'episode_info_keys': list(getattr(env, 'episode_info_keys', [])),
+            'cfg': _picklable(getattr(env, 'cfg', None)),
+            'has_training_state': hasattr(env, 'get_training_state'),
+            }))
+        buffers, start, stop = pipe.recv()
+
+        def write(obs, privileged_obs):
+            buffers['obs'][start:stop].copy_(obs)
+            if privileged_obs is not None:
+                buffers['privileged_obs'][start:stop].copy_(privileged_obs)
+
+        while True:
+            command, data = pipe.recv()
+            if command == 'step':
+                obs, privileged_obs, rewards, dones, infos = env.step(buffers['actions'][start:stop].to(device))
+                write(obs, privileged_obs)
+                buffers['rewards'][start:stop].copy_(rewards.view(stop - start, -1))
+                buffers['dones'][start:stop].copy_(dones)
+                if 'time_outs' in infos:
+                    buffers['time_outs'][start:stop].copy_(infos['time_outs'])
+                if isinstance(infos.get('episode'), torch.Tensor):
+                    buffers['episode'][shard].copy_(infos['episode'])
+                pipe.send(('step', None))
+            elif command == 'reset':
+                write(*env.reset())
+                pipe.send(('reset', None))
+            elif command == 'get_attr':
+                pipe.send(('get_attr', _to_cpu(getattr(env, data))))
+            elif command == 'set_attr':
+                name, value = data
+                setattr(env, name, value.to(device) if isinstance(value, torch.Tensor) else value)
+                pipe.send(('set_attr', None))
+            elif command == 'call':
+                name, args = data
+                pipe.send(('call', _to_cpu(getattr(env, name)(*args))))
+            elif command == 'close':
+                pipe.send(('close', None))
+                break
+    except Exception:
+        pipe.send(('error', traceback.format_exc()))
+    finally:
+        pipe.close()
+
+
+class ShardedVecEnv(VecEnv):
+    """ Runs num_shards environments in worker processes and presents them as one VecEnv of the concatenated envs.
+
+        env_fn(shard_index) creates the env of a shard inside its worker, it must be picklable (a module level
+        function or a functools.partial of one). The workers read the actions from and write the observations,
+        rewards, dones and time outs into shared memory CPU tensors, the pipes only carry the commands.
+
+        mode='lockstep': step() steps all shards and waits for all of them.
+        mode='async': step_async(actions, shard_ids) / recv() step the shards independently, recv() returns as soon
+        as batch_shards shards finished their step, so fast shards do not wait for the slow ones. A shard is stepped
+        again only after recv() returned it. step() keeps the VecEnv semantics and waits for all shards in both modes.
+
+        extras['episode'] is the NaN ignoring mean of the packed episode infos of the shards.
+
+    Args:
+        env_fn (callable): Creates the env of a shard from its index
+        num_shards (int): Number of worker processes
+        mode (str, optional): 'lockstep' or 'async'. Defaults to 'lockstep'.
+        batch_shards (int, optional): Number of shards returned by recv() in async mode, None for all. Defaults to None.
+        device (str, optional): Device of the returned tensors. Defaults to 'cpu'.
+        num_threads (int, optional): Torch threads per worker. Defaults to 1.
+        start_method (str, optional): Multiprocessing start method. Defaults to 'spawn'.
+    """
+    def __init__(self, env_fn, num_shards, mode='lockstep', batch_shards=None, device='cpu', num_threads=1, start_method='spawn'):
+        if mode not in ('lockstep', 'async'):
+            raise ValueError("Unknown stepping mode: " + mode)
+        self.num_shards = num_shards
+        self.mode = mode
+        self.batch_shards = num_shards if batch_shards is None else batch_shards
+        self.device = device
+        self.closed = False
+
+        context = mp.get_context(start_method)
+        self.pipes = []
+        self.processes = []
+        for shard in range(num_shards):
+            pipe, worker_pipe = context.Pipe()
+            process = context.Process(target=_worker, args=(shard, env_fn, worker_pipe, num_threads), daemon=True)
+            process.start()
+            worker_pipe.close()
+            self.pipes.append(pipe)
+            self.processes.append(process)
+        metas = [self._recv(pipe) for pipe in self.pipes]
+
+        meta = metas[0]
+        self.shard_num_envs = [m['num_envs'] for m in metas]
+        self.shard_starts = [sum(self.shard_num_envs[:i]) for i in range(num_shards + 1)]
+        self.num_envs = self.shard_starts[-1]
+        self.num_obs = meta['num_obs']
+        self.num_privileged_obs = meta['num_privileged_obs']
+        self.num_actions = meta['num_actions']
+        self.max_episode_length = meta['max_episode_length']
+        self.episode_info_keys = meta['episode_info_keys']
+        self.cfg = meta['cfg']
+        self.has_training_state = meta['has_training_state']
+
+        def shared(*shape, dtype=torch.float):
+            return torch.zeros(*shape, dtype=dtype).share_memory_()
+        self.buffers = {
+            'actions': shared(self.num_envs, self.num_actions),
+            'obs': shared(self.num_envs, self.num_obs),
+            'rewards': shared(self.num_envs, meta['num_rewards']),
+            'dones': shared(self.num_envs, dtype=torch.long),
+            'time_outs': shared(self.num_envs, dtype=torch.bool),
+            'episode': shared(num_shards, len(self.episode_info_keys)).fill_(float('nan')),
+        }
+        if self.num_privileged_obs is not None:
+            self.buffers['privileged_obs'] = shared(self.num_envs, self.num_privileged_obs)
+        for shard, pipe in enumerate(self.pipes):
+            pipe.send((self.buffers, self.shard_starts[shard], self.shard_starts[shard + 1]))
+
+        self.pending = set()
+        self.extras = {}
+        self._gather(range(num_shards))
+
+    def _recv(self, pipe):
+        command, data = pipe.recv()
+        if command == 'error':
+            self.close()
+            raise RuntimeError("Worker of ShardedVecEnv failed:\n" + data)
+        return data
+
+    def _slices(self, shard_ids):
+        return [slice(self.shard_starts[shard], self.shard_starts[shard + 1]) for shard in shard_ids]
+
+    def _gather(self, shard_ids):
+        # copies the buffers of the shards, the workers overwrite them at their next step
+        shard_ids = list(shard_ids)
+        def batch(name):
+            if len(shard_ids) == self.num_shards:
+                return self.buffers[name].to(self.device, copy=True)
+            return torch.cat([self.buffers[name][s] for s in self._slices(shard_ids)]).to(self.device)
+        self.obs_buf = batch('obs')
+        self.privileged_obs_buf = batch('privileged_obs') if self.num_privileged_obs is not None else None
+        self.rew_buf = batch('rewards')
+        self.reset_buf = batch('dones')
+        self.extras['time_outs'] = batch('time_outs')
+        if self.episode_info_keys:
+            self.extras['episode'] = torch.nanmean(self.buffers['episode'][shard_ids], dim=0).to(self.device)
+        return self.obs_buf, self.privileged_obs_buf, self.rew_buf, self.reset_buf, self.extras
+
+    def step_async(self, actions, shard_ids=None):
+        """ Starts the step of the shards shard_ids (all by default), actions holds the actions of their envs in order
+        """
+        shard_ids = range(self.num_shards) if shard_ids is None else shard_ids
+        busy = self.pending.intersection(shard_ids)
+        if busy:
+            raise RuntimeError("Shards {} are still stepping, recv() them before stepping them again".format(sorted(busy)))
+        actions = actions.detach().cpu()
+        offset = 0
+        for shard, envs in zip(shard_ids, self._slices(shard_ids)):
+            size = envs.stop - envs.start
+            self.buffers['actions'][envs].copy_(actions[offset:offset + size])
+            offset += size
+            self.pipes[shard].send(('step', None))
+            self.pending.add(shard)
+
+    def recv(self):
+        """ Waits until batch_shards of the stepping shards are done (all of them in lockstep mode).
+
+        Returns:
+            shard ids, obs, privileged obs, rewards, dones and extras of the envs of these shards
+        """
+        if not self.pending:
+            raise RuntimeError("recv() without a pending step")
+        num_ready = len(self.pending) if self.mode == 'lockstep' else min(self.batch_shards, len(self.pending))
+        ready = self._wait(num_ready)
+        return (ready,) + self._gather(ready)
+
+    def _wait(self, num_ready):
+        # waits for num_ready of the pending shards and returns their sorted ids
+        ready = []
+        while len(ready) < num_ready:
+            for pipe in wait([self.pipes[shard] for shard in self.pending if shard not in ready]):
+                self._recv(pipe)
+                ready.append(self.pipes.index(pipe))
+        self.pending.difference_update(ready)
+        return sorted(ready)
+
+    def step(self, actions):
+        """ Steps all shards and waits for all of them, also in async mode
+        """
+        self.step_async(actions)
+        self._wait(len(self.pending))
+        return self._gather(range(self.num_shards))
+
+    def reset(self, env_ids=None):
+        """ Resets all envs of all shards
+        """
+        self._wait(len(self.pending))
+        for pipe in self.pipes:
+            pipe.send(('reset', None))
+        for pipe in self.pipes:
+            self._recv(pipe)
+        self._gather(range(self.num_shards))
+        return self.obs_buf, self.privileged_obs_buf
+
+    def get_observations(self):
+        return self.obs_buf
+
+    def get_privileged_observations(self):
+        return self.privileged_obs_buf
+
+    def get_attr(self, name):
+        """ Values of the attribute name of the envs of all shards
+        """
+        for pipe in self.pipes:
+            pipe.send(('get_attr', name))
+        return [self._recv(pipe) for pipe in self.pipes]
+
+    def set_attr(self, name, values):
+        """ Sets the attribute name of the env of each shard to the corresponding entry of values
+        """
+        for pipe, value in zip(self.pipes, values):
+            pipe.send(('set_attr', (name, value)))
+        for pipe in self.pipes:
+            self._recv(pipe)
+
+    def call(self, name, args_per_shard=None):
+        """ Calls the method name of the env of every shard, with the arguments args_per_shard[shard] if given
+        """
+        for shard, pipe in enumerate(self.pipes):
+            pipe.send(('call', (name, tuple(args_per_shard[shard]) if args_per_shard is not None else ())))
+        return [self._recv(pipe) for pipe in self.pipes]
+
+    @property
+    def episode_length_buf(self):
+        return torch.cat(self.get_attr('episode_length_buf')).to(self.device)
+
+    @episode_length_buf.setter
+    def episode_length_buf(self, value):
+        # e.g. the random initial episode lengths set by OnPolicyRunner.learn
+        self.set_attr('episode_length_buf', [value[envs].cpu() for envs in self._slices(range(self.num_shards))])
+
+    def get_training_state(self):
+        if not self.has_training_state:
+            return {}
+        return {'shards': self.call('get_training_state')}
+
+    def set_training_state(self, state):
+        if 'shards' not in state:
+            return
+        self.call('set_training_state', [(shard_state,) for shard_state in state['shards']])
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for pipe, process in zip(self.pipes, self.processes):
+            if process.is_alive():
+                try:
+                    pipe.send(('close', None))
+                except (BrokenPipeError, EOFError):
+                    pass
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    def __del__(self):
+        if hasattr(self, 'closed'):
+            self.close()
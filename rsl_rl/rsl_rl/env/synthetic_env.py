@@ -0,0 +1,129 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+from types import SimpleNamespace
+
+import torch
+
+from .vec_env import VecEnv
+
+
+class SyntheticVecEnv(VecEnv):
+    """ Pure PyTorch stand-in for the legged_gym tasks, used to benchmark the runner, PPO and the storage without a simulator.
+
+        The defaults match the shapes of the G1 tasks: 6 frames of 76 observations (456), 23 actions, 4 reward groups.
+        The state follows random linear dynamics driven by the actions, the observation is the history of the last
+        num_actor_history states. Environments are reset at random (probability reset_prob per step) and on time out.
+        The env publishes the same extras as the legged_gym tasks ('time_outs' and a packed 'episode' tensor).
+
+    Args:
+        num_envs (int): Number of environments
+        num_one_step_obs (int, optional): Size of one observation frame. Defaults to 76.
+        num_actor_history (int, optional): Number of frames in the observation. Defaults to 6.
+        num_actions (int, optional): Defaults to 23.
+        reward_groups (list[str], optional): Defaults to ['task', 'regu', 'style', 'target'].
+        reward_group_weights (list[float], optional): Defaults to [2.5, 0.1, 1, 1].
+        num_privileged_obs (int, optional): Size of the critic observation, None to share the actor observation. Defaults to None.
+        max_episode_length (int, optional): Defaults to 500 (10 s at 50 Hz).
+        reset_prob (float, optional): Probability of a random reset per env and step. Defaults to 0.002.
+        device (str, optional): Defaults to 'cpu'.
+        seed (int, optional): Seed of the generator of the dynamics, the noise and the resets. Defaults to 0.
+    """
+    def __init__(self,
+                 num_envs,
+                 num_one_step_obs=76,
+                 num_actor_history=6,
+                 num_actions=23,
+                 reward_groups=('task', 'regu', 'style', 'target'),
+                 reward_group_weights=(2.5, 0.1, 1., 1.),
+                 num_privileged_obs=None,
+                 max_episode_length=500,
+                 reset_prob=0.002,
+                 device='cpu',
+                 seed=0):
+        self.num_envs = num_envs
+        self.num_one_step_obs = num_one_step_obs
+        self.num_obs = num_actor_history * num_one_step_obs
+        self.num_privileged_obs = num_privileged_obs
+        self.num_actions = num_actions
+        self.max_episode_length = max_episode_length
+        self.reset_prob = reset_prob
+        self.device = device
+        self.reward_groups = list(reward_groups)
+        self.num_reward_groups = len(self.reward_groups)
+        # the attributes of the legged_gym config read by OnPolicyRunner
+        self.cfg = SimpleNamespace(
+            env=SimpleNamespace(num_actor_history=num_actor_history),
+            rewards=SimpleNamespace(reward_groups=self.reward_groups,
+                                    num_reward_groups=self.num_reward_groups,
+                                    reward_group_weights=list(reward_group_weights)))
+
+        self.generator = torch.Generator(device=device)
+        self.generator.manual_seed(seed)
+        scale = 1. / num_one_step_obs ** 0.5
+        self.state_matrix = torch.randn(num_one_step_obs, num_one_step_obs, generator=self.generator, device=device) * scale
+        self.action_matrix = torch.randn(num_actions, num_one_step_obs, generator=self.generator, device=device) * scale
+        self.reward_matrix = torch.randn(num_one_step_obs, self.num_reward_groups, generator=self.generator, device=device) * scale
+        if num_privileged_obs is not None:
+            self.privileged_matrix = torch.randn(num_one_step_obs, num_privileged_obs, generator=self.generator, device=device)
+
+        self.state = torch.zeros(num_envs, num_one_step_obs, dtype=torch.float, device=device)
+        self.obs_buf = torch.zeros(num_envs, self.num_obs, dtype=torch.float, device=device)
+        self.privileged_obs_buf = None
+        if num_privileged_obs is not None:
+            self.privileged_obs_buf = torch.zeros(num_envs, num_privileged_obs, dtype=torch.float, device=device)
+        self.rew_buf = torch.zeros(num_envs, self.num_reward_groups, dtype=torch.float, device=device)
+        self.reset_buf = torch.ones(num_envs, dtype=torch.long, device=device)
+        self.time_out_buf = torch.zeros(num_envs, dtype=torch.bool, device=device)
+        self.episode_length_buf = torch.zeros(num_envs, dtype=torch.long, device=device)
+        self.episode_sums = torch.zeros(num_envs, self.num_reward_groups, dtype=torch.float, device=device)
+
+        self.episode_info_keys = ['rew_' + group for group in self.reward_groups]
+        self.episode_info = torch.full((self.num_reward_groups,), float('nan'), dtype=torch.float, device=device)
+        self.extras = {'episode': self.episode_info, 'time_outs': self.time_out_buf}
+
+    def step(self, actions):
+        actions = torch.clip(actions, -100., 100.).to(self.device)
+        noise = 0.1 * torch.randn(self.num_envs, self.num_one_step_obs, generator=self.generator, device=self.device)
+        self.state = torch.tanh(self.state @ self.state_matrix + actions @ self.action_matrix + noise)
+        self.obs_buf = torch.cat((self.obs_buf[:, self.num_one_step_obs:], self.state), dim=1)
+        if self.privileged_obs_buf is not None:
+            self.privileged_obs_buf = self.state @ self.privileged_matrix
+
+        self.rew_buf = self.state @ self.reward_matrix
+        self.rew_buf[:, 0] = torch.exp(-torch.square(actions).mean(dim=1)) # positive task reward, as the product of the task terms
+        self.episode_sums += self.rew_buf
+        self.episode_length_buf += 1
+
+        self.time_out_buf = self.episode_length_buf >= self.max_episode_length
+        random_resets = torch.rand(self.num_envs, generator=self.generator, device=self.device) < self.reset_prob
+        self.reset_buf = (self.time_out_buf | random_resets).long()
+        self._reset_done()
+        self.extras['time_outs'] = self.time_out_buf
+        return self.obs_buf, self.privileged_obs_buf, self.rew_buf, self.reset_buf, self.extras
+
+    def _reset_done(self):
+        # masked, so that a step has no host synchronization; envs without reset keep their state.
+        # The observation history is kept across resets like in the legged_gym envs, it slides by one frame per step
+        done = self.reset_buf.bool()
+        num_done = done.sum()
+        self.episode_info.copy_((self.episode_sums * done.unsqueeze(1)).sum(dim=0) / num_done) # NaN without resets
+        keep = (~done).unsqueeze(1).float()
+        self.state *= keep
+        self.episode_sums *= keep
+        self.episode_length_buf *= (~done).long()
+
+    def reset(self, env_ids=None):
+        if env_ids is None:
+            env_ids = torch.arange(self.num_envs, device=self.device)
+        self.reset_buf[:] = 0
+        self.reset_buf[env_ids] = 1
+        self._reset_done()
+        obs, privileged_obs, _, _, _ = self.step(torch.zeros(self.num_envs, self.num_actions, device=self.device))
+        return obs, privileged_obs
+
+    def get_observations(self):
+        return self.obs_buf
+
+    def get_privileged_observations(self):
+        return self.privileged_obs_buf
@@ -45,6 +45,7 @@ class VecEnv(ABC):
     reset_buf: torch.Tensor
     episode_length_buf: torch.Tensor # current episode duration
     extras: dict
+    episode_info_keys: list # names of the entries of the packed extras['episode'] tensor
     device: torch.device
     @abstractmethod
     def step(self, actions: torch.Tensor) -> Tuple[torch.Tensor, Union[torch.Tensor, None], torch.Tensor, torch.Tensor, dict]:
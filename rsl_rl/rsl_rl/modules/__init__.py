@@ -28,4 +28,5 @@
 #
 # Copyright (c) 2021 ETH Zurich, Nikita Rudin
 
-from .actor_critic import ActorCritic
\ No newline at end of file
+from .actor_critic import ActorCritic
+from .ensemble_critic import EnsembleCritic
\ No newline at end of file
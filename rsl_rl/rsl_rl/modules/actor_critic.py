@@ -32,9 +32,11 @@ import numpy as np
 
 import torch
 import torch.nn as nn
-from torch.distributions import Normal
 from torch.nn.modules import rnn
 
+from .ensemble_critic import EnsembleCritic
+from .gaussian import gaussian_sample, gaussian_log_prob, gaussian_entropy, gaussian_sample_log_prob
+
 class ActorCritic(nn.Module):
     is_recurrent = False
     def __init__(self,  num_actor_obs,
@@ -68,27 +70,15 @@ class ActorCritic(nn.Module):
                 actor_layers.append(activation)
         self.actor = nn.Sequential(*actor_layers)
 
-        # Multi-Critic Network
-        self.critics = nn.ModuleList()
-        for _ in range(num_critics):
-            critic_layers = []
-            critic_layers.append(nn.Linear(mlp_input_dim_c, critic_hidden_dims[0]))
-            critic_layers.append(activation)
-            for l in range(len(critic_hidden_dims)):
-                if l == len(critic_hidden_dims) - 1:
-                    critic_layers.append(nn.Linear(critic_hidden_dims[l], 1))
-                else:
-                    critic_layers.append(nn.Linear(critic_hidden_dims[l], critic_hidden_dims[l + 1]))
-                    critic_layers.append(activation)
-            self.critics.append(nn.Sequential(*critic_layers))
+        # Multi-Critic Network, one MLP per reward group evaluated as a batched ensemble
+        self.critics = EnsembleCritic(num_critics, mlp_input_dim_c, critic_hidden_dims, activation)
 
         self.num_critics = num_critics
 
         # Action noise
         self.std = nn.Parameter(init_noise_std * torch.ones(num_actions))
-        self.distribution = None
-        # disable args validation for speedup
-        Normal.set_default_validate_args = False
+        # mean of the diagonal Gaussian policy, set by update_distribution
+        self.distribution_mean = None
 
     @staticmethod
     # not used at the moment
@@ -104,33 +94,42 @@ class ActorCritic(nn.Module):
     
     @property
     def action_mean(self):
-        return self.distribution.mean
+        return self.distribution_mean
 
     @property
     def action_std(self):
-        return self.distribution.stddev
+        return self.std.expand_as(self.distribution_mean)
     
     @property
     def entropy(self):
-        return self.distribution.entropy().sum(dim=-1)
+        return gaussian_entropy(self.std, self.distribution_mean.shape[:-1])
 
     def update_distribution(self, observations):
         mean = self.actor(observations)
-        self.distribution = Normal(mean, mean*0. + self.std)
+        self.update_distribution_from_mean(mean)
+
+    def update_distribution_from_mean(self, mean):
+        self.distribution_mean = mean
 
     def act(self, observations, **kwargs):
         self.update_distribution(observations)
-        return self.distribution.sample()
+        return gaussian_sample(self.distribution_mean, self.std)
+
+    def act_with_log_prob(self, observations, **kwargs):
+        """ Samples actions and returns them with their log probability, the action mean, std and entropy
+        """
+        self.update_distribution(observations)
+        return gaussian_sample_log_prob(self.distribution_mean, self.std)
     
     def get_actions_log_prob(self, actions):
-        return self.distribution.log_prob(actions).sum(dim=-1)
+        return gaussian_log_prob(actions, self.distribution_mean, self.std)
 
     def act_inference(self, observations):
         actions_mean = self.actor(observations)
         return actions_mean
 
     def evaluate(self, critic_observations, **kwargs):
-        values = torch.concat([critic(critic_observations) for critic in self.critics], dim=-1)
+        values = self.critics(critic_observations)
         return values
 
 
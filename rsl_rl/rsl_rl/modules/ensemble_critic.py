@@ -0,0 +1,95 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import copy
+
+import torch
+import torch.nn as nn
+
+
+class EnsembleCritic(nn.Module):
+    """ A group of MLP critics with identical architecture, one per reward group.
+        The weights of all critics are stacked so that every layer is evaluated with a single batched matmul.
+        The state dict uses the layout of nn.ModuleList([nn.Sequential(...), ...]) so that checkpoints
+        of the per-critic implementation can be loaded (and vice versa).
+    """
+    def __init__(self, num_critics, input_dim, hidden_dims, activation):
+        super().__init__()
+        self.num_critics = num_critics
+        self.activation = activation
+        dims = [input_dim] + list(hidden_dims) + [1]
+        self.num_layers = len(dims) - 1
+
+        # initialize each critic like nn.Linear, in the same order as the per-critic implementation
+        # parameters are registered on this module directly so that the state dict hooks below see all of them
+        layers = [[nn.Linear(dims[l], dims[l + 1]) for l in range(self.num_layers)] for _ in range(num_critics)]
+        for l in range(self.num_layers):
+            self.register_parameter('weight{}'.format(l), nn.Parameter(torch.stack([layers[c][l].weight.data.t() for c in range(num_critics)]).contiguous())) # [num_critics, in, out]
+            self.register_parameter('bias{}'.format(l), nn.Parameter(torch.stack([layers[c][l].bias.data.unsqueeze(0) for c in range(num_critics)]).contiguous())) # [num_critics, 1, out]
+
+    @property
+    def weights(self):
+        return [getattr(self, 'weight{}'.format(l)) for l in range(self.num_layers)]
+
+    @property
+    def biases(self):
+        return [getattr(self, 'bias{}'.format(l)) for l in range(self.num_layers)]
+
+    def forward(self, observations):
+        batch_shape = observations.shape[:-1]
+        x = observations.reshape(1, -1, observations.shape[-1]).expand(self.num_critics, -1, -1)
+        for l, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = torch.baddbmm(bias, x, weight)
+            if l < self.num_layers - 1:
+                x = self.activation(x)
+        # [num_critics, batch, 1] -> [batch, num_critics]
+        return x.squeeze(-1).transpose(0, 1).reshape(*batch_shape, self.num_critics)
+
+    def _sequential_key(self, prefix, critic_idx, layer_idx, name):
+        # linear layers are interleaved with activations in the per-critic nn.Sequential
+        return "{}{}.{}.{}".format(prefix, critic_idx, 2 * layer_idx, name)
+
+    def _save_to_state_dict(self, destination, prefix, keep_vars):
+        for l, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            if not keep_vars:
+                weight, bias = weight.detach(), bias.detach()
+            for c in range(self.num_critics):
+                destination[self._sequential_key(prefix, c, l, 'weight')] = weight[c].t()
+                destination[self._sequential_key(prefix, c, l, 'bias')] = bias[c, 0]
+
+    def _load_from_state_dict(self, state_dict, prefix, local_metadata, strict, missing_keys, unexpected_keys, error_msgs):
+        expected_keys = set()
+        for l, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            for c in range(self.num_critics):
+                for name, param in [('weight', weight), ('bias', bias)]:
+                    key = self._sequential_key(prefix, c, l, name)
+                    expected_keys.add(key)
+                    if key not in state_dict:
+                        missing_keys.append(key)
+                        continue
+                    value = state_dict[key].t() if name == 'weight' else state_dict[key].unsqueeze(0)
+                    if value.shape != param.shape[1:]:
+                        error_msgs.append("size mismatch for {}: copying a param with shape {} from checkpoint, "
+                                          "the shape in current model is {}.".format(key, tuple(state_dict[key].shape), tuple(param.shape[1:])))
+                        continue
+                    with torch.no_grad():
+                        param[c].copy_(value)
+        if strict:
+            for key in state_dict.keys():
+                if key.startswith(prefix) and key not in expected_keys:
+                    unexpected_keys.append(key)
+
+    def to_module_list(self):
+        """ Returns the equivalent per-critic nn.ModuleList
+        """
+        dims = [weight.shape[1] for weight in self.weights] + [1]
+        critics = nn.ModuleList()
+        for _ in range(self.num_critics):
+            critic_layers = []
+            for l in range(self.num_layers):
+                critic_layers.append(nn.Linear(dims[l], dims[l + 1]))
+                if l < self.num_layers - 1:
+                    critic_layers.append(copy.deepcopy(self.activation))
+            critics.append(nn.Sequential(*critic_layers))
+        critics.load_state_dict(self.state_dict())
+        return critics.to(self.weight0.device)
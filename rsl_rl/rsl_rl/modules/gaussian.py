@@ -0,0 +1,37 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import math
+
+import torch
+
+_LOG_SQRT_2PI = 0.5 * math.log(2.0 * math.pi)
+
+
+def gaussian_sample(mean, std):
+    """ Samples from the diagonal Gaussian N(mean, std), std is broadcast against mean without being materialized
+    """
+    with torch.no_grad():
+        return torch.addcmul(mean, torch.randn_like(mean), std)
+
+def gaussian_log_prob(actions, mean, std):
+    """ Log probability of actions under N(mean, std), summed over the action dimension.
+        Matches Normal(mean, std).log_prob(actions).sum(dim=-1) for a state independent std of shape [num_actions].
+    """
+    log_std_sum = torch.log(std).sum(dim=-1)
+    return -0.5 * torch.square((actions - mean) / std).sum(dim=-1) - log_std_sum - mean.shape[-1] * _LOG_SQRT_2PI
+
+def gaussian_entropy(std, batch_shape):
+    """ Closed form entropy of N(., std), summed over the action dimension and expanded (without copy) to batch_shape
+    """
+    entropy = (0.5 + _LOG_SQRT_2PI + torch.log(std)).sum(dim=-1)
+    return entropy.expand(batch_shape)
+
+def gaussian_sample_log_prob(mean, std):
+    """ Samples actions and returns them with their log probability, mean, std and entropy in one call.
+        The std is returned as a broadcast view of shape mean.shape.
+    """
+    actions = gaussian_sample(mean, std)
+    log_prob = gaussian_log_prob(actions, mean, std)
+    entropy = gaussian_entropy(std, mean.shape[:-1])
+    return actions, log_prob, mean, std.expand_as(mean), entropy
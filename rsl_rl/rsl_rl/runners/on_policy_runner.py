@@ -30,8 +30,12 @@
 
 import time
 import os
-from collections import deque
-import statistics
+import copy
+import math
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from torch.utils.tensorboard import SummaryWriter
 import torch
@@ -39,6 +43,8 @@ import torch
 from rsl_rl.algorithms import PPO
 from rsl_rl.modules import ActorCritic
 from rsl_rl.env import VecEnv
+from rsl_rl.utils import EpisodeStatistics, CheckpointWriter, profiler, get_rng_state, set_rng_state, offset_rng_state, \
+    get_rank, get_world_size, all_reduce_sum, broadcast_parameters
 
 
 class OnPolicyRunner:
@@ -57,6 +63,7 @@ class OnPolicyRunner:
         self.env = env
         self.num_critics = env_cfg.rewards.num_reward_groups
         self.reward_group_weights = env_cfg.rewards.reward_group_weights
+        self.reward_groups = getattr(env_cfg.rewards, 'reward_groups', [str(i) for i in range(self.num_critics)])
         if self.env.num_privileged_obs is not None:
             num_critic_obs = self.env.num_privileged_obs 
         else:
@@ -69,25 +76,74 @@ class OnPolicyRunner:
                                                         **self.policy_cfg).to(self.device)
         alg_class = eval(self.cfg["algorithm_class_name"]) # PPO
         self.alg: PPO = alg_class(actor_critic, self.reward_group_weights, device=self.device, **self.alg_cfg)
+        # data parallel training: every rank steps its own envs into its own storage, PPO averages the gradients
+        self.rank = get_rank()
+        self.world_size = get_world_size()
+        broadcast_parameters(self.alg.actor_critic)
         self.num_steps_per_env = self.cfg["num_steps_per_env"]
         self.save_interval = self.cfg["save_interval"]
 
         # init storage and model
-        self.alg.init_storage(self.env.num_envs, self.num_steps_per_env, [self.env.num_obs], [self.env.num_privileged_obs], [self.env.num_actions], self.num_critics)
+        # store a single observation frame per step and rebuild the actor history window when sampling
+        obs_history_length = getattr(env_cfg.env, 'num_actor_history', 1) if self.cfg.get("dedup_obs_history", False) else 1
+        if obs_history_length > 1 and getattr(env_cfg.env, 'posture_bank', False):
+            # resets into the posture bank clear the history, the windows no longer slide by one frame per step
+            print("dedup_obs_history is not supported with env.posture_bank, the full observations are stored.")
+            obs_history_length = 1
+        # pipelined mode: the env collects into one storage buffer with a copy of the previous policy while PPO
+        # updates the policy on the other buffer, the policy lag of one iteration is corrected by the PPO importance ratio
+        self.pipeline = self.cfg.get("pipeline", False)
+        num_buffers = 2 if self.pipeline else 1
+        self.alg.init_storage(self.env.num_envs, self.num_steps_per_env, [self.env.num_obs], [self.env.num_privileged_obs], [self.env.num_actions], self.num_critics, obs_history_length, num_buffers)
+        storage_memory = self.alg.storage.get_memory_usage()
+        print("Rollout storage: {:.1f} MB ({}){}".format(num_buffers * sum(storage_memory.values()) / 2**20,
+              ", ".join("{} {:.1f}".format(name, size / 2**20) for name, size in storage_memory.items()),
+              " x {} buffers".format(num_buffers) if num_buffers > 1 else ""))
+        self.update_executor = None
+        self.update_future = None
+        self.update_stream = None
+        if self.pipeline:
+            self.alg.policy = copy.deepcopy(self.alg.actor_critic).requires_grad_(False)
+            self.update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PPOUpdate')
+            if 'cuda' in str(self.device):
+                self.update_stream = torch.cuda.Stream(device=self.device)
 
-        # Log
-        self.log_dir = log_dir
+        # Log, only rank 0 logs and saves checkpoints
+        self.log_dir = log_dir if self.rank == 0 else None
+        # the episode statistics are pooled over the ranks, which all have to take part in the reduction
+        self.collect_statistics = self.log_dir is not None or self.world_size > 1
         self.writer = None
+        self.checkpoint_writer = None
+        self.checkpoint_metrics = {}
+        self.pending_signal = None
+        self.resume_training_state = None
         self.tot_timesteps = 0
         self.tot_time = 0
         self.current_learning_iteration = 0
 
+        # opt-in timing of the named scopes of the runner, PPO, the storage and the env, and torch.profiler trace export
+        self.profile_trace_start = self.cfg.get("profile_trace_start", -1)
+        self.profile_trace_iterations = self.cfg.get("profile_trace_iterations", 3)
+        self.trace = None
+        if self.cfg.get("profile", False) or self.profile_trace_start >= 0:
+            # the learner thread of the pipeline runs on its own stream, a device synchronization would serialize it
+            # with the collection
+            profiler.enable(self.device, stream_sync=self.pipeline)
+
         _, _ = self.env.reset()
     
     def learn(self, num_learning_iterations, init_at_random_ep_len=False):
         # initialize writer
         if self.log_dir is not None and self.writer is None:
             self.writer = SummaryWriter(log_dir=self.log_dir, flush_secs=10)
+        if self.log_dir is not None and self.checkpoint_writer is None:
+            self.checkpoint_writer = CheckpointWriter(self.log_dir,
+                                                      keep_last=self.cfg.get("keep_last_checkpoints", 0),
+                                                      best_metric=self.cfg.get("best_checkpoint_metric", None),
+                                                      async_write=self.cfg.get("async_save", True))
+        if self.resume_training_state is not None:
+            self._load_training_state(self.resume_training_state)
+            self.resume_training_state = None
         if init_at_random_ep_len:
             self.env.episode_length_buf = torch.randint_like(self.env.episode_length_buf, high=int(self.env.max_episode_length))
         obs = self.env.get_observations()
@@ -95,102 +151,226 @@ class OnPolicyRunner:
         critic_obs = privileged_obs if privileged_obs is not None else obs
         obs, critic_obs = obs.to(self.device), critic_obs.to(self.device)
         self.alg.actor_critic.train() # switch to train mode (for dropout for example)
+        self.alg.policy.train()
 
-        ep_infos = []
-        rewbuffer = deque(maxlen=100)
-        lenbuffer = deque(maxlen=100)
-        cur_reward_sum = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
-        cur_episode_length = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
+        # packed episode infos of the env (extras['episode']), accumulated on device and reduced once per iteration
+        episode_info_keys = getattr(self.env, 'episode_info_keys', [])
+        ep_info_sum = torch.zeros(len(episode_info_keys), dtype=torch.float, device=self.device)
+        ep_info_count = torch.zeros(len(episode_info_keys), dtype=torch.float, device=self.device)
+        episode_statistics = EpisodeStatistics(self.env.num_envs, self.num_critics, window_size=100, device=self.device)
 
+        previous_handlers = self._install_signal_handlers()
         tot_iter = self.current_learning_iteration + num_learning_iterations
         for it in range(self.current_learning_iteration, tot_iter):
+            self._update_trace(it)
             start = time.time()
+            iteration_start = start
             # Rollout
             with torch.inference_mode():
                 for i in range(self.num_steps_per_env):
                     actions = self.alg.act(obs, critic_obs)
-                    obs, privileged_obs, rewards, dones, infos = self.env.step(actions)
+                    with profiler.scope('runner/env_step'):
+                        obs, privileged_obs, rewards, dones, infos = self.env.step(actions)
                     critic_obs = privileged_obs if privileged_obs is not None else obs
                     obs, critic_obs, rewards, dones = obs.to(self.device), critic_obs.to(self.device), rewards.to(self.device), dones.to(self.device)
                     self.alg.process_env_step(rewards, dones, infos)
-                    if self.log_dir is not None:
+                    if self.collect_statistics:
                         # Book keeping
-                        if 'episode' in infos:
-                            ep_infos.append(infos['episode'])
-                        cur_reward_sum += rewards.sum(-1)
-                        cur_episode_length += 1
-                        new_ids = (dones > 0).nonzero(as_tuple=False)
-                        rewbuffer.extend(cur_reward_sum[new_ids][:, 0].cpu().numpy().tolist())
-                        lenbuffer.extend(cur_episode_length[new_ids][:, 0].cpu().numpy().tolist())
-                        cur_reward_sum[new_ids] = 0
-                        cur_episode_length[new_ids] = 0
+                        with profiler.scope('runner/book_keeping'):
+                            if 'episode' in infos:
+                                ep_info = infos['episode'].to(self.device)
+                                ep_info_sum += torch.nan_to_num(ep_info)
+                                ep_info_count += ~torch.isnan(ep_info)
+                            episode_statistics.record(rewards, dones)
 
                 stop = time.time()
                 collection_time = stop - start
 
                 # Learning step
                 start = stop
+                if self.pipeline:
+                    # the update of the previous buffer ran during this collection, learn_time is its duration.
+                    # It is finished before the collectives of this thread (advantage moments, episode statistics)
+                    # so that all ranks issue their collectives in the same order
+                    mean_value_loss, mean_surrogate_loss, learn_time = self._finish_update()
                 self.alg.compute_returns(critic_obs)
             
-            mean_value_loss, mean_surrogate_loss = self.alg.update()
-            stop = time.time()
-            learn_time = stop - start
+            if self.pipeline:
+                iteration_time = time.time() - iteration_start
+                # fraction of the shorter of collection and learning hidden behind the longer one
+                overlap_efficiency = min(max((collection_time + learn_time - iteration_time) / max(min(collection_time, learn_time), 1e-6), 0.), 1.)
+            else:
+                mean_value_loss, mean_surrogate_loss = self.alg.update()
+                stop = time.time()
+                learn_time = stop - start
+                iteration_time = collection_time + learn_time
+            timings = profiler.collect() if profiler.enabled else None
+            if self.collect_statistics:
+                episode_stats = episode_statistics.summary() # single device to host transfer per iteration
+                if self.world_size > 1:
+                    ep_info_sum, ep_info_count = all_reduce_sum(torch.cat((ep_info_sum, ep_info_count))).chunk(2)
             if self.log_dir is not None:
+                if episode_stats is not None:
+                    self.checkpoint_metrics = {'mean_reward': episode_stats['mean_reward'],
+                                               'mean_episode_length': episode_stats['mean_episode_length']}
                 self.log(locals())
-            if it % self.save_interval == 0:
-                self.save(os.path.join(self.log_dir, 'model_{}.pt'.format(it)))
-            ep_infos.clear()
+            if self.log_dir is not None and (it % self.save_interval == 0 or self.pending_signal is not None):
+                self.save(os.path.join(self.log_dir, 'model_{}.pt'.format(it)), iteration=it)
+            ep_info_sum.zero_()
+            ep_info_count.zero_()
+            if self.pending_signal is not None:
+                self._handle_signal(previous_handlers)
+            if self.pipeline:
+                self._start_update()
         
+        if self.pipeline:
+            self._finish_update()
+        self._restore_signal_handlers(previous_handlers)
+        self._stop_trace()
         self.current_learning_iteration += num_learning_iterations
-        self.save(os.path.join(self.log_dir, 'model_{}.pt'.format(self.current_learning_iteration)))
+        if self.log_dir is not None:
+            self.save(os.path.join(self.log_dir, 'model_{}.pt'.format(self.current_learning_iteration)))
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+
+    def _start_update(self):
+        """ Hands the filled storage buffer to the learner thread and continues the collection in the other one
+        """
+        storage = self.alg.swap_storage()
+        if self.update_stream is not None:
+            # the learner stream must see the rollout written on the current stream
+            self.update_stream.wait_stream(torch.cuda.current_stream(self.device))
+        self.update_future = self.update_executor.submit(self._run_update, storage)
+
+    def _run_update(self, storage):
+        start = time.time()
+        if self.update_stream is None:
+            mean_value_loss, mean_surrogate_loss = self.alg.update(storage)
+        else:
+            with torch.cuda.stream(self.update_stream):
+                mean_value_loss, mean_surrogate_loss = self.alg.update(storage)
+            self.update_stream.synchronize()
+        return mean_value_loss, mean_surrogate_loss, time.time() - start
+
+    def _finish_update(self):
+        """ Waits for the learner thread and copies the updated weights into the acting policy.
+            Returns the losses and the duration of the update, NaN losses if no update was running.
+        """
+        if self.update_future is None:
+            return float('nan'), float('nan'), 0.
+        future, self.update_future = self.update_future, None
+        result = future.result()
+        self.alg.policy.load_state_dict(self.alg.actor_critic.state_dict())
+        return result
+
+    def _install_signal_handlers(self):
+        """ SIGUSR1 and SIGTERM request a checkpoint at the end of the current iteration, SIGTERM then stops the run
+        """
+        if not self.cfg.get("save_on_signal", True) or threading.current_thread() is not threading.main_thread():
+            return {}
+        previous_handlers = {}
+        for signum in [signal.SIGTERM, getattr(signal, 'SIGUSR1', None)]:
+            if signum is not None:
+                previous_handlers[signum] = signal.signal(signum, self._on_signal)
+        return previous_handlers
+
+    def _restore_signal_handlers(self, previous_handlers):
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+    def _on_signal(self, signum, frame):
+        self.pending_signal = signum
+
+    def _handle_signal(self, previous_handlers):
+        signum, self.pending_signal = self.pending_signal, None
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+        print("Received signal {}, training state saved.".format(signum))
+        if signum == signal.SIGTERM:
+            self._restore_signal_handlers(previous_handlers)
+            self._stop_trace()
+            sys.exit(128 + signum)
+
+    def _update_trace(self, it):
+        """ Records a torch.profiler trace of the iterations [profile_trace_start, profile_trace_start + profile_trace_iterations)
+        """
+        if self.profile_trace_start < 0 or self.log_dir is None:
+            return
+        if it == self.profile_trace_start:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if 'cuda' in str(self.device):
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.trace = torch.profiler.profile(activities=activities)
+            self.trace.start()
+        elif it == self.profile_trace_start + self.profile_trace_iterations:
+            self._stop_trace()
+
+    def _stop_trace(self):
+        if self.trace is None:
+            return
+        self.trace.stop()
+        path = os.path.join(self.log_dir, 'trace_{}.json'.format(self.profile_trace_start))
+        self.trace.export_chrome_trace(path)
+        print("Chrome trace written to {}".format(path))
+        self.trace = None
 
     def log(self, locs, width=80, pad=35):
-        self.tot_timesteps += self.num_steps_per_env * self.env.num_envs
-        self.tot_time += locs['collection_time'] + locs['learn_time']
-        iteration_time = locs['collection_time'] + locs['learn_time']
+        self.tot_timesteps += self.num_steps_per_env * self.env.num_envs * self.world_size
+        iteration_time = locs['iteration_time']
+        self.tot_time += iteration_time
 
         ep_string = f''
-        if locs['ep_infos']:
-            for key in locs['ep_infos'][0]:
-                infotensor = torch.tensor([], device=self.device)
-                for ep_info in locs['ep_infos']:
-                    # handle scalar and zero dimensional tensor infos
-                    if not isinstance(ep_info[key], torch.Tensor):
-                        ep_info[key] = torch.Tensor([ep_info[key]])
-                    if len(ep_info[key].shape) == 0:
-                        ep_info[key] = ep_info[key].unsqueeze(0)
-                    infotensor = torch.cat((infotensor, ep_info[key].to(self.device)))
-                value = torch.mean(infotensor)
+        if locs['episode_info_keys']:
+            # single device to host transfer, keys that were not logged during the iteration are NaN
+            ep_info_mean = (locs['ep_info_sum'] / locs['ep_info_count']).tolist()
+            for key, value in zip(locs['episode_info_keys'], ep_info_mean):
+                if math.isnan(value):
+                    continue
                 self.writer.add_scalar('Episode/' + key, value, locs['it'])
                 ep_string += f"""{f'Mean episode {key}:':>{pad}} {value:.4f}\n"""
-        mean_std = self.alg.actor_critic.std.mean()
-        fps = int(self.num_steps_per_env * self.env.num_envs / (locs['collection_time'] + locs['learn_time']))
+        if locs['timings']:
+            for name, (total, count) in sorted(locs['timings'].items()):
+                self.writer.add_scalar('Profile/' + name, total * 1000, locs['it'])
+                ep_string += f"""{f'{name}:':>{pad}} {total * 1000:.1f} ms ({count} calls)\n"""
+        mean_std = self.alg.actor_critic.std.mean().item()
+        fps = int(self.num_steps_per_env * self.env.num_envs * self.world_size / iteration_time)
+        if self.pipeline:
+            self.writer.add_scalar('Perf/overlap_efficiency', locs['overlap_efficiency'], locs['it'])
+            ep_string += f"""{'Overlap efficiency:':>{pad}} {locs['overlap_efficiency']:.2f}\n"""
 
         self.writer.add_scalar('Loss/value_function', locs['mean_value_loss'], locs['it'])
         self.writer.add_scalar('Loss/surrogate', locs['mean_surrogate_loss'], locs['it'])
         self.writer.add_scalar('Loss/learning_rate', self.alg.learning_rate, locs['it'])
-        self.writer.add_scalar('Policy/mean_noise_std', mean_std.item(), locs['it'])
+        self.writer.add_scalar('Policy/mean_noise_std', mean_std, locs['it'])
+        if self.alg.mean_action_smoothness is not None:
+            self.writer.add_scalar('Policy/action_smoothness', self.alg.mean_action_smoothness, locs['it'])
         self.writer.add_scalar('Perf/total_fps', fps, locs['it'])
         self.writer.add_scalar('Perf/collection time', locs['collection_time'], locs['it'])
         self.writer.add_scalar('Perf/learning_time', locs['learn_time'], locs['it'])
-        if len(locs['rewbuffer']) > 0:
-            self.writer.add_scalar('Train/mean_reward', statistics.mean(locs['rewbuffer']), locs['it'])
-            self.writer.add_scalar('Train/mean_episode_length', statistics.mean(locs['lenbuffer']), locs['it'])
-            self.writer.add_scalar('Train/mean_reward/time', statistics.mean(locs['rewbuffer']), self.tot_time)
-            self.writer.add_scalar('Train/mean_episode_length/time', statistics.mean(locs['lenbuffer']), self.tot_time)
+        episode_stats = locs['episode_stats']
+        if episode_stats is not None:
+            self.writer.add_scalar('Train/mean_reward', episode_stats['mean_reward'], locs['it'])
+            self.writer.add_scalar('Train/mean_episode_length', episode_stats['mean_episode_length'], locs['it'])
+            self.writer.add_scalar('Train/mean_reward/time', episode_stats['mean_reward'], self.tot_time)
+            self.writer.add_scalar('Train/mean_episode_length/time', episode_stats['mean_episode_length'], self.tot_time)
+            for group, value in zip(self.reward_groups, episode_stats['mean_group_rewards']):
+                self.writer.add_scalar('Train/mean_reward_' + group, value, locs['it'])
+            for percentile, value in zip(locs['episode_statistics'].percentiles, episode_stats['reward_percentiles']):
+                self.writer.add_scalar('Train/reward_p{}'.format(percentile), value, locs['it'])
 
         str = f" \033[1m Learning iteration {locs['it']}/{self.current_learning_iteration + locs['num_learning_iterations']} \033[0m "
 
-        if len(locs['rewbuffer']) > 0:
+        if episode_stats is not None:
             log_string = (f"""{'#' * width}\n"""
                           f"""{str.center(width, ' ')}\n\n"""
                           f"""{'Computation:':>{pad}} {fps:.0f} steps/s (collection: {locs[
                             'collection_time']:.3f}s, learning {locs['learn_time']:.3f}s)\n"""
                           f"""{'Value function loss:':>{pad}} {locs['mean_value_loss']:.4f}\n"""
                           f"""{'Surrogate loss:':>{pad}} {locs['mean_surrogate_loss']:.4f}\n"""
-                          f"""{'Mean action noise std:':>{pad}} {mean_std.item():.2f}\n"""
-                          f"""{'Mean reward:':>{pad}} {statistics.mean(locs['rewbuffer']):.2f}\n"""
-                          f"""{'Mean episode length:':>{pad}} {statistics.mean(locs['lenbuffer']):.2f}\n""")
+                          f"""{'Mean action noise std:':>{pad}} {mean_std:.2f}\n"""
+                          f"""{'Mean reward:':>{pad}} {episode_stats['mean_reward']:.2f}\n"""
+                          f"""{'Mean reward per group:':>{pad}} {' '.join(f'{value:.2f}' for value in episode_stats['mean_group_rewards'])}\n"""
+                          f"""{'Mean episode length:':>{pad}} {episode_stats['mean_episode_length']:.2f}\n""")
                         #   f"""{'Mean reward/step:':>{pad}} {locs['mean_reward']:.2f}\n"""
                         #   f"""{'Mean episode length/episode:':>{pad}} {locs['mean_trajectory_length']:.2f}\n""")
         else:
@@ -200,7 +380,7 @@ class OnPolicyRunner:
                             'collection_time']:.3f}s, learning {locs['learn_time']:.3f}s)\n"""
                           f"""{'Value function loss:':>{pad}} {locs['mean_value_loss']:.4f}\n"""
                           f"""{'Surrogate loss:':>{pad}} {locs['mean_surrogate_loss']:.4f}\n"""
-                          f"""{'Mean action noise std:':>{pad}} {mean_std.item():.2f}\n""")
+                          f"""{'Mean action noise std:':>{pad}} {mean_std:.2f}\n""")
                         #   f"""{'Mean reward/step:':>{pad}} {locs['mean_reward']:.2f}\n"""
                         #   f"""{'Mean episode length/episode:':>{pad}} {locs['mean_trajectory_length']:.2f}\n""")
 
@@ -213,22 +393,65 @@ class OnPolicyRunner:
                                locs['num_learning_iterations'] - locs['it']):.1f}s\n""")
         print(log_string)
 
-    def save(self, path, infos=None):
-        torch.save({
+    def save(self, path, infos=None, iteration=None):
+        """ Saves the model and optimizer together with the training state needed to resume the run where it stopped:
+            learning rate, logging counters, env curriculum / randomization state and RNG states.
+            iteration is the learning iteration that just finished, None after the last one.
+        """
+        next_iteration = self.current_learning_iteration if iteration is None else iteration + 1
+        state = {
             'model_state_dict': self.alg.actor_critic.state_dict(),
             'optimizer_state_dict': self.alg.optimizer.state_dict(),
             'iter': self.current_learning_iteration,
             'infos': infos,
-            }, path)
+            'training_state': {
+                'next_iteration': next_iteration,
+                'learning_rate': self.alg.learning_rate,
+                'tot_timesteps': self.tot_timesteps,
+                'tot_time': self.tot_time,
+                'env': self.env.get_training_state() if hasattr(self.env, 'get_training_state') else {},
+                'rng': get_rng_state(),
+                },
+            }
+        if self.checkpoint_writer is None:
+            torch.save(state, path)
+        else:
+            # snapshot to the CPU, written in the background
+            self.checkpoint_writer.save(path, state, next_iteration - 1, self.checkpoint_metrics)
 
     def load(self, path, load_optimizer=True):
-        loaded_dict = torch.load(path, map_location='cuda:0')
+        loaded_dict = torch.load(path, map_location=self.device)
         self.alg.actor_critic.load_state_dict(loaded_dict['model_state_dict'])
+        if self.alg.policy is not self.alg.actor_critic:
+            self.alg.policy.load_state_dict(loaded_dict['model_state_dict'])
         if load_optimizer:
-            self.alg.optimizer.load_state_dict(loaded_dict['optimizer_state_dict'])
+            try:
+                self.alg.optimizer.load_state_dict(loaded_dict['optimizer_state_dict'])
+            except ValueError:
+                # checkpoints of the per-critic ModuleList have a different parameter layout
+                print("Optimizer state of {} does not match the model parameters, it is not restored.".format(path))
         self.current_learning_iteration = loaded_dict['iter']
+        # restored by learn(), play and evaluation (possibly with other env counts) keep their env and RNG states
+        if 'training_state' in loaded_dict and load_optimizer:
+            self.resume_training_state = loaded_dict['training_state']
         return loaded_dict['infos']
 
+    def _load_training_state(self, training_state):
+        """ Warm resume: continues after the saved iteration with its learning rate, env curriculum and RNG states.
+            Only rank 0 saves its state, the other ranks derive distinct random streams from it.
+        """
+        self.current_learning_iteration = training_state['next_iteration']
+        self.alg.learning_rate = training_state['learning_rate']
+        for param_group in self.alg.optimizer.param_groups:
+            param_group['lr'] = self.alg.learning_rate
+        self.tot_timesteps = training_state['tot_timesteps']
+        self.tot_time = training_state['tot_time']
+        if hasattr(self.env, 'set_training_state'):
+            self.env.set_training_state(training_state['env'])
+        set_rng_state(training_state['rng'])
+        if self.world_size > 1:
+            offset_rng_state(self.rank)
+
     def get_inference_policy(self, device=None):
         self.alg.actor_critic.eval() # switch to evaluation mode (dropout for example)
         if device is not None:
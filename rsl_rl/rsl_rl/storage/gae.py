@@ -0,0 +1,68 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import torch
+
+from rsl_rl.utils import is_distributed, all_reduce_sum
+
+
+def _gae_scan(rewards: torch.Tensor, values: torch.Tensor, not_dones: torch.Tensor, last_values: torch.Tensor, gamma: float, lam: float) -> torch.Tensor:
+    """ Reverse scan of the GAE recursion over the time dimension.
+        All reward groups (critics) are processed at once, shapes are [time, num_envs, num_critics].
+    """
+    next_values = torch.cat((values[1:], last_values.unsqueeze(0)), dim=0)
+    deltas = rewards + not_dones * gamma * next_values - values
+    discounts = not_dones * (gamma * lam)
+
+    advantages = torch.zeros_like(values)
+    advantage = torch.zeros_like(last_values)
+    for step in range(rewards.shape[0] - 1, -1, -1):
+        advantage = deltas[step] + discounts[step] * advantage
+        advantages[step] = advantage
+    return advantages
+
+_gae_scan_jit = None
+
+def _get_gae_scan(use_jit):
+    global _gae_scan_jit
+    if not use_jit:
+        return _gae_scan
+    if _gae_scan_jit is None:
+        _gae_scan_jit = torch.jit.script(_gae_scan)
+    return _gae_scan_jit
+
+def compute_gae(rewards, values, dones, last_values, gamma, lam, use_jit=False):
+    """ Computes the returns and the per reward group normalized advantages of a rollout.
+
+    Args:
+        rewards (torch.Tensor): Rewards of shape [time, num_envs, num_critics]
+        values (torch.Tensor): Values of shape [time, num_envs, num_critics]
+        dones (torch.Tensor): Dones of shape [time, num_envs, 1]
+        last_values (torch.Tensor): Bootstrap values of shape [num_envs, num_critics]
+        gamma (float): Discount factor
+        lam (float): GAE lambda
+        use_jit (bool, optional): Run the time scan through TorchScript. Defaults to False.
+
+    Returns:
+        [torch.Tensor]: Returns of shape [time, num_envs, num_critics]
+        [torch.Tensor]: Advantages normalized independently for each reward group, same shape.
+                        In distributed training the statistics of the normalization are those of the rollouts of all ranks.
+    """
+    not_dones = 1.0 - dones.float()
+    advantages = _get_gae_scan(use_jit)(rewards, values, not_dones, last_values, float(gamma), float(lam))
+    returns = advantages + values
+
+    # normalize each reward group once over the whole rollout
+    flat_advantages = advantages.flatten(0, 1)
+    if is_distributed():
+        # count, sum and sum of squares of every group in one collective, then the unbiased std as in torch.std
+        moments = torch.cat((torch.full_like(flat_advantages[0], flat_advantages.shape[0]).unsqueeze(0),
+                             flat_advantages.sum(dim=0, keepdim=True),
+                             flat_advantages.square().sum(dim=0, keepdim=True)), dim=0).double()
+        count, total, total_squares = all_reduce_sum(moments)
+        mean = total / count
+        std = ((total_squares - count * mean.square()) / (count - 1)).clamp(min=0.).sqrt()
+        advantages = (advantages - mean.to(advantages.dtype)) / (std.to(advantages.dtype) + 1e-8)
+        return returns, advantages
+    advantages = (advantages - flat_advantages.mean(dim=0)) / (flat_advantages.std(dim=0) + 1e-8)
+    return returns, advantages
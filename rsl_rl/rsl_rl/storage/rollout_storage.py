@@ -31,7 +31,8 @@
 import torch
 import numpy as np
 
-from rsl_rl.utils import split_and_pad_trajectories
+from rsl_rl.utils import split_and_pad_trajectories, profiled
+from .gae import compute_gae
 
 class RolloutStorage:
     class Transition:
@@ -50,9 +51,12 @@ class RolloutStorage:
         def clear(self):
             self.__init__()
 
-    def __init__(self, num_envs, num_transitions_per_env, obs_shape, privileged_obs_shape, actions_shape, num_critics, reward_group_weights, device='cpu'):
+    def __init__(self, num_envs, num_transitions_per_env, obs_shape, privileged_obs_shape, actions_shape, num_critics, reward_group_weights, device='cpu', compile_gae=False, obs_history_length=1, storage_dtype=torch.float32):
 
         self.device = device
+        self.compile_gae = compile_gae
+        # observations and action statistics are stored in storage_dtype and upcast when gathering mini batches
+        self.storage_dtype = storage_dtype
 
         self.obs_shape = obs_shape
         self.privileged_obs_shape = privileged_obs_shape
@@ -62,25 +66,33 @@ class RolloutStorage:
         self.reward_group_weights = torch.tensor(reward_group_weights, device=self.device).view(1, 1, -1)
 
         # Core
-        self.observations = torch.zeros(num_transitions_per_env, num_envs, *obs_shape, device=self.device)
+        # with obs_history_length > 1 the actor observation is a stack of frames which slides by one frame per step.
+        # Only the newest frame of each step is stored (plus the frames preceding the rollout), windows are rebuilt on gather.
+        self.obs_history_length = obs_history_length
+        if self.obs_history_length > 1:
+            assert obs_shape[0] % obs_history_length == 0, "Observation size must be a multiple of the history length"
+            self.num_one_step_obs = obs_shape[0] // obs_history_length
+            self.observations = torch.zeros(obs_history_length - 1 + num_transitions_per_env, num_envs, self.num_one_step_obs, dtype=storage_dtype, device=self.device)
+            # set when the older frames of an observation differ from the stored ones (an env which clears the history
+            # on reset), checked once per rollout in compute_returns to keep the steps free of host synchronization
+            self.history_mismatch = torch.zeros((), dtype=torch.bool, device=self.device)
+        else:
+            self.observations = torch.zeros(num_transitions_per_env, num_envs, *obs_shape, dtype=storage_dtype, device=self.device)
         if privileged_obs_shape[0] is not None:
-            self.privileged_observations = torch.zeros(num_transitions_per_env, num_envs, *privileged_obs_shape, device=self.device)
+            self.privileged_observations = torch.zeros(num_transitions_per_env, num_envs, *privileged_obs_shape, dtype=storage_dtype, device=self.device)
         else:
             self.privileged_observations = None
         self.rewards = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
         self.actions = torch.zeros(num_transitions_per_env, num_envs, *actions_shape, device=self.device)
-        self.dones = torch.zeros(num_transitions_per_env, num_envs, 1, device=self.device).byte()
+        self.dones = torch.zeros(num_transitions_per_env, num_envs, 1, dtype=torch.bool, device=self.device)
 
         # For PPO
-        self.actions_log_prob = torch.zeros(num_transitions_per_env, num_envs, 1, device=self.device)
+        self.actions_log_prob = torch.zeros(num_transitions_per_env, num_envs, device=self.device)
         self.values = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
         self.returns = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
         self.advantages = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
-        self.values = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
-        self.returns = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
-        self.advantages = torch.zeros(num_transitions_per_env, num_envs, num_critics, device=self.device)
-        self.mu = torch.zeros(num_transitions_per_env, num_envs, *actions_shape, device=self.device)
-        self.sigma = torch.zeros(num_transitions_per_env, num_envs, *actions_shape, device=self.device)
+        self.mu = torch.zeros(num_transitions_per_env, num_envs, *actions_shape, dtype=storage_dtype, device=self.device)
+        self.sigma = torch.zeros(num_transitions_per_env, num_envs, *actions_shape, dtype=storage_dtype, device=self.device)
 
         self.num_transitions_per_env = num_transitions_per_env
         self.num_envs = num_envs
@@ -91,21 +103,61 @@ class RolloutStorage:
 
         self.step = 0
 
+    @profiled('storage/add_transitions')
     def add_transitions(self, transition: Transition):
         if self.step >= self.num_transitions_per_env:
             raise AssertionError("Rollout buffer overflow")
-        self.observations[self.step].copy_(transition.observations)
+        if self.obs_history_length > 1:
+            self._add_observation_frame(transition.observations)
+        else:
+            self.observations[self.step].copy_(transition.observations)
         if self.privileged_observations is not None: self.privileged_observations[self.step].copy_(transition.critic_observations)
         self.actions[self.step].copy_(transition.actions)
         self.rewards[self.step].copy_(transition.rewards.view(-1, self.num_critics))
         self.dones[self.step].copy_(transition.dones.view(-1, 1))
         self.values[self.step].copy_(transition.values)
-        self.actions_log_prob[self.step].copy_(transition.actions_log_prob.view(-1, 1))
+        self.actions_log_prob[self.step].copy_(transition.actions_log_prob.view(-1))
         self.mu[self.step].copy_(transition.action_mean)
         self.sigma[self.step].copy_(transition.action_sigma)
         self._save_hidden_states(transition.hidden_states)
         self.step += 1
 
+    def _add_observation_frame(self, observations):
+        history = self.obs_history_length - 1
+        if self.step == 0:
+            # frames observed before the rollout started
+            self.observations[:history].copy_(observations[:, :-self.num_one_step_obs].view(self.num_envs, history, self.num_one_step_obs).transpose(0, 1))
+        else:
+            previous = self.observations[self.step:history + self.step].transpose(0, 1).flatten(1, 2)
+            self.history_mismatch |= (observations[:, :-self.num_one_step_obs].to(previous.dtype) != previous).any()
+        self.observations[history + self.step].copy_(observations[:, -self.num_one_step_obs:])
+
+    def _gather_observations(self, steps, envs):
+        """ Rebuilds the stacked observation windows for the given (step, env) pairs from the stored frames
+        """
+        if self.obs_history_length == 1:
+            return self.observations[steps, envs].float()
+        frame_steps = steps.unsqueeze(1) + torch.arange(self.obs_history_length, device=self.device).unsqueeze(0)
+        frames = self.observations.flatten(0, 1)[frame_steps * self.num_envs + envs.unsqueeze(1)]
+        return frames.flatten(1, 2).float()
+
+    def get_observations(self):
+        """ Returns the full [time, num_envs, obs_dim] observation tensor (materialized if history deduplication is enabled)
+        """
+        if self.obs_history_length == 1:
+            return self.observations
+        windows = self.observations.unfold(0, self.obs_history_length, 1) # [time, num_envs, one_step_obs, history]
+        return windows.transpose(-1, -2).flatten(2, 3)
+
+    def get_memory_usage(self):
+        """ Returns the size in bytes of each allocated rollout buffer
+        """
+        buffers = {'observations': self.observations, 'privileged_observations': self.privileged_observations,
+                   'rewards': self.rewards, 'actions': self.actions, 'dones': self.dones,
+                   'actions_log_prob': self.actions_log_prob, 'values': self.values, 'returns': self.returns,
+                   'advantages': self.advantages, 'mu': self.mu, 'sigma': self.sigma}
+        return {name: buffer.element_size() * buffer.nelement() for name, buffer in buffers.items() if buffer is not None}
+
     def _save_hidden_states(self, hidden_states):
         if hidden_states is None or hidden_states==(None, None):
             return
@@ -115,8 +167,8 @@ class RolloutStorage:
 
         # initialize if needed 
         if self.saved_hidden_states_a is None:
-            self.saved_hidden_states_a = [torch.zeros(self.observations.shape[0], *hid_a[i].shape, device=self.device) for i in range(len(hid_a))]
-            self.saved_hidden_states_c = [torch.zeros(self.observations.shape[0], *hid_c[i].shape, device=self.device) for i in range(len(hid_c))]
+            self.saved_hidden_states_a = [torch.zeros(self.num_transitions_per_env, *hid_a[i].shape, device=self.device) for i in range(len(hid_a))]
+            self.saved_hidden_states_c = [torch.zeros(self.num_transitions_per_env, *hid_c[i].shape, device=self.device) for i in range(len(hid_c))]
         # copy the states
         for i in range(len(hid_a)):
             self.saved_hidden_states_a[i][self.step].copy_(hid_a[i])
@@ -125,24 +177,15 @@ class RolloutStorage:
 
     def clear(self):
         self.step = 0
+        if self.obs_history_length > 1:
+            self.history_mismatch.zero_()
 
+    @profiled('storage/compute_returns')
     def compute_returns(self, last_values, gamma, lam):
-        advantage = 0
-        for step in reversed(range(self.num_transitions_per_env)):
-            if step == self.num_transitions_per_env - 1:
-                next_values = last_values
-            else:
-                next_values = self.values[step + 1]
-            next_is_not_terminal = 1.0 - self.dones[step].float()
-            delta = self.rewards[step] + next_is_not_terminal * gamma * next_values - self.values[step]
-            advantage = delta + next_is_not_terminal * gamma * lam * advantage
-            self.returns[step] = advantage + self.values[step]
-
-            # Compute and normalize the advantages for each critic
-            for critic_idx in range(self.num_critics):
-                self.advantages[:, :, critic_idx] = self.returns[:, :, critic_idx] - self.values[:, :, critic_idx]
-                self.advantages[:, :, critic_idx] = (self.advantages[:, :, critic_idx] - self.advantages[:, :, critic_idx].mean()) / (self.advantages[:, :, critic_idx].std() + 1e-8)
-        
+        if self.obs_history_length > 1 and self.history_mismatch.item():
+            raise RuntimeError("The observation history does not slide by one frame per step (the env clears it on reset), "
+                               "disable dedup_obs_history for this env.")
+        self.returns[:], self.advantages[:] = compute_gae(self.rewards, self.values, self.dones, last_values, gamma, lam, use_jit=self.compile_gae)
         self.multi_critic_advantages = torch.sum(self.advantages * self.reward_group_weights, dim=-1)
 
 
@@ -159,13 +202,10 @@ class RolloutStorage:
         mini_batch_size = batch_size // num_mini_batches
         indices = torch.randperm(num_mini_batches*mini_batch_size, requires_grad=False, device=self.device)
 
-        observations = self.observations[:-1].flatten(0, 1)
         if self.privileged_observations is not None:
             critic_observations = self.privileged_observations[:-1].flatten(0, 1)
         else:
-            critic_observations = observations
-
-        next_observations = self.observations[1:].flatten(0, 1)
+            critic_observations = None
 
         actions = self.actions[:-1].flatten(0, 1)
         values = self.values[:-1].flatten(0, 1)
@@ -174,7 +214,7 @@ class RolloutStorage:
         advantages = self.multi_critic_advantages[:-1].flatten(0, 1)
         old_mu = self.mu[:-1].flatten(0, 1)
         old_sigma = self.sigma[:-1].flatten(0, 1)
-        not_dones = 1 - self.dones[:-1].float().flatten(0, 1)
+        not_dones = (~self.dones[:-1]).float().flatten(0, 1)
 
         for epoch in range(num_epochs):
             for i in range(num_mini_batches):
@@ -183,23 +223,25 @@ class RolloutStorage:
                 end = (i+1)*mini_batch_size
                 batch_idx = indices[start:end]
                 cont_batch = not_dones[batch_idx]
-                obs_batch = observations[batch_idx]
-                next_obs_batch = next_observations[batch_idx]
-                critic_observations_batch = critic_observations[batch_idx]
+                step_idx = torch.div(batch_idx, self.num_envs, rounding_mode='floor')
+                env_idx = batch_idx % self.num_envs
+                obs_batch = self._gather_observations(step_idx, env_idx)
+                next_obs_batch = self._gather_observations(step_idx + 1, env_idx)
+                critic_observations_batch = critic_observations[batch_idx].float() if critic_observations is not None else obs_batch
                 actions_batch = actions[batch_idx]
                 target_values_batch = values[batch_idx]
                 returns_batch = returns[batch_idx]
                 old_actions_log_prob_batch = old_actions_log_prob[batch_idx]
                 advantages_batch = advantages[batch_idx]
-                old_mu_batch = old_mu[batch_idx]
-                old_sigma_batch = old_sigma[batch_idx]
+                old_mu_batch = old_mu[batch_idx].float()
+                old_sigma_batch = old_sigma[batch_idx].float()
                 yield obs_batch, critic_observations_batch, next_obs_batch, cont_batch, actions_batch, target_values_batch, advantages_batch, returns_batch, \
                        old_actions_log_prob_batch, old_mu_batch, old_sigma_batch, (None, None), None
 
     # for RNNs only
     def reccurent_mini_batch_generator(self, num_mini_batches, num_epochs=8):
 
-        padded_obs_trajectories, trajectory_masks = split_and_pad_trajectories(self.observations, self.dones)
+        padded_obs_trajectories, trajectory_masks = split_and_pad_trajectories(self.get_observations(), self.dones)
         if self.privileged_observations is not None: 
             padded_critic_obs_trajectories, _ = split_and_pad_trajectories(self.privileged_observations, self.dones)
         else: 
@@ -220,12 +262,12 @@ class RolloutStorage:
                 last_traj = first_traj + trajectories_batch_size
                 
                 masks_batch = trajectory_masks[:, first_traj:last_traj]
-                obs_batch = padded_obs_trajectories[:, first_traj:last_traj]
-                critic_obs_batch = padded_critic_obs_trajectories[:, first_traj:last_traj]
+                obs_batch = padded_obs_trajectories[:, first_traj:last_traj].float()
+                critic_obs_batch = padded_critic_obs_trajectories[:, first_traj:last_traj].float()
 
                 actions_batch = self.actions[:, start:stop]
-                old_mu_batch = self.mu[:, start:stop]
-                old_sigma_batch = self.sigma[:, start:stop]
+                old_mu_batch = self.mu[:, start:stop].float()
+                old_sigma_batch = self.sigma[:, start:stop].float()
                 returns_batch = self.returns[:, start:stop]
                 advantages_batch = self.advantages[:, start:stop]
                 values_batch = self.values[:, start:stop]
@@ -28,4 +28,8 @@
 #
 # Copyright (c) 2021 ETH Zurich, Nikita Rudin
 
-from .utils import split_and_pad_trajectories, unpad_trajectories
\ No newline at end of file
+from .utils import split_and_pad_trajectories, unpad_trajectories
+from .episode_statistics import EpisodeStatistics
+from .profiling import Profiler, profiler, profiled
+from .checkpoint import CheckpointWriter, atomic_write, snapshot_to_cpu, get_rng_state, set_rng_state, offset_rng_state
+from .distributed import init_distributed, is_distributed, get_rank, get_world_size, all_reduce_mean, all_reduce_sum, all_gather_cat, all_reduce_gradients, broadcast_parameters
@@ -0,0 +1,193 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import json
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import torch
+
+
+def snapshot_to_cpu(obj):
+    """ Recursively copies the tensors of a (state dict like) nested structure to the CPU
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return type(obj)((key, snapshot_to_cpu(value)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot_to_cpu(value) for value in obj)
+    return obj
+
+def atomic_write(path, write_fn):
+    """ Calls write_fn(file) on a temporary file in the directory of path and renames it to path once it is complete,
+        so that readers never see a partially written file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    # the prefix must not contain 'model', helpers.get_load_path picks up any such file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.ckpt_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CheckpointWriter:
+    """ Writes checkpoints from a background thread so that training does not wait on the file system.
+
+        save() snapshots the state to the CPU and returns, the worker writes it atomically (temporary file + rename)
+        and records it in the manifest checkpoints.json of the directory: file, iteration, wall time and metrics of
+        every checkpoint kept. Only the last keep_last checkpoints are kept (0 keeps all). If best_metric is set, the
+        checkpoint with the highest value of this metric is also kept as best.pt.
+        Errors of the worker are raised by the next call of save() or wait().
+
+    Args:
+        directory (str): Directory of the checkpoints and of the manifest
+        keep_last (int, optional): Number of checkpoints kept, 0 keeps all. Defaults to 0.
+        best_metric (str, optional): Name of the metric selecting best.pt, None to disable. Defaults to None.
+        async_write (bool, optional): Write from a background thread, otherwise save() blocks. Defaults to True.
+    """
+    manifest_name = 'checkpoints.json'
+    best_name = 'best.pt'
+
+    def __init__(self, directory, keep_last=0, best_metric=None, async_write=True):
+        self.directory = directory
+        self.keep_last = keep_last
+        self.best_metric = best_metric
+        self.async_write = async_write
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+        self._queue = queue.Queue()
+        self._error = None
+        self._worker = None
+        if async_write:
+            self._worker = threading.Thread(target=self._run, name='CheckpointWriter', daemon=True)
+            self._worker.start()
+
+    def save(self, path, state, iteration, metrics=None):
+        """ Snapshots state to the CPU and schedules it to be written to path
+        """
+        self._raise_error()
+        job = (path, snapshot_to_cpu(state), iteration, dict(metrics or {}), time.time())
+        if self.async_write:
+            self._queue.put(job)
+        else:
+            self._write(*job)
+
+    def wait(self):
+        """ Blocks until all scheduled checkpoints are written
+        """
+        if self.async_write:
+            self._queue.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Writing a checkpoint failed") from error
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._write(*job)
+            except Exception as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, self.manifest_name)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {'checkpoints': [], 'best': None}
+
+    def _write_manifest(self):
+        atomic_write(os.path.join(self.directory, self.manifest_name),
+                     lambda f: f.write(json.dumps(self.manifest, indent=2).encode()))
+
+    def _write(self, path, state, iteration, metrics, wall_time):
+        atomic_write(path, lambda f: torch.save(state, f))
+        entry = {'file': os.path.basename(path), 'iteration': iteration, 'time': wall_time, 'metrics': metrics}
+        checkpoints = [c for c in self.manifest['checkpoints'] if c['file'] != entry['file']]
+        checkpoints.append(entry)
+
+        if self.best_metric is not None and self.best_metric in metrics:
+            best = self.manifest['best']
+            if best is None or metrics[self.best_metric] > best['metrics'][self.best_metric]:
+                self._link_best(path)
+                self.manifest['best'] = dict(entry, file=self.best_name, source=entry['file'])
+
+        if self.keep_last > 0 and len(checkpoints) > self.keep_last:
+            checkpoints.sort(key=lambda c: c['iteration'])
+            for checkpoint in checkpoints[:-self.keep_last]:
+                stale_path = os.path.join(self.directory, checkpoint['file'])
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            checkpoints = checkpoints[-self.keep_last:]
+        self.manifest['checkpoints'] = checkpoints
+        self._write_manifest()
+
+    def _link_best(self, path):
+        # best.pt is a hard link to the checkpoint, created under a temporary name and renamed atomically
+        best_path = os.path.join(self.directory, self.best_name)
+        tmp_path = best_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, best_path)
+
+
+def get_rng_state():
+    """ States of the python, numpy and torch (CPU and CUDA) random number generators, as plain containers and tensors
+    """
+    np_state = np.random.get_state()
+    state = {
+        'python': random.getstate(),
+        'numpy': (np_state[0], np_state[1].tolist(), int(np_state[2]), int(np_state[3]), float(np_state[4])),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    random.setstate(_to_tuple(state['python']))
+    np_state = state['numpy']
+    np.random.set_state((np_state[0], np.array(np_state[1], dtype=np.uint32), np_state[2], np_state[3], np_state[4]))
+    torch.set_rng_state(state['torch'].cpu())
+    if 'cuda' in state and torch.cuda.is_available():
+        cuda_states = [cuda_state.cpu() for cuda_state in state['cuda']]
+        torch.cuda.set_rng_state_all(cuda_states[:torch.cuda.device_count()])
+
+def offset_rng_state(offset):
+    """ Re-seeds the python, numpy and torch generators with a seed drawn from their current state plus offset,
+        so that processes which restored the same state continue with distinct streams
+    """
+    seed = int(torch.randint(0, 2**31 - 1 - offset, (1,)).item()) + offset
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def _to_tuple(obj):
+    # random.setstate needs the nested tuples back if the state went through a list conversion
+    if isinstance(obj, (list, tuple)):
+        return tuple(_to_tuple(value) for value in obj)
+    return obj
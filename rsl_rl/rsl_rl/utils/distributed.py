@@ -0,0 +1,83 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import os
+
+import torch
+import torch.distributed as dist
+
+
+def init_distributed(backend=None):
+    """ Joins the process group described by the environment variables of torchrun (RANK, WORLD_SIZE, LOCAL_RANK,
+        MASTER_ADDR, MASTER_PORT). The backend defaults to nccl with CUDA and to gloo otherwise, gloo works on any
+        number of CPU processes and nodes. Without WORLD_SIZE > 1 nothing is initialized.
+
+    Returns:
+        rank, world size and local rank (index of the process on its node)
+    """
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    local_rank = int(os.environ.get('LOCAL_RANK', 0))
+    if world_size > 1 and not dist.is_initialized():
+        if backend is None:
+            backend = 'nccl' if torch.cuda.is_available() else 'gloo'
+        if backend == 'nccl':
+            torch.cuda.set_device(local_rank)
+        dist.init_process_group(backend=backend)
+    return get_rank(), get_world_size(), local_rank
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized() and dist.get_world_size() > 1
+
+def get_rank():
+    return dist.get_rank() if is_distributed() else 0
+
+def get_world_size():
+    return dist.get_world_size() if is_distributed() else 1
+
+def all_reduce_mean(tensor):
+    """ Averages tensor in place over the ranks and returns it
+    """
+    if is_distributed():
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+        tensor /= dist.get_world_size()
+    return tensor
+
+def all_reduce_sum(tensor):
+    """ Sums tensor in place over the ranks and returns it
+    """
+    if is_distributed():
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor
+
+def all_gather_cat(tensor, dim=0):
+    """ Concatenation of tensor over the ranks along dim, tensor itself without distribution
+    """
+    if not is_distributed():
+        return tensor
+    tensors = [torch.empty_like(tensor) for _ in range(dist.get_world_size())]
+    dist.all_gather(tensors, tensor.contiguous())
+    return torch.cat(tensors, dim=dim)
+
+def all_reduce_gradients(parameters):
+    """ Averages the gradients over the ranks with a single collective on a flat buffer
+    """
+    if not is_distributed():
+        return
+    grads = [p.grad for p in parameters if p.grad is not None]
+    if not grads:
+        return
+    flat = torch.cat([grad.view(-1) for grad in grads])
+    all_reduce_mean(flat)
+    offset = 0
+    for grad in grads:
+        grad.copy_(flat[offset:offset + grad.numel()].view_as(grad))
+        offset += grad.numel()
+
+def broadcast_parameters(module, src=0):
+    """ Copies the parameters and buffers of module from rank src to all ranks
+    """
+    if not is_distributed():
+        return
+    with torch.no_grad():
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            dist.broadcast(tensor.data, src=src)
@@ -0,0 +1,89 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import torch
+
+from .distributed import all_gather_cat
+
+
+class EpisodeStatistics:
+    """ On-device accumulator of the returns and lengths of the last window_size finished episodes.
+
+        record() runs at every env step without any host synchronization: finished episodes are scattered into a ring
+        buffer at positions given by a cumulative sum over the done flags, the environments that did not finish are
+        written into a spare row. summary() reduces the window on device and copies the result to the host in one transfer.
+
+    Args:
+        num_envs (int): Number of environments
+        num_reward_groups (int): Number of reward groups, the returns are kept per group
+        window_size (int, optional): Number of finished episodes kept. Defaults to 100.
+        percentiles (tuple, optional): Percentiles of the total return reported by summary(). Defaults to (5, 50, 95).
+        device (str, optional): Defaults to 'cpu'.
+    """
+    def __init__(self, num_envs, num_reward_groups, window_size=100, percentiles=(5, 50, 95), device='cpu'):
+        self.num_envs = num_envs
+        self.num_reward_groups = num_reward_groups
+        self.window_size = window_size
+        self.percentiles = percentiles
+        self.device = device
+
+        # running sums of the current episodes
+        self.cur_reward_sum = torch.zeros(num_envs, num_reward_groups, dtype=torch.float, device=device)
+        self.cur_episode_length = torch.zeros(num_envs, dtype=torch.float, device=device)
+        # ring buffer of the finished episodes, the last row collects the writes of the envs that are not done
+        self.returns = torch.zeros(window_size + 1, num_reward_groups, dtype=torch.float, device=device)
+        self.lengths = torch.zeros(window_size + 1, dtype=torch.float, device=device)
+        self.num_episodes = torch.zeros(1, dtype=torch.long, device=device)
+        self._quantiles = torch.tensor(percentiles, dtype=torch.float, device=device) / 100.
+        self._slots = torch.zeros(num_envs, dtype=torch.long, device=device)
+        self._rank = torch.zeros(num_envs, dtype=torch.long, device=device)
+
+    def record(self, rewards, dones):
+        """ Accumulates one env step and moves the episodes that finished into the ring buffer.
+
+        Args:
+            rewards (torch.Tensor): Rewards per group of shape [num_envs, num_reward_groups]
+            dones (torch.Tensor): Done flags of shape [num_envs]
+        """
+        self.cur_reward_sum += rewards.view(self.num_envs, -1)
+        self.cur_episode_length += 1
+        done = dones.view(-1) > 0
+
+        torch.cumsum(done, dim=0, out=self._rank) # 1-based rank of each finished episode within this step
+        num_done = self._rank[-1:]
+        # only the last window_size episodes of a step are kept so that no two envs write into the same slot
+        keep = done & (self._rank > num_done - self.window_size)
+        torch.add(self.num_episodes, self._rank - 1, out=self._slots)
+        self._slots.remainder_(self.window_size)
+        self._slots.masked_fill_(~keep, self.window_size)
+        self.returns.index_copy_(0, self._slots, self.cur_reward_sum)
+        self.lengths.index_copy_(0, self._slots, self.cur_episode_length)
+        self.num_episodes += num_done
+
+        not_done = (~done).unsqueeze(1)
+        self.cur_reward_sum.mul_(not_done)
+        self.cur_episode_length.mul_(not_done.squeeze(1))
+
+    def summary(self):
+        """ Statistics of the window as python floats, None before the first episode finished.
+            Returns a dict with mean_reward, mean_episode_length, mean_group_rewards (list) and reward_percentiles (list).
+            In distributed training the windows of all ranks are pooled, so every rank has to call summary().
+        """
+        valid = torch.arange(self.window_size, device=self.device) < self.num_episodes
+        window = all_gather_cat(torch.cat((valid.float().unsqueeze(1), self.returns[:-1], self.lengths[:-1].unsqueeze(1)), dim=1))
+        valid = window[:, 0] > 0
+        returns = torch.where(valid.unsqueeze(1), window[:, 1:-1], torch.nan)
+        total_returns = torch.where(valid, window[:, 1:-1].sum(dim=1), torch.nan)
+        lengths = torch.where(valid, window[:, -1], torch.nan)
+        stats = torch.cat((valid.sum().float().view(1),
+                           total_returns.nanmean().view(1),
+                           lengths.nanmean().view(1),
+                           returns.nanmean(dim=0),
+                           torch.nanquantile(total_returns, self._quantiles))).tolist()
+        if stats[0] == 0:
+            return None
+        num_groups = self.num_reward_groups
+        return {'mean_reward': stats[1],
+                'mean_episode_length': stats[2],
+                'mean_group_rewards': stats[3:3 + num_groups],
+                'reward_percentiles': stats[3 + num_groups:]}
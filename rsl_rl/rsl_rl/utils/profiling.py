@@ -0,0 +1,134 @@
+#  Copyright 2021 ETH Zurich, NVIDIA CORPORATION
+#  SPDX-License-Identifier: BSD-3-Clause
+
+import functools
+import threading
+import time
+from collections import defaultdict
+
+import torch
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    __slots__ = ('profiler', 'name', 'record_function', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.record_function = torch.profiler.record_function(self.name)
+        self.record_function.__enter__()
+        self.profiler._synchronize()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler._synchronize()
+        self.profiler._record(self.name, time.perf_counter() - self.start)
+        self.record_function.__exit__(*args)
+        return False
+
+
+class Profiler:
+    """ Opt-in timing of named scopes of the training loop (rollout, env step, storage, PPO update).
+
+        Disabled by default: scope() then returns a shared no-op context manager and iterate() returns the iterable
+        unchanged. When enabled, the device is synchronized at the boundaries of every scope so that the wall clock
+        time of a scope includes its kernels (and the physics of the simulator), and each scope is also emitted as a
+        torch.profiler.record_function range so it shows up in Chrome traces. Timings include the nested scopes.
+
+        Scopes may be timed from several threads (the learner thread of the pipelined runner), the timings are
+        accumulated under a lock. With stream_sync only the current stream of the calling thread is synchronized
+        instead of the device, so the scopes of one thread do not wait for the kernels queued by another thread on
+        its own stream.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._use_cuda = False
+        self._stream_sync = False
+        self._lock = threading.Lock()
+        self._totals = defaultdict(float)
+        self._counts = defaultdict(int)
+
+    def enable(self, device='cpu', stream_sync=False):
+        self.enabled = True
+        self._use_cuda = 'cuda' in str(device) and torch.cuda.is_available()
+        self._stream_sync = stream_sync
+
+    def disable(self):
+        self.enabled = False
+
+    def scope(self, name):
+        """ Context manager timing the enclosed block under name
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    def iterate(self, name, iterable):
+        """ Times each next() call of iterable under name (e.g. the mini batch gather of a generator)
+        """
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.scope(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _synchronize(self):
+        if self._use_cuda:
+            if self._stream_sync:
+                torch.cuda.current_stream().synchronize()
+            else:
+                torch.cuda.synchronize()
+
+    def _record(self, name, elapsed):
+        with self._lock:
+            self._totals[name] += elapsed
+            self._counts[name] += 1
+
+    def collect(self):
+        """ Returns {name: (total time [s], number of calls)} since the last call and resets the timings
+        """
+        with self._lock:
+            timings = {name: (self._totals[name], self._counts[name]) for name in self._totals}
+            self._totals.clear()
+            self._counts.clear()
+        return timings
+
+
+# process wide profiler shared by the runner, the algorithm, the storage and the environments
+profiler = Profiler()
+
+def profiled(name):
+    """ Decorator timing every call of the decorated function under name when the profiler is enabled
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            with profiler.scope(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator